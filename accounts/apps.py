@@ -9,6 +9,8 @@ class AccountsConfig(AppConfig):
     name = 'accounts'
 
     def ready(self):
+        import accounts.signals
+
         # Import và áp dụng patches
         try:
             from . import patches
@@ -54,11 +54,25 @@ class UserAccount(AbstractBaseUser, PermissionsMixin):
     def check_password(self, raw_password):
         return check_password(raw_password, self.password)
 
+    @property
+    def entitlements(self):
+        """
+        Snapshot quyền hạn (vai trò, gói Premium đang hoạt động) của user
+
+        Tải một lần cho mỗi instance (tức mỗi request với user đã xác thực) và dùng chung
+        giữa các request qua cache, nên kiểm tra vai trò/gói Premium không tốn truy vấn.
+        """
+        if getattr(self, '_entitlements', None) is None:
+            from .services import get_entitlements
+            self._entitlements = get_entitlements(self.pk)
+        return self._entitlements
+
     def get_role(self):
-        return self.user_roles.first().role.name
+        roles = self.entitlements['roles']
+        return roles[0] if roles else None
     
     def is_employer(self):
-        return self.user_roles.filter(role__name='employer').exists()
+        return 'employer' in self.entitlements['roles']
     
     def get_enterprise(self):
         from enterprises.models import EnterpriseEntity
@@ -88,44 +102,14 @@ class UserAccount(AbstractBaseUser, PermissionsMixin):
         """
         if not self.is_premium:
             return None
-            
-        try:
-            # Import ở đây để tránh circular import
-            from transactions.models import PremiumHistory
-            
-            # Lấy lịch sử Premium gần nhất và đang hoạt động
-            premium_history = PremiumHistory.objects.filter(
-                user=self,
-                is_active=True,
-                is_cancelled=False,
-                end_date__gt=timezone.now()
-            ).order_by('-created_at').first()
-            
-            if premium_history:
-                return premium_history.package_name
-                
-            return "Premium"  # Mặc định nếu không tìm thấy
-        except Exception as e:
-            print(f"Error getting premium package name: {str(e)}")
-            return "Premium"  # Mặc định nếu có lỗi
+        # Mặc định "Premium" nếu không tìm thấy lịch sử đang hoạt động
+        return self.entitlements['premium_package_name'] or "Premium"
             
     def get_premium_package(self):
         """
         Lấy gói Premium hiện tại của người dùng
         """
-        from transactions.models import PremiumHistory
-        try:
-            premium_history = PremiumHistory.objects.filter(
-                user=self,
-                is_active=True,
-                expires_at__gt=timezone.now()
-            ).select_related('premium_package').order_by('-expires_at').first()
-            
-            if premium_history:
-                return premium_history.premium_package
-            return None
-        except:
-            return None
+        return self.entitlements['premium_package']
     
     def can_post_job(self):
         """
@@ -0,0 +1,79 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from base.cache import get_or_compute, invalidate_tags, tagged_cache_key
+
+ENTITLEMENTS_CACHE_TIMEOUT = 60 * 60
+
+# Tag chung cho mọi snapshot quyền hạn (đổi khi sửa Role hoặc PremiumPackage)
+ENTITLEMENTS_CACHE_TAG = 'entitlements'
+
+
+def user_entitlements_cache_tag(user_id):
+    return f'entitlements:user:{user_id}'
+
+
+def _entitlements_cache_key(user_id):
+    return tagged_cache_key(
+        'user_entitlements',
+        {'user_id': user_id},
+        [ENTITLEMENTS_CACHE_TAG, user_entitlements_cache_tag(user_id)]
+    )
+
+
+def build_entitlements(user_id):
+    """
+    Tải quyền hạn của user từ database: các vai trò (theo thứ tự gán) và gói Premium đang hoạt động
+
+    Gói Premium được lưu nguyên instance PremiumPackage để các nơi đang đọc
+    max_job_posts, can_chat_with_employers, priority_in_search... dùng tiếp được.
+    """
+    from transactions.models import PremiumHistory
+    from .models import UserRole
+
+    roles = list(
+        UserRole.objects.filter(user_id=user_id).order_by('pk').values_list('role__name', flat=True)
+    )
+    history = PremiumHistory.objects.filter(
+        user_id=user_id,
+        is_active=True,
+        is_cancelled=False,
+        end_date__gt=timezone.now()
+    ).select_related('package').order_by('-created_at').first()
+
+    return {
+        'roles': roles,
+        'premium_package': history.package if history else None,
+        'premium_package_name': history.package_name if history else None,
+        'premium_end_date': history.end_date if history else None,
+    }
+
+
+def get_entitlements(user_id):
+    """
+    Snapshot quyền hạn của user, dùng chung giữa các request qua cache
+
+    Cache bị vô hiệu hóa khi UserRole/PremiumHistory của user thay đổi (signals);
+    gói Premium hết hạn giữa chừng thì snapshot được tính lại ngay khi đọc.
+    """
+    key = _entitlements_cache_key(user_id)
+    entitlements = get_or_compute(key, lambda: build_entitlements(user_id), ENTITLEMENTS_CACHE_TIMEOUT)
+
+    end_date = entitlements['premium_end_date']
+    if end_date is not None and end_date <= timezone.now():
+        entitlements = build_entitlements(user_id)
+        cache.set(key, entitlements, ENTITLEMENTS_CACHE_TIMEOUT)
+    return entitlements
+
+
+def invalidate_entitlements(user_ids):
+    """Vô hiệu hóa snapshot quyền hạn của các user sau khi transaction commit"""
+    tags = [user_entitlements_cache_tag(user_id) for user_id in set(user_ids)]
+    if tags:
+        transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+def invalidate_all_entitlements():
+    """Vô hiệu hóa snapshot quyền hạn của mọi user (khi sửa vai trò hoặc gói Premium)"""
+    transaction.on_commit(lambda: invalidate_tags(ENTITLEMENTS_CACHE_TAG))
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Role, UserRole
+from .services import invalidate_all_entitlements, invalidate_entitlements
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def invalidate_user_role_entitlements(sender, instance, **kwargs):
+    """Vai trò của user thay đổi thì snapshot quyền hạn phải tải lại"""
+    invalidate_entitlements([instance.user_id])
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_role_entitlements(sender, instance, **kwargs):
+    """Đổi tên/xóa vai trò ảnh hưởng tới mọi user có vai trò đó"""
+    invalidate_all_entitlements()
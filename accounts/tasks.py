@@ -150,4 +150,24 @@ def check_premium_expiry():
                     user.premium_expiry
                 )
         except Exception as e:
-            print(f"Error sending premium expiry notice to {user.email}: {str(e)}") 
\ No newline at end of file
+            print(f"Error sending premium expiry notice to {user.email}: {str(e)}")
+
+
+@shared_task
+def deactivate_expired_premiums():
+    """
+    Task đánh dấu các gói Premium đã hết hạn là không hoạt động và
+    cập nhật lại hệ số ưu tiên của doanh nghiệp tương ứng
+    """
+    from transactions.models import PremiumHistory
+    from enterprises.services import refresh_enterprise_priority
+
+    expired = PremiumHistory.objects.filter(is_active=True, end_date__lte=timezone.now())
+    user_ids = set(expired.values_list('user_id', flat=True))
+    if not user_ids:
+        return 0
+
+    # update() không phát signal nên cần tự đồng bộ hệ số ưu tiên
+    expired.update(is_active=False)
+    refresh_enterprise_priority(user_ids)
+    return len(user_ids)
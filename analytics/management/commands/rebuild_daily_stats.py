@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.services import rebuild_daily_stats
+from analytics.tasks import _run_locked
+
+
+class Command(BaseCommand):
+    help = (
+        'Tính lại bảng thống kê theo ngày (EnterpriseDailyStats, PlatformDailyStats) từ dữ liệu gốc. '
+        'Chạy một lần sau khi migrate analytics để các API thống kê và dashboard admin có dữ liệu ngay.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=0,
+            help='Chỉ tính lại số ngày gần nhất (mặc định: toàn bộ lịch sử)'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days < 0:
+            raise CommandError('--days phải là số dương')
+
+        dates = None
+        if days:
+            today = timezone.localdate()
+            dates = [today - timedelta(days=i) for i in range(days)]
+
+        # Dùng chung khóa với task định kỳ để không ghi đè cùng lúc
+        written = _run_locked(lambda heartbeat: rebuild_daily_stats(dates, heartbeat=heartbeat))
+        if written is None:
+            raise CommandError('Task thống kê đang chạy, hãy thử lại sau')
+        self.stdout.write(self.style.SUCCESS(f'Đã ghi {written} dòng thống kê'))
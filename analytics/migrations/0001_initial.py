@@ -0,0 +1,56 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('enterprises', '0027_recommendationfeedentity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('new_users', models.PositiveIntegerField(default=0)),
+                ('posts_created', models.PositiveIntegerField(default=0)),
+                ('cvs_received', models.PositiveIntegerField(default=0)),
+                ('interviews_created', models.PositiveIntegerField(default=0)),
+                ('transactions', models.PositiveIntegerField(default=0)),
+                ('successful_transactions', models.PositiveIntegerField(default=0)),
+                ('revenue', models.BigIntegerField(default=0)),
+                ('computed_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'Thống kê ngày của hệ thống',
+                'verbose_name_plural': 'Thống kê ngày của hệ thống',
+            },
+        ),
+        migrations.CreateModel(
+            name='EnterpriseDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('posts_created', models.PositiveIntegerField(default=0)),
+                ('cvs_received', models.PositiveIntegerField(default=0)),
+                ('cvs_pending', models.PositiveIntegerField(default=0)),
+                ('cvs_approved', models.PositiveIntegerField(default=0)),
+                ('cvs_rejected', models.PositiveIntegerField(default=0)),
+                ('interviews_created', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('enterprise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='enterprises.enterpriseentity')),
+            ],
+            options={
+                'verbose_name': 'Thống kê ngày của doanh nghiệp',
+                'verbose_name_plural': 'Thống kê ngày của doanh nghiệp',
+                'indexes': [models.Index(fields=['date'], name='enterprise_daily_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('enterprise', 'date'), name='enterprise_daily_stats_uniq')],
+            },
+        ),
+    ]
@@ -1,3 +1,51 @@
 from django.db import models
 
-# Không tạo model mới, chỉ sử dụng các model có sẵn từ các app khác
+
+# Bảng tổng hợp theo ngày, được tính lại từ dữ liệu gốc bởi analytics.tasks
+# (không sửa tay: mỗi lần chạy ghi đè toàn bộ các ngày có thay đổi)
+
+class EnterpriseDailyStats(models.Model):
+    """Số liệu trong một ngày của một doanh nghiệp (chỉ có dòng cho ngày có hoạt động)"""
+    enterprise = models.ForeignKey('enterprises.EnterpriseEntity', on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    posts_created = models.PositiveIntegerField(default=0)
+    # CV nhận được trong ngày, chia theo trạng thái hiện tại của CV
+    cvs_received = models.PositiveIntegerField(default=0)
+    cvs_pending = models.PositiveIntegerField(default=0)
+    cvs_approved = models.PositiveIntegerField(default=0)
+    cvs_rejected = models.PositiveIntegerField(default=0)
+    interviews_created = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.enterprise_id} - {self.date}"
+
+    class Meta:
+        verbose_name = 'Thống kê ngày của doanh nghiệp'
+        verbose_name_plural = 'Thống kê ngày của doanh nghiệp'
+        constraints = [
+            models.UniqueConstraint(fields=['enterprise', 'date'], name='enterprise_daily_stats_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='enterprise_daily_date_idx'),
+        ]
+
+
+class PlatformDailyStats(models.Model):
+    """Số liệu toàn hệ thống trong một ngày (dùng cho dashboard admin)"""
+    date = models.DateField(unique=True)
+    new_users = models.PositiveIntegerField(default=0)
+    posts_created = models.PositiveIntegerField(default=0)
+    cvs_received = models.PositiveIntegerField(default=0)
+    interviews_created = models.PositiveIntegerField(default=0)
+    transactions = models.PositiveIntegerField(default=0)
+    successful_transactions = models.PositiveIntegerField(default=0)
+    revenue = models.BigIntegerField(default=0)  # Tổng tiền giao dịch thành công (VND)
+    computed_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return str(self.date)
+
+    class Meta:
+        verbose_name = 'Thống kê ngày của hệ thống'
+        verbose_name_plural = 'Thống kê ngày của hệ thống'
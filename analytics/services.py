@@ -0,0 +1,281 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import EnterpriseDailyStats, PlatformDailyStats
+
+CV_STATUSES = ['pending', 'approved', 'rejected']
+
+# Số ngày được tính lại trong một transaction: lần tính lại toàn bộ được chia nhỏ
+# nên mỗi transaction ngắn và khóa của task được gia hạn sau mỗi phần
+REBUILD_CHUNK_DAYS = 31
+
+# Số bài đăng mặc định/tối đa trong bảng hiệu suất bài đăng
+POST_PERFORMANCE_LIMIT = 20
+POST_PERFORMANCE_MAX_LIMIT = 100
+# Cache bị vô hiệu hóa theo tag thống kê doanh nghiệp, thời hạn chỉ để dọn dữ liệu cũ (giây)
+POST_PERFORMANCE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _period_expression(period):
+    # Giống các API thống kê cũ: giá trị period không hợp lệ được coi là theo tháng
+    if period == 'daily':
+        return F('date')
+    if period == 'weekly':
+        return TruncWeek('date')
+    return TruncMonth('date')
+
+
+def _models():
+    from accounts.models import UserAccount
+    from enterprises.models import PostEntity
+    from interviews.models import Interview
+    from profiles.models import Cv
+    from transactions.models import VnPayTransaction
+    return UserAccount, PostEntity, Cv, Interview, VnPayTransaction
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _created_in(dates):
+    """
+    Điều kiện created_at thuộc các ngày đã cho (theo múi giờ hiện tại)
+
+    Các ngày liên tiếp được gộp thành một khoảng [đầu ngày, đầu ngày kế tiếp) để
+    database dùng được index trên created_at thay vì ép kiểu từng dòng sang ngày.
+    """
+    condition = Q()
+    run_start = previous = None
+    for day in sorted(dates) + [None]:
+        if previous is not None and day == previous + timedelta(days=1):
+            previous = day
+            continue
+        if run_start is not None:
+            condition |= Q(
+                created_at__gte=_start_of_day(run_start),
+                created_at__lt=_start_of_day(previous + timedelta(days=1))
+            )
+        run_start = previous = day
+    return condition
+
+
+def _by_day(queryset, dates):
+    """Nhóm theo ngày tạo (theo múi giờ hiện tại); dates=None nghĩa là toàn bộ lịch sử"""
+    if dates is not None:
+        queryset = queryset.filter(_created_in(dates)) if dates else queryset.none()
+    return queryset.annotate(day=TruncDate('created_at'))
+
+
+def compute_daily_stats(dates=None, computed_at=None):
+    """
+    Tính các dòng thống kê theo ngày từ dữ liệu gốc (mỗi bảng một truy vấn GROUP BY)
+
+    Trả về (enterprise_rows, platform_rows) là các instance chưa lưu.
+    """
+    UserAccount, PostEntity, Cv, Interview, VnPayTransaction = _models()
+    now = computed_at or timezone.now()
+
+    enterprise_stats = defaultdict(dict)
+    platform_stats = defaultdict(dict)
+
+    for row in _by_day(PostEntity.objects.all(), dates).values('enterprise_id', 'day').annotate(total=Count('id')):
+        enterprise_stats[row['enterprise_id'], row['day']]['posts_created'] = row['total']
+
+    cv_rows = _by_day(Cv.objects.all(), dates).values('day', enterprise_id=F('post__enterprise_id')).annotate(
+        total=Count('id'),
+        **{status: Count('id', filter=Q(status=status)) for status in CV_STATUSES}
+    )
+    for row in cv_rows:
+        stats = enterprise_stats[row['enterprise_id'], row['day']]
+        stats['cvs_received'] = row['total']
+        for status in CV_STATUSES:
+            stats[f'cvs_{status}'] = row[status]
+
+    for row in _by_day(Interview.objects.all(), dates).values('enterprise_id', 'day').annotate(total=Count('id')):
+        enterprise_stats[row['enterprise_id'], row['day']]['interviews_created'] = row['total']
+
+    for (enterprise_id, day), stats in enterprise_stats.items():
+        platform = platform_stats[day]
+        for field in ('posts_created', 'cvs_received', 'interviews_created'):
+            platform[field] = platform.get(field, 0) + stats.get(field, 0)
+
+    # Ngày được yêu cầu luôn có dòng hệ thống (kể cả khi không có hoạt động) để computed_at tiến lên
+    for day in dates or []:
+        platform_stats[day]
+
+    for row in _by_day(UserAccount.objects.all(), dates).values('day').annotate(total=Count('id')):
+        platform_stats[row['day']]['new_users'] = row['total']
+
+    transaction_rows = _by_day(VnPayTransaction.objects.all(), dates).values('day').annotate(
+        total=Count('id'),
+        success=Count('id', filter=Q(transaction_status='00')),
+        revenue=Sum('amount', filter=Q(transaction_status='00')),
+    )
+    for row in transaction_rows:
+        platform_stats[row['day']].update(
+            transactions=row['total'],
+            successful_transactions=row['success'],
+            revenue=row['revenue'] or 0
+        )
+
+    enterprise_rows = [
+        EnterpriseDailyStats(enterprise_id=enterprise_id, date=day, computed_at=now, **stats)
+        for (enterprise_id, day), stats in enterprise_stats.items()
+    ]
+    platform_rows = [
+        PlatformDailyStats(date=day, computed_at=now, **stats)
+        for day, stats in platform_stats.items()
+    ]
+    return enterprise_rows, platform_rows
+
+
+def _first_date():
+    """Ngày tạo sớm nhất trong các bảng nguồn (None nếu chưa có dữ liệu)"""
+    firsts = [
+        model.objects.aggregate(first=Min('created_at'))['first']
+        for model in _models()
+    ]
+    firsts = [first for first in firsts if first is not None]
+    return timezone.localtime(min(firsts)).date() if firsts else None
+
+
+def _rebuild_dates(dates, computed_at):
+    """Ghi đè thống kê của một nhóm ngày trong một transaction"""
+    enterprise_rows, platform_rows = compute_daily_stats(dates, computed_at)
+    with transaction.atomic():
+        EnterpriseDailyStats.objects.filter(date__in=dates).delete()
+        PlatformDailyStats.objects.filter(date__in=dates).delete()
+        EnterpriseDailyStats.objects.bulk_create(enterprise_rows, batch_size=1000)
+        PlatformDailyStats.objects.bulk_create(platform_rows, batch_size=1000)
+    return len(enterprise_rows) + len(platform_rows)
+
+
+def rebuild_daily_stats(dates=None, heartbeat=None):
+    """
+    Ghi đè thống kê của các ngày đã cho (hoặc toàn bộ lịch sử nếu dates=None)
+
+    Mỗi REBUILD_CHUNK_DAYS ngày được xóa rồi tạo lại trong một transaction riêng nên
+    chạy lại bao nhiêu lần cũng cho cùng kết quả; heartbeat (nếu có) được gọi sau mỗi
+    phần để task gia hạn khóa. Mọi dòng dùng chung computed_at là thời điểm bắt đầu,
+    nên thay đổi xảy ra trong lúc đang tính vẫn được lần cập nhật tăng dần sau bắt được.
+    """
+    computed_at = timezone.now()
+    if dates is None:
+        first, today = _first_date(), timezone.localdate()
+        with transaction.atomic():
+            # Ngày ngoài khoảng có dữ liệu (dữ liệu gốc đã bị xóa hết)
+            for model in (EnterpriseDailyStats, PlatformDailyStats):
+                stale = model.objects.all()
+                if first is not None:
+                    stale = stale.exclude(date__range=(first, today))
+                stale.delete()
+        if first is None:
+            return 0
+        dates = [first + timedelta(days=i) for i in range((today - first).days + 1)]
+    else:
+        dates = sorted(set(dates))
+
+    written = 0
+    for start in range(0, len(dates), REBUILD_CHUNK_DAYS):
+        written += _rebuild_dates(dates[start:start + REBUILD_CHUNK_DAYS], computed_at)
+        if heartbeat is not None:
+            heartbeat()
+    return written
+
+
+def changed_dates(since):
+    """Các ngày (theo ngày tạo) có bản ghi được tạo hoặc sửa từ thời điểm since"""
+    UserAccount, PostEntity, Cv, Interview, VnPayTransaction = _models()
+    sources = [
+        (UserAccount, 'created_at'),
+        (PostEntity, 'modified_at'),
+        (Cv, 'modified_at'),
+        (Interview, 'updated_at'),
+        (VnPayTransaction, 'modified_at'),
+    ]
+    dates = set()
+    for model, field in sources:
+        dates.update(
+            model.objects.filter(**{f'{field}__gte': since}).annotate(
+                day=TruncDate('created_at')
+            ).values_list('day', flat=True).distinct()
+        )
+    return dates
+
+
+def update_daily_stats(heartbeat=None):
+    """
+    Cập nhật tăng dần: chỉ tính lại những ngày có dữ liệu thay đổi kể từ lần chạy trước
+
+    Mốc của lần chạy trước là computed_at lớn nhất (ngày hôm nay luôn được tính lại nên mốc
+    luôn tiến lên). Chưa có dữ liệu tổng hợp thì tính toàn bộ. Bản ghi bị xóa không để lại
+    dấu vết nên được xử lý bởi lần tính lại toàn bộ hằng đêm.
+    """
+    since = PlatformDailyStats.objects.aggregate(since=Max('computed_at'))['since']
+    if since is None:
+        return rebuild_daily_stats(heartbeat=heartbeat)
+    return rebuild_daily_stats(changed_dates(since) | {timezone.localdate()}, heartbeat=heartbeat)
+
+
+# ----- Đọc số liệu tổng hợp -----
+
+def enterprise_stats_by_period(enterprise_id, field, period='monthly', from_date=None, to_date=None):
+    """
+    Tổng field theo ngày/tuần/tháng của doanh nghiệp, bỏ các kỳ bằng 0
+
+    Chỉ đọc bảng tổng hợp nên chi phí không phụ thuộc số bài đăng/CV gốc.
+    """
+    queryset = EnterpriseDailyStats.objects.filter(enterprise_id=enterprise_id)
+    if from_date:
+        queryset = queryset.filter(date__gte=from_date)
+    if to_date:
+        queryset = queryset.filter(date__lte=to_date)
+
+    rows = queryset.annotate(
+        period=_period_expression(period)
+    ).values('period').annotate(total=Sum(field)).filter(total__gt=0).order_by('period')
+    return [(row['period'], row['total']) for row in rows]
+
+
+def enterprise_cv_totals(enterprise_id):
+    """Tổng số CV và số CV theo trạng thái của doanh nghiệp"""
+    totals = EnterpriseDailyStats.objects.filter(enterprise_id=enterprise_id).aggregate(
+        total=Sum('cvs_received'),
+        **{status: Sum(f'cvs_{status}') for status in CV_STATUSES}
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+def enterprise_post_performance(enterprise_id, limit=POST_PERFORMANCE_LIMIT):
+    """
+    Các bài đăng nhiều CV nhất của doanh nghiệp kèm số CV được duyệt
+
+    Đếm bằng một truy vấn GROUP BY, sắp xếp và cắt top ngay trong database.
+    """
+    from enterprises.models import PostEntity
+
+    posts = PostEntity.objects.filter(enterprise_id=enterprise_id).annotate(
+        cv_count=Count('cvs'),
+        approved_count=Count('cvs', filter=Q(cvs__status='approved')),
+    ).order_by('-cv_count', '-created_at', '-id').values(
+        'id', 'title', 'created_at', 'cv_count', 'approved_count'
+    )[:limit]
+
+    return [
+        {
+            'post_id': post['id'],
+            'title': post['title'],
+            'created_at': post['created_at'].strftime('%Y-%m-%d'),
+            'cv_count': post['cv_count'],
+            'approved_count': post['approved_count'],
+            # Tỷ lệ chuyển đổi (số CV được duyệt / tổng số CV)
+            'conversion_rate': round(post['approved_count'] / post['cv_count'] * 100, 2) if post['cv_count'] else 0,
+        }
+        for post in posts
+    ]
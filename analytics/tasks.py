@@ -0,0 +1,37 @@
+from celery import shared_task
+from django.core.cache import cache
+
+# Khóa để hai lần chạy (định kỳ và tính lại hằng đêm) không cùng ghi đè một ngày.
+# Khóa được gia hạn sau mỗi nhóm ngày nên thời hạn chỉ cần đủ cho một nhóm, không phụ
+# thuộc độ dài lịch sử; worker chết giữa chừng thì khóa tự hết hạn.
+ROLLUP_LOCK_KEY = 'analytics_daily_stats_lock'
+ROLLUP_LOCK_TIMEOUT = 10 * 60
+
+
+def _run_locked(func):
+    if not cache.add(ROLLUP_LOCK_KEY, 1, ROLLUP_LOCK_TIMEOUT):
+        return None
+    try:
+        return func(heartbeat=lambda: cache.touch(ROLLUP_LOCK_KEY, ROLLUP_LOCK_TIMEOUT))
+    finally:
+        cache.delete(ROLLUP_LOCK_KEY)
+
+
+@shared_task
+def update_daily_stats_task():
+    """
+    Task định kỳ cập nhật bảng thống kê theo ngày cho những ngày có dữ liệu thay đổi
+    """
+    from .services import update_daily_stats
+
+    return _run_locked(update_daily_stats)
+
+
+@shared_task
+def rebuild_daily_stats_task():
+    """
+    Task hằng đêm tính lại toàn bộ bảng thống kê theo ngày (bắt cả các bản ghi đã bị xóa)
+    """
+    from .services import rebuild_daily_stats
+
+    return _run_locked(rebuild_daily_stats)
@@ -1,3 +1,115 @@
+from datetime import timedelta
+from unittest import mock
+
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import UserAccount
+from enterprises.models import EnterpriseEntity, FieldEntity, PositionEntity, PostEntity
+from profiles.models import Cv
+from . import services
+from .models import EnterpriseDailyStats, PlatformDailyStats
+from .services import rebuild_daily_stats, update_daily_stats
+
+
+def snapshot():
+    """Nội dung hai bảng thống kê, bỏ id và computed_at"""
+    return (
+        sorted(
+            tuple(row) for row in EnterpriseDailyStats.objects.values_list(
+                'enterprise_id', 'date', 'posts_created', 'cvs_received', 'cvs_pending',
+                'cvs_approved', 'cvs_rejected', 'interviews_created'
+            )
+        ),
+        sorted(
+            tuple(row) for row in PlatformDailyStats.objects.values_list(
+                'date', 'new_users', 'posts_created', 'cvs_received', 'interviews_created',
+                'transactions', 'successful_transactions', 'revenue'
+            )
+        ),
+    )
+
+
+class DailyStatsRollupTests(TestCase):
+    """Bảng thống kê theo ngày tính tăng dần phải khớp với tính lại toàn bộ"""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.now = timezone.now()
+        self.employer = UserAccount.objects.create(username='employer', email='employer@test.local', is_active=True)
+        self.candidate = UserAccount.objects.create(username='candidate', email='candidate@test.local', is_active=True)
+        field = FieldEntity.objects.create(name='CNTT', code='it', status='active')
+        position = PositionEntity.objects.create(name='Dev', code='dev', field=field, status='active')
+        self.enterprise = EnterpriseEntity.objects.create(
+            company_name='Công ty A', address='Hà Nội', description='', email_company='a@test.local',
+            field_of_activity='CNTT', phone_number='0900000000', scale='10-50', tax='0',
+            user=self.employer, city='Hà Nội'
+        )
+        self.post = PostEntity.objects.create(
+            title='Lập trình viên', enterprise=self.enterprise, position=position, field=field, city='Hà Nội',
+            deadline=self.today + timedelta(days=10), is_active=True
+        )
+        self.cvs = [self.create_cv(days_ago) for days_ago in (40, 40, 3, 0)]
+        # Dữ liệu gốc bắt đầu từ 40 ngày trước
+        UserAccount.objects.update(created_at=self.now - timedelta(days=40))
+        PostEntity.objects.update(created_at=self.now - timedelta(days=40))
+
+    def create_cv(self, days_ago):
+        cv = Cv.objects.create(
+            user=self.candidate, post=self.post, name='Ứng viên', email='candidate@test.local',
+            phone_number='0900000001', description=''
+        )
+        Cv.objects.filter(pk=cv.pk).update(created_at=self.now - timedelta(days=days_ago))
+        return cv
+
+    def test_rebuild_is_idempotent(self):
+        rebuild_daily_stats()
+        first = snapshot()
+        rebuild_daily_stats()
+
+        self.assertEqual(snapshot(), first)
+        platform = PlatformDailyStats.objects.get(date=self.today - timedelta(days=40))
+        self.assertEqual((platform.new_users, platform.posts_created, platform.cvs_received), (2, 1, 2))
+        # Mỗi ngày trong khoảng đều có dòng hệ thống, kể cả ngày không có hoạt động
+        self.assertEqual(PlatformDailyStats.objects.count(), 41)
+
+    def test_chunked_rebuild_matches_single_pass(self):
+        rebuild_daily_stats()
+        expected = snapshot()
+
+        heartbeat = mock.Mock()
+        with mock.patch.object(services, 'REBUILD_CHUNK_DAYS', 7):
+            rebuild_daily_stats(heartbeat=heartbeat)
+
+        self.assertEqual(snapshot(), expected)
+        self.assertEqual(heartbeat.call_count, 6)
+
+    def test_incremental_update_matches_full_rebuild(self):
+        update_daily_stats()
+        self.assertEqual(PlatformDailyStats.objects.count(), 41)
+
+        # Sửa CV của ngày cũ và thêm CV mới sau lần tổng hợp trước
+        old_cv = Cv.objects.get(pk=self.cvs[0].pk)
+        old_cv.status = 'approved'
+        old_cv.save()
+        self.create_cv(0)
+
+        update_daily_stats()
+        incremental = snapshot()
+        rebuild_daily_stats()
+
+        self.assertEqual(incremental, snapshot())
+        stats = EnterpriseDailyStats.objects.get(date=self.today - timedelta(days=40))
+        self.assertEqual((stats.cvs_pending, stats.cvs_approved), (1, 1))
+
+    def test_full_rebuild_removes_days_outside_source_range(self):
+        stale_day = self.today - timedelta(days=100)
+        PlatformDailyStats.objects.create(date=stale_day, new_users=5, computed_at=self.now)
+        EnterpriseDailyStats.objects.create(
+            enterprise=self.enterprise, date=stale_day, posts_created=1, computed_at=self.now
+        )
+
+        rebuild_daily_stats()
 
-# Create your tests here.
+        self.assertFalse(PlatformDailyStats.objects.filter(date=stale_day).exists())
+        self.assertFalse(EnterpriseDailyStats.objects.filter(date=stale_day).exists())
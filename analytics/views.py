@@ -6,14 +6,17 @@ from rest_framework import status
 from django.db.models import Count, Sum, Avg, F, Q, Case, When, Value, IntegerField
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models.functions import TruncMonth, TruncWeek, TruncDay
 from enterprises.models import EnterpriseEntity, PostEntity
-from profiles.models import Cv
 from base.permissions import IsEnterpriseOwner
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.core.cache import cache
-from django.utils.http import urlencode
+from base.cache import get_or_compute, stable_cache_key, tagged_cache_key
+from enterprises.services import enterprise_stats_cache_tag
+from .services import (
+    POST_PERFORMANCE_CACHE_TIMEOUT, POST_PERFORMANCE_LIMIT, POST_PERFORMANCE_MAX_LIMIT,
+    enterprise_cv_totals, enterprise_post_performance, enterprise_stats_by_period
+)
 
 # Create your views here.
 
@@ -70,23 +73,17 @@ def get_enterprise_overview(request):
     if cached_data:
         return Response(cached_data)
     
-    # Thống kê số bài đăng
-    total_posts = PostEntity.objects.filter(enterprise=enterprise).count()
-    active_posts = PostEntity.objects.filter(enterprise=enterprise, is_active=True).count()
-    
-    # Lấy danh sách bài đăng của doanh nghiệp
-    posts = PostEntity.objects.filter(enterprise=enterprise)
-    post_ids = posts.values_list('id', flat=True)
+    # Thống kê số bài đăng (trạng thái hoạt động thay đổi theo thời gian nên đếm trực tiếp)
+    post_totals = PostEntity.objects.filter(enterprise=enterprise).aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+    )
+    total_posts = post_totals['total']
+    active_posts = post_totals['active']
     
-    # Thống kê tổng số CV
-    total_cvs = Cv.objects.filter(post__in=post_ids).count()
-    
-    # Thống kê số CV theo trạng thái
-    cv_status_counts = {
-        'pending': Cv.objects.filter(post__in=post_ids, status='pending').count(),
-        'approved': Cv.objects.filter(post__in=post_ids, status='approved').count(),
-        'rejected': Cv.objects.filter(post__in=post_ids, status='rejected').count(),
-    }
+    # Thống kê số CV theo trạng thái từ bảng thống kê theo ngày
+    cv_status_counts = enterprise_cv_totals(enterprise.id)
+    total_cvs = cv_status_counts.pop('total')
     
     # Tính tỷ lệ chuyển đổi (số CV / số lượt xem bài đăng)
     conversion_rate = 0
@@ -183,47 +180,21 @@ def get_post_stats_by_time(request):
         'from_date': from_date,
         'to_date': to_date
     }
-    cache_key = f'post_stats_time_{urlencode(cache_params)}'
+    cache_key = stable_cache_key('post_stats_time', cache_params)
     cached_data = cache.get(cache_key)
     if cached_data:
         return Response(cached_data)
     
-    # Lọc bài đăng của doanh nghiệp
-    posts_query = PostEntity.objects.filter(enterprise=enterprise)
-    
-    # Lọc theo ngày nếu có
-    if from_date:
-        posts_query = posts_query.filter(created_at__gte=from_date)
-    if to_date:
-        posts_query = posts_query.filter(created_at__lte=to_date)
-    
-    # Nhóm theo khoảng thời gian
-    if period == 'daily':
-        posts_by_period = posts_query.annotate(
-            period=TruncDay('created_at')
-        ).values('period').annotate(
-            post_count=Count('id')
-        ).order_by('period')
-    elif period == 'weekly':
-        posts_by_period = posts_query.annotate(
-            period=TruncWeek('created_at')
-        ).values('period').annotate(
-            post_count=Count('id')
-        ).order_by('period')
-    else:  # monthly
-        posts_by_period = posts_query.annotate(
-            period=TruncMonth('created_at')
-        ).values('period').annotate(
-            post_count=Count('id')
-        ).order_by('period')
+    # Đọc từ bảng thống kê theo ngày (analytics.tasks cập nhật định kỳ)
+    posts_by_period = enterprise_stats_by_period(enterprise.id, 'posts_created', period, from_date, to_date)
     
     # Định dạng kết quả
     result = [
         {
-            'period': item['period'].strftime('%Y-%m-%d'),
-            'post_count': item['post_count']
+            'period': period_start.strftime('%Y-%m-%d'),
+            'post_count': post_count
         }
-        for item in posts_by_period
+        for period_start, post_count in posts_by_period
     ]
     
     data = {
@@ -310,50 +281,21 @@ def get_cv_stats_by_time(request):
         'from_date': from_date,
         'to_date': to_date
     }
-    cache_key = f'cv_stats_time_{urlencode(cache_params)}'
+    cache_key = stable_cache_key('cv_stats_time', cache_params)
     cached_data = cache.get(cache_key)
     if cached_data:
         return Response(cached_data)
     
-    # Lấy ID các bài đăng của doanh nghiệp
-    post_ids = PostEntity.objects.filter(enterprise=enterprise).values_list('id', flat=True)
-    
-    # Lọc CV theo bài đăng của doanh nghiệp
-    cv_query = Cv.objects.filter(post__in=post_ids)
-    
-    # Lọc theo ngày nếu có
-    if from_date:
-        cv_query = cv_query.filter(created_at__gte=from_date)
-    if to_date:
-        cv_query = cv_query.filter(created_at__lte=to_date)
-    
-    # Nhóm theo khoảng thời gian
-    if period == 'daily':
-        cvs_by_period = cv_query.annotate(
-            period=TruncDay('created_at')
-        ).values('period').annotate(
-            cv_count=Count('id')
-        ).order_by('period')
-    elif period == 'weekly':
-        cvs_by_period = cv_query.annotate(
-            period=TruncWeek('created_at')
-        ).values('period').annotate(
-            cv_count=Count('id')
-        ).order_by('period')
-    else:  # monthly
-        cvs_by_period = cv_query.annotate(
-            period=TruncMonth('created_at')
-        ).values('period').annotate(
-            cv_count=Count('id')
-        ).order_by('period')
+    # Đọc từ bảng thống kê theo ngày (analytics.tasks cập nhật định kỳ)
+    cvs_by_period = enterprise_stats_by_period(enterprise.id, 'cvs_received', period, from_date, to_date)
     
     # Định dạng kết quả
     result = [
         {
-            'period': item['period'].strftime('%Y-%m-%d'),
-            'cv_count': item['cv_count']
+            'period': period_start.strftime('%Y-%m-%d'),
+            'cv_count': cv_count
         }
-        for item in cvs_by_period
+        for period_start, cv_count in cvs_by_period
     ]
     
     data = {
@@ -370,7 +312,16 @@ def get_cv_stats_by_time(request):
 # API cho thống kê hiệu suất bài đăng
 @swagger_auto_schema(
     method='get',
-    operation_description="Thống kê hiệu suất các bài đăng",
+    operation_description="Thống kê hiệu suất các bài đăng (các bài đăng nhiều CV nhất)",
+    manual_parameters=[
+        openapi.Parameter(
+            'limit', openapi.IN_QUERY,
+            description=f"Số bài đăng trả về (tối đa {POST_PERFORMANCE_MAX_LIMIT})",
+            type=openapi.TYPE_INTEGER,
+            default=POST_PERFORMANCE_LIMIT,
+            required=False
+        ),
+    ],
     responses={
         200: openapi.Response(
             description="Thành công",
@@ -396,6 +347,7 @@ def get_cv_stats_by_time(request):
                 }
             )
         ),
+        400: openapi.Response(description="limit không hợp lệ"),
         403: openapi.Response(description="Không có quyền truy cập"),
     },
     security=[{'Bearer': []}]
@@ -411,48 +363,30 @@ def get_post_performance(request):
             'status': status.HTTP_403_FORBIDDEN
         }, status=status.HTTP_403_FORBIDDEN)
     
-    # Tạo cache key
-    cache_key = f'post_performance_{enterprise.id}'
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        return Response(cached_data)
-    
-    # Lấy bài đăng của doanh nghiệp
-    posts = PostEntity.objects.filter(enterprise=enterprise)
-    
-    result = []
-    for post in posts:
-        # Đếm số CV cho mỗi bài đăng
-        cv_count = Cv.objects.filter(post=post).count()
-        approved_count = Cv.objects.filter(post=post, status='approved').count()
-        
-        # Tính tỷ lệ chuyển đổi (số CV được duyệt / tổng số CV)
-        conversion_rate = 0
-        if cv_count > 0:
-            conversion_rate = round(approved_count / cv_count * 100, 2)
-        
-        result.append({
-            'post_id': post.id,
-            'title': post.title,
-            'created_at': post.created_at.strftime('%Y-%m-%d'),
-            'cv_count': cv_count,
-            'approved_count': approved_count,
-            'conversion_rate': conversion_rate,
-        })
-    
-    # Sắp xếp theo số lượng CV giảm dần
-    result = sorted(result, key=lambda x: x['cv_count'], reverse=True)
-    
-    data = {
+    try:
+        limit = int(request.query_params.get('limit', POST_PERFORMANCE_LIMIT))
+    except ValueError:
+        return Response({
+            'message': 'limit phải là số nguyên',
+            'status': status.HTTP_400_BAD_REQUEST
+        }, status=status.HTTP_400_BAD_REQUEST)
+    limit = min(max(limit, 1), POST_PERFORMANCE_MAX_LIMIT)
+    
+    # Cache theo doanh nghiệp, bị vô hiệu hóa khi CV của doanh nghiệp được nộp,
+    # đổi trạng thái hoặc bài đăng thay đổi (cùng tag với thống kê doanh nghiệp)
+    cache_key = tagged_cache_key(
+        'post_performance', {'enterprise_id': enterprise.id, 'limit': limit},
+        [enterprise_stats_cache_tag(enterprise.id)]
+    )
+    result = get_or_compute(
+        cache_key, lambda: enterprise_post_performance(enterprise.id, limit), POST_PERFORMANCE_CACHE_TIMEOUT
+    )
+    
+    return Response({
         'message': 'Thống kê hiệu suất các bài đăng',
         'status': status.HTTP_200_OK,
         'data': result
-    }
-    
-    # Lưu vào cache trong 1 giờ
-    cache.set(cache_key, data, timeout=3600)
-    
-    return Response(data)
+    })
 
 # API cho thống kê các tỷ lệ chuyển đổi
 @swagger_auto_schema(
@@ -507,17 +441,10 @@ def get_cv_approval_stats(request):
     if cached_data:
         return Response(cached_data)
     
-    # Lấy ID các bài đăng của doanh nghiệp
-    post_ids = PostEntity.objects.filter(enterprise=enterprise).values_list('id', flat=True)
-    
-    # Thống kê CV theo trạng thái
-    total_cvs = Cv.objects.filter(post__in=post_ids).count()
-    
-    status_counts = {
-        'pending': Cv.objects.filter(post__in=post_ids, status='pending').count(),
-        'approved': Cv.objects.filter(post__in=post_ids, status='approved').count(),
-        'rejected': Cv.objects.filter(post__in=post_ids, status='rejected').count(),
-    }
+    # Thống kê CV theo trạng thái từ bảng thống kê theo ngày
+    cv_totals = enterprise_cv_totals(enterprise.id)
+    total_cvs = cv_totals.pop('total')
+    status_counts = cv_totals
     
     # Tính tỷ lệ
     approval_rate = 0
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+
+TAG_VERSION_PREFIX = 'cache_tag_version'
+SINGLE_FLIGHT_PREFIX = 'single_flight'
+
+# Thời gian tối đa (giây) giữ khóa tính toán và chu kỳ chờ của các request đến sau
+SINGLE_FLIGHT_LOCK_TIMEOUT = 30
+SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+_MISSING = object()
+
+# Các key đang được tính trong process này: key -> Event báo tính xong.
+# Chỉ request cùng key phải chờ, khóa _inflight_lock chỉ giữ trong lúc đọc/ghi dict.
+_inflight = {}
+_inflight_lock = threading.Lock()
+_single_flight_stats = Counter()
+
+
+def stable_cache_key(prefix, params):
+    """
+    Tạo cache key ổn định giữa các worker và các lần khởi động lại
+
+    Khác với hash() của Python (bị salt theo từng process), key được tạo từ
+    md5 của params đã sắp xếp nên luôn giống nhau với cùng một bộ tham số.
+    """
+    raw = json.dumps(params, sort_keys=True, default=str, ensure_ascii=False)
+    return f"{prefix}:{hashlib.md5(raw.encode('utf-8')).hexdigest()}"
+
+
+def _tag_version_key(tag):
+    return f"{TAG_VERSION_PREFIX}:{tag}"
+
+
+def _new_version():
+    # Dùng thời gian thay vì 1 để key cũ không bị dùng lại khi version bị evict
+    return time.time_ns()
+
+
+def get_tag_versions(tags):
+    """Lấy version hiện tại của các tag, khởi tạo nếu chưa có"""
+    keys = [_tag_version_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def tagged_cache_key(prefix, params, tags):
+    """
+    Tạo cache key gắn với version của các tag
+
+    Khi một tag bị invalidate (tăng version), mọi key được tạo với tag đó
+    sẽ tự động không còn được dùng nữa, không cần xóa từng key.
+    """
+    versions = get_tag_versions(tags)
+    return stable_cache_key(prefix, {'params': params, 'tags': dict(zip(tags, versions))})
+
+
+def invalidate_tags(*tags):
+    """Tăng version của các tag để vô hiệu hóa mọi cache key liên quan"""
+    for tag in set(tags):
+        key = _tag_version_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def _compute_and_set(key, compute, timeout):
+    _single_flight_stats['computations'] += 1
+    value = compute()
+    cache.set(key, value, timeout)
+    return value
+
+
+def _get_or_compute_shared(key, compute, timeout, lock_timeout):
+    """Single-flight giữa các worker bằng khóa trong cache (cache.add)"""
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    lock_key = f"{SINGLE_FLIGHT_PREFIX}:{key}"
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            return _compute_and_set(key, compute, timeout)
+        finally:
+            cache.delete(lock_key)
+
+    # Worker khác đang tính, chờ kết quả
+    _single_flight_stats['waits'] += 1
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(SINGLE_FLIGHT_POLL_INTERVAL)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        if not cache.has_key(lock_key):
+            break
+    return _compute_and_set(key, compute, timeout)
+
+
+def get_or_compute(key, compute, timeout, lock_timeout=SINGLE_FLIGHT_LOCK_TIMEOUT):
+    """
+    Đọc cache, nếu miss thì chỉ một request (trên mọi worker) được tính lại giá trị
+
+    Chống cache stampede: các request đến cùng lúc với cùng key sẽ chờ kết quả
+    của request đang tính thay vì cùng chạy truy vấn nặng. Nếu request đang tính
+    bị lỗi hoặc quá lock_timeout, request đang chờ sẽ tự tính.
+    """
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    with _inflight_lock:
+        event = _inflight.get(key)
+        leader = event is None
+        if leader:
+            event = _inflight[key] = threading.Event()
+
+    if not leader:
+        # Thread khác trong process đang xử lý cùng key
+        _single_flight_stats['waits'] += 1
+        event.wait(lock_timeout)
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return _compute_and_set(key, compute, timeout)
+
+    try:
+        return _get_or_compute_shared(key, compute, timeout, lock_timeout)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        event.set()
+
+
+def get_cache_metrics():
+    """Thống kê hit/miss của cache (nếu backend hỗ trợ) và của single-flight trong process này"""
+    metrics = cache.metrics() if hasattr(cache, 'metrics') else {}
+    metrics.update({f'single_flight_{name}': count for name, count in _single_flight_stats.items()})
+    return metrics
+
+
+def reset_cache_metrics():
+    if hasattr(cache, 'reset_metrics'):
+        cache.reset_metrics()
+    _single_flight_stats.clear()
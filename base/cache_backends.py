@@ -0,0 +1,243 @@
+import logging
+import pickle
+import threading
+import time
+from collections import Counter
+
+from cachetools import LRUCache
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.functional import cached_property
+
+try:
+    from redis.exceptions import RedisError
+except ImportError:  # redis là phụ thuộc tùy chọn khi chỉ dùng locmem
+    RedisError = None
+
+logger = logging.getLogger(__name__)
+
+# Lỗi của tầng dùng chung (Redis) được bỏ qua để hệ thống vẫn chạy bằng tầng L1
+SHARED_TIER_ERRORS = tuple(error for error in (RedisError, ConnectionError, TimeoutError) if error)
+
+_MISSING = object()
+
+
+class TieredCache(BaseCache):
+    """
+    Cache hai tầng: L1 trong process (LRU, giới hạn số entry, TTL ngắn) + tầng dùng chung
+
+    - Tầng dùng chung là một alias khác trong CACHES (RedisCache ở production,
+      LocMemCache khi test/dev) nên mọi worker cùng thấy một dữ liệu và cùng bị vô hiệu hóa
+    - L1 giúp các key nóng không phải đi qua mạng; TTL của L1 ngắn để dữ liệu giữa các
+      worker không lệch nhau lâu. Key có tiền tố trong L1_BYPASS_PREFIXES (version của tag
+      cache, khóa single-flight) luôn đọc từ tầng dùng chung
+    - Khi tầng dùng chung lỗi (Redis mất kết nối), cache chỉ chạy bằng L1 thay vì làm lỗi request
+
+    OPTIONS:
+        SHARED_ALIAS: alias của tầng dùng chung (mặc định 'shared')
+        L1_MAX_ENTRIES: số entry tối đa của L1 (mặc định 1000)
+        L1_TIMEOUT: thời gian sống tối đa (giây) của một entry trong L1 (mặc định 5)
+        L1_BYPASS_PREFIXES: danh sách tiền tố key không lưu vào L1
+        SHARED_RETRY_AFTER: số giây bỏ qua tầng dùng chung sau khi lỗi (mặc định 5)
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED_ALIAS', 'shared')
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._l1_bypass_prefixes = tuple(options.get('L1_BYPASS_PREFIXES', ()))
+        self._l1 = LRUCache(maxsize=options.get('L1_MAX_ENTRIES', 1000))
+        self._shared_retry_after = options.get('SHARED_RETRY_AFTER', 5)
+        self._shared_down_until = 0
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    @cached_property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # ----- Thống kê -----
+
+    def _record(self, name, count=1):
+        with self._lock:
+            self._stats[name] += count
+
+    def metrics(self):
+        """Số lần hit/miss theo từng tầng và kích thước hiện tại của L1 (trong process này)"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['l1_size'] = len(self._l1)
+        stats.setdefault('l1_hits', 0)
+        stats.setdefault('shared_hits', 0)
+        stats.setdefault('misses', 0)
+        lookups = stats['l1_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['l1_hits'] + stats['shared_hits']) / lookups, 4) if lookups else None
+        return stats
+
+    def reset_metrics(self):
+        with self._lock:
+            self._stats.clear()
+
+    # ----- Tầng L1 -----
+
+    def _use_l1(self, key):
+        return not key.startswith(self._l1_bypass_prefixes)
+
+    def _l1_key(self, key, version):
+        return self.make_key(key, version=version)
+
+    def _l1_get(self, key, version):
+        l1_key = self._l1_key(key, version)
+        with self._lock:
+            entry = self._l1.get(l1_key)
+            if entry is None:
+                return _MISSING
+            expires_at, payload = entry
+            if expires_at <= time.monotonic():
+                self._l1.pop(l1_key, None)
+                return _MISSING
+        # Lưu dạng pickle để các request không dùng chung (và sửa) cùng một object
+        return pickle.loads(payload)
+
+    def _l1_set(self, key, value, timeout, version):
+        if not self._use_l1(key):
+            return
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is not None:
+            timeout = min(timeout, time.time() + self._l1_timeout) - time.time()
+        else:
+            timeout = self._l1_timeout
+        l1_key = self._l1_key(key, version)
+        if timeout <= 0:
+            self._l1_delete(key, version)
+            return
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[l1_key] = (time.monotonic() + timeout, payload)
+
+    def _l1_delete(self, key, version):
+        with self._lock:
+            self._l1.pop(self._l1_key(key, version), None)
+
+    # ----- Tầng dùng chung -----
+
+    def _shared_available(self):
+        return time.monotonic() >= self._shared_down_until
+
+    def _shared_failed(self, method, error):
+        # Tạm ngắt tầng dùng chung để không mất thời gian kết nối lại ở mọi lệnh
+        self._shared_down_until = time.monotonic() + self._shared_retry_after
+        self._record('shared_errors')
+        logger.warning('Tầng cache dùng chung lỗi khi %s: %s', method, error)
+
+    def _shared_call(self, method, default, *args, **kwargs):
+        if not self._shared_available():
+            return default
+        try:
+            return getattr(self.shared, method)(*args, **kwargs)
+        except SHARED_TIER_ERRORS as e:
+            self._shared_failed(method, e)
+            return default
+
+    # ----- API của Django cache -----
+
+    def get(self, key, default=None, version=None):
+        if self._use_l1(key):
+            value = self._l1_get(key, version)
+            if value is not _MISSING:
+                self._record('l1_hits')
+                return value
+
+        value = self._shared_call('get', _MISSING, key, _MISSING, version=version)
+        if value is _MISSING:
+            self._record('misses')
+            return default
+
+        self._record('shared_hits')
+        self._l1_set(key, value, self._l1_timeout, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remaining = []
+        for key in keys:
+            value = self._l1_get(key, version) if self._use_l1(key) else _MISSING
+            if value is _MISSING:
+                remaining.append(key)
+            else:
+                found[key] = value
+        self._record('l1_hits', len(found))
+
+        if remaining:
+            shared_found = self._shared_call('get_many', {}, remaining, version=version)
+            self._record('shared_hits', len(shared_found))
+            self._record('misses', len(remaining) - len(shared_found))
+            for key, value in shared_found.items():
+                self._l1_set(key, value, self._l1_timeout, version)
+            found.update(shared_found)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        self._record('sets')
+        self._shared_call('set', None, key, value, timeout, version=version)
+        self._l1_set(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        self._record('sets', len(data))
+        failed = self._shared_call('set_many', list(data), data, timeout, version=version)
+        for key, value in data.items():
+            self._l1_set(key, value, timeout, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        # add phải nguyên tử giữa các worker nên chỉ dựa vào tầng dùng chung
+        added = self._shared_call('add', None, key, value, timeout, version=version)
+        if added is None:
+            # Tầng dùng chung lỗi: dùng L1 để vẫn đúng ngữ nghĩa trong process này
+            if self._l1_get(key, version) is not _MISSING:
+                return False
+            self._l1_set(key, value, timeout, version)
+            return True
+        if added:
+            self._l1_set(key, value, timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+        self._l1_delete(key, version)
+        return self._shared_call('touch', False, key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(key, version)
+        return self._shared_call('delete', False, key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._l1_delete(key, version)
+        self._shared_call('delete_many', None, keys, version=version)
+
+    def has_key(self, key, version=None):
+        if self._use_l1(key) and self._l1_get(key, version) is not _MISSING:
+            return True
+        return self._shared_call('has_key', False, key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._l1_delete(key, version)
+        if self._shared_available():
+            try:
+                return self.shared.incr(key, delta, version=version)
+            except SHARED_TIER_ERRORS as e:
+                self._shared_failed('incr', e)
+        raise ValueError("Key '%s' not found" % key)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self._shared_call('clear', None)
+
+    def close(self, **kwargs):
+        self._shared_call('close', None, **kwargs)
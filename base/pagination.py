@@ -1,11 +1,22 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .cache import stable_cache_key
 
 class CustomPagination(PageNumberPagination):
     page_size = 10  # Số lượng item mỗi trang
     page_size_query_param = 'page_size'  # Cho phép client thay đổi page_size qua query param
     max_page_size = 100  # Giới hạn tối đa số lượng item mỗi trang
-    
+
     def get_paginated_response(self, data):
         return Response({
             'message': 'Data retrieved successfully',
@@ -17,4 +28,159 @@ class CustomPagination(PageNumberPagination):
                 'page_size': self.page_size,
                 'results': data
             }
-        }) 
\ No newline at end of file
+        })
+
+
+def _encode_cursor_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Phân trang theo con trỏ (keyset) thay cho OFFSET
+
+    Con trỏ lưu giá trị các cột sắp xếp của bản ghi cuối trang, trang tiếp theo
+    được lấy bằng điều kiện WHERE (created_at, id) < (...) nên tốc độ không phụ
+    thuộc vào độ sâu của trang và tận dụng được index theo created_at.
+    Không đếm COUNT(*) trừ khi client yêu cầu include_total=true (kết quả được cache).
+
+    Sử dụng:
+        paginator = KeysetPagination()
+        posts = paginator.paginate_queryset(queryset, request, ordering=('-created_at', '-id'))
+        return paginator.get_paginated_response(serializer.data)
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    total_query_param = 'include_total'
+    ordering = ('-created_at', '-id')
+    count_cache_timeout = 60
+
+    @classmethod
+    def is_requested(cls, request):
+        """Client dùng phân trang con trỏ khi gửi cursor hoặc pagination=cursor"""
+        return (
+            cls.cursor_query_param in request.query_params
+            or request.query_params.get('pagination') == 'cursor'
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound('Con trỏ phân trang không hợp lệ')
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound('Con trỏ phân trang không hợp lệ')
+        return values
+
+    def encode_cursor(self, instance):
+        values = [_encode_cursor_value(self._get_value(instance, field)) for field in self._fields]
+        raw = json.dumps(values, ensure_ascii=False)
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    @property
+    def _fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    @staticmethod
+    def _get_value(instance, field):
+        if isinstance(instance, dict):
+            return instance[field]
+        return getattr(instance, field)
+
+    def _build_after_filter(self, values):
+        """
+        Điều kiện "đứng sau con trỏ" theo thứ tự từ điển của các cột sắp xếp:
+        (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+        """
+        condition = Q()
+        equal_so_far = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal_so_far & Q(**{f'{name}__{lookup}': value})
+            equal_so_far &= Q(**{name: value})
+        return condition
+
+    def get_total(self, queryset):
+        """Tổng số bản ghi (tùy chọn), được cache ngắn hạn theo câu truy vấn"""
+        cache_key = stable_cache_key('keyset_count', str(queryset.query))
+        total = cache.get(cache_key)
+        if total is None:
+            total = queryset.count()
+            cache.set(cache_key, total, self.count_cache_timeout)
+        return total
+
+    def paginate_queryset(self, queryset, request, view=None, ordering=None):
+        self.request = request
+        if ordering:
+            self.ordering = tuple(ordering)
+        self.page_size = self.get_page_size(request)
+
+        self.total = None
+        if request.query_params.get(self.total_query_param) == 'true':
+            self.total = self.get_total(queryset)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            queryset = queryset.filter(self._build_after_filter(cursor))
+
+        # Lấy dư một bản ghi để biết còn trang tiếp theo hay không
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_cursor = self.encode_cursor(results[-1]) if self.has_next else None
+        return results
+
+    def get_empty_data(self, request):
+        """Dữ liệu trang rỗng cùng định dạng con trỏ (khi biết trước không có kết quả)"""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_cursor = None
+        self.total = 0 if request.query_params.get(self.total_query_param) == 'true' else None
+        return self.get_paginated_data([])
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_data(self, data):
+        paged_data = {
+            'links': {
+                'next': self.get_next_link(),
+                'previous': None,
+            },
+            'next_cursor': self.next_cursor,
+            'page_size': self.page_size,
+            'results': data
+        }
+        if self.total is not None:
+            paged_data['total'] = self.total
+        return paged_data
+
+    def get_paginated_response(self, data):
+        return Response({
+            'message': 'Data retrieved successfully',
+            'status': 200,
+            'data': self.get_paginated_data(data)
+        })
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Message
+from .models import Conversation, Message
 from django.contrib import admin
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
@@ -24,3 +24,12 @@ class MessageAdmin(admin.ModelAdmin):
         return obj.recipient.username if obj.recipient else '-'
     recipient.short_description = 'Người nhận'
 
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user_low', 'user_high', 'last_message_at', 'unread_count_low', 'unread_count_high')
+    search_fields = ('user_low__username', 'user_high__username')
+    ordering = ('-last_message_at',)
+    raw_id_fields = ('user_low', 'user_high', 'last_message')
+    readonly_fields = ('created_at',)
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+
+from channels.db import database_sync_to_async
+from django.contrib.auth import get_user_model
+
+from profiles.services import get_display_names
+from .realtime import typing_event, user_group
+from .services import create_messages, mark_messages_read
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+
+class ChatConsumerMixin:
+    """
+    Nhắn tin realtime qua kết nối WebSocket của NotificationConsumer
+
+    Client (đã xác thực) gửi:
+        {'type': 'chat.send', 'recipient': <id>, 'content': '...', 'client_id': '...'}
+        {'type': 'chat.typing', 'recipient': <id>, 'is_typing': true}
+        {'type': 'chat.read', 'message_ids': [<id>, ...]}
+
+    Tin nhắn gửi và đánh dấu đã đọc được gom lại rồi ghi xuống database theo lô
+    (sau CHAT_FLUSH_INTERVAL giây hoặc khi đủ CHAT_BATCH_SIZE), nên một client gõ nhanh
+    không tạo ra một transaction cho mỗi tin. Người nhận nhận 'new_message', người gửi
+    nhận 'messages_read' qua group user_{id}; trạng thái đang gõ không chạm database.
+    """
+
+    CHAT_FLUSH_INTERVAL = 0.05
+    CHAT_BATCH_SIZE = 50
+    CHAT_MAX_CONTENT_LENGTH = 5000
+    # Chỉ chuyển tiếp 'đang gõ' tới cùng một người nhận tối đa một lần trong khoảng này (giây)
+    TYPING_THROTTLE = 2
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending_sends = []
+        self._pending_reads = set()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+        self._typing_sent_at = {}
+
+    async def receive_chat(self, content):
+        """Xử lý message chat từ client; trả về False nếu không phải message chat"""
+        handlers = {
+            'chat.send': self._receive_chat_send,
+            'chat.typing': self._receive_chat_typing,
+            'chat.read': self._receive_chat_read,
+        }
+        handler = handlers.get(content.get('type'))
+        if handler is None:
+            return False
+        await handler(content)
+        return True
+
+    async def _chat_error(self, message, client_id=None):
+        await self.send_json({'type': 'chat_error', 'client_id': client_id, 'message': message})
+
+    @staticmethod
+    def _parse_user_id(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    async def _receive_chat_send(self, content):
+        client_id = content.get('client_id')
+        recipient_id = self._parse_user_id(content.get('recipient'))
+        text = content.get('content')
+        if recipient_id is None or recipient_id == self.user_id:
+            await self._chat_error('Người nhận không hợp lệ', client_id)
+            return
+        if not isinstance(text, str) or not text.strip():
+            await self._chat_error('Nội dung tin nhắn không được để trống', client_id)
+            return
+        if len(text) > self.CHAT_MAX_CONTENT_LENGTH:
+            await self._chat_error('Nội dung tin nhắn quá dài', client_id)
+            return
+
+        self._pending_sends.append({'recipient_id': recipient_id, 'content': text, 'client_id': client_id})
+        self._schedule_chat_flush()
+
+    async def _receive_chat_read(self, content):
+        message_ids = content.get('message_ids')
+        if not isinstance(message_ids, list):
+            await self._chat_error('message_ids phải là danh sách')
+            return
+        ids = {message_id for message_id in map(self._parse_user_id, message_ids) if message_id is not None}
+        if ids:
+            self._pending_reads.update(ids)
+            self._schedule_chat_flush()
+
+    async def _receive_chat_typing(self, content):
+        recipient_id = self._parse_user_id(content.get('recipient'))
+        if recipient_id is None or recipient_id == self.user_id:
+            return
+        is_typing = bool(content.get('is_typing', True))
+        now = time.monotonic()
+        if is_typing:
+            if now - self._typing_sent_at.get(recipient_id, 0) < self.TYPING_THROTTLE:
+                return
+            self._typing_sent_at[recipient_id] = now
+        else:
+            self._typing_sent_at.pop(recipient_id, None)
+        await self.channel_layer.group_send(
+            user_group(recipient_id),
+            {'type': 'notify', 'data': typing_event(self.user_id, is_typing)}
+        )
+
+    # ----- Ghi theo lô -----
+
+    def _schedule_chat_flush(self):
+        pending = len(self._pending_sends) + len(self._pending_reads)
+        if pending >= self.CHAT_BATCH_SIZE:
+            asyncio.ensure_future(self.flush_chat())
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_chat_later())
+
+    async def _flush_chat_later(self):
+        await asyncio.sleep(self.CHAT_FLUSH_INTERVAL)
+        await self.flush_chat()
+
+    async def flush_chat(self):
+        """Ghi các tin nhắn/đánh dấu đã đọc đang chờ xuống database và trả kết quả cho client"""
+        async with self._flush_lock:
+            sends, self._pending_sends = self._pending_sends, []
+            reads, self._pending_reads = self._pending_reads, set()
+            if not sends and not reads:
+                return
+            try:
+                responses = await self._write_chat_batch(sends, reads)
+            except Exception as e:
+                logger.error(f"Lỗi khi ghi tin nhắn của user {self.user_id}: {str(e)}")
+                responses = [
+                    {'type': 'chat_error', 'client_id': item['client_id'], 'message': 'Không thể gửi tin nhắn'}
+                    for item in sends
+                ]
+
+        for response in responses:
+            await self.send_json(response)
+
+    async def close_chat(self):
+        """Gọi khi ngắt kết nối: ghi nốt những gì còn chờ"""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        if self._pending_sends or self._pending_reads:
+            try:
+                async with self._flush_lock:
+                    sends, self._pending_sends = self._pending_sends, []
+                    reads, self._pending_reads = self._pending_reads, set()
+                    await self._write_chat_batch(sends, reads)
+            except Exception as e:
+                logger.error(f"Lỗi khi ghi tin nhắn còn chờ của user {self.user_id}: {str(e)}")
+
+    @database_sync_to_async
+    def _write_chat_batch(self, sends, reads):
+        responses = []
+        if sends:
+            responses.extend(self._create_pending_messages(sends))
+        if reads:
+            mark_messages_read(self.user_id, reads)
+        return responses
+
+    def _create_pending_messages(self, sends):
+        sender = User.objects.get(pk=self.user_id)
+        # Cùng quy tắc với API send_message: ứng viên cần gói Premium để nhắn tin
+        if not sender.is_employer() and not sender.is_premium:
+            return [{
+                'type': 'chat_error',
+                'client_id': item['client_id'],
+                'message': 'Bạn cần nâng cấp lên gói Premium để có thể nhắn tin với nhà tuyển dụng'
+            } for item in sends]
+
+        existing = set(User.objects.filter(
+            id__in={item['recipient_id'] for item in sends}
+        ).values_list('id', flat=True))
+        valid = [item for item in sends if item['recipient_id'] in existing]
+        responses = [{
+            'type': 'chat_error',
+            'client_id': item['client_id'],
+            'message': 'Người nhận không tồn tại'
+        } for item in sends if item['recipient_id'] not in existing]
+        if not valid:
+            return responses
+
+        sender_name = get_display_names([sender])[sender.id]
+        messages = create_messages(sender, valid, sender_name)
+        responses.extend({
+            'type': 'chat.sent',
+            'client_id': item['client_id'],
+            'message_id': message.id,
+            'recipient_id': message.recipient_id,
+            'created_at': message.created_at.isoformat()
+        } for item, message in zip(valid, messages))
+        return responses
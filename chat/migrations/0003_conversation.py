@@ -0,0 +1,88 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def backfill_conversations(apps, schema_editor):
+    """Tạo cuộc trò chuyện từ lịch sử tin nhắn và gắn tin nhắn vào cuộc trò chuyện"""
+    Message = apps.get_model('chat', 'Message')
+    Conversation = apps.get_model('chat', 'Conversation')
+
+    pairs = {}
+    for row in Message.objects.order_by().values('sender_id', 'recipient_id').annotate(
+        latest_id=Max('id'),
+        unread=Count('id', filter=Q(is_read=False))
+    ):
+        low, high = sorted((row['sender_id'], row['recipient_id']))
+        pair = pairs.setdefault((low, high), {'latest_id': 0, 'unread_low': 0, 'unread_high': 0})
+        pair['latest_id'] = max(pair['latest_id'], row['latest_id'])
+        # Tin chưa đọc được tính cho người nhận
+        if row['recipient_id'] == low:
+            pair['unread_low'] += row['unread']
+        else:
+            pair['unread_high'] += row['unread']
+
+    latest_messages = Message.objects.in_bulk([pair['latest_id'] for pair in pairs.values()])
+    for (low, high), pair in pairs.items():
+        last_message = latest_messages[pair['latest_id']]
+        conversation = Conversation.objects.create(
+            user_low_id=low,
+            user_high_id=high,
+            last_message=last_message,
+            last_message_at=last_message.created_at,
+            unread_count_low=pair['unread_low'],
+            unread_count_high=pair['unread_high']
+        )
+        Message.objects.filter(
+            Q(sender_id=low, recipient_id=high) | Q(sender_id=high, recipient_id=low)
+        ).update(conversation=conversation)
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_alter_message_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_message_at', models.DateTimeField(blank=True, null=True)),
+                ('unread_count_low', models.PositiveIntegerField(default=0)),
+                ('unread_count_high', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.message')),
+                ('user_high', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_high', to=settings.AUTH_USER_MODEL)),
+                ('user_low', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversations_as_low', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Cuộc trò chuyện',
+                'verbose_name_plural': 'Cuộc trò chuyện',
+            },
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='conversation',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='chat.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user_low', '-last_message_at'], name='conversation_low_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user_high', '-last_message_at'], name='conversation_high_inbox_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('user_low', 'user_high'), name='conversation_pair_unique'),
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
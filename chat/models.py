@@ -2,6 +2,62 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+class Conversation(models.Model):
+    """
+    Cuộc trò chuyện giữa hai người dùng
+
+    Cặp người dùng luôn được lưu theo thứ tự user_low.id < user_high.id để mỗi cặp
+    chỉ có một dòng. Tin nhắn mới nhất và số tin chưa đọc của từng người được cập nhật
+    khi gửi/đọc tin nhắn nên hộp thư chỉ cần một truy vấn trên bảng này.
+    """
+    user_low = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name='conversations_as_low'
+    )
+    user_high = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name='conversations_as_high'
+    )
+    last_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    # Số tin nhắn chưa đọc mà user_low / user_high nhận được
+    unread_count_low = models.PositiveIntegerField(default=0)
+    unread_count_high = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Cuộc trò chuyện'
+        verbose_name_plural = 'Cuộc trò chuyện'
+        constraints = [
+            models.UniqueConstraint(fields=['user_low', 'user_high'], name='conversation_pair_unique'),
+        ]
+        indexes = [
+            # Hộp thư của từng người sắp xếp theo tin nhắn mới nhất
+            models.Index(fields=['user_low', '-last_message_at'], name='conversation_low_inbox_idx'),
+            models.Index(fields=['user_high', '-last_message_at'], name='conversation_high_inbox_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_low} - {self.user_high}'
+
+    @staticmethod
+    def ordered_pair(user_a_id, user_b_id):
+        return (user_a_id, user_b_id) if user_a_id <= user_b_id else (user_b_id, user_a_id)
+
+    def partner_id(self, user_id):
+        return self.user_high_id if self.user_low_id == user_id else self.user_low_id
+
+    def unread_count_for(self, user_id):
+        return self.unread_count_low if self.user_low_id == user_id else self.unread_count_high
+
 class Message(models.Model):
     sender = models.ForeignKey(
         get_user_model(), 
@@ -13,6 +69,13 @@ class Message(models.Model):
         on_delete=models.CASCADE,
         related_name='received_messages'
     )
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='messages'
+    )
     content = models.TextField()
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -22,6 +85,12 @@ class Message(models.Model):
         # set name là tên của message
         verbose_name = 'Tin nhắn'
         verbose_name_plural = 'Tin nhắn'
+        indexes = [
+            # Lịch sử tin nhắn của một cặp người dùng theo thời gian (dùng cho cả hai chiều gửi/nhận)
+            models.Index(fields=['sender', 'recipient', 'created_at', 'id'], name='message_pair_time_idx'),
+            # Tin nhắn chưa đọc của người nhận
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='message_unread_idx'),
+        ]
 
     def __str__(self):
         return f'{self.sender} to {self.recipient} at {self.created_at}'
@@ -0,0 +1,51 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    """Group channel của user (NotificationConsumer tham gia sau khi xác thực)"""
+    return f"user_{user_id}"
+
+
+def message_event(message, sender_name):
+    """Dữ liệu 'new_message' gửi cho người nhận (cùng định dạng với signal handle_new_message)"""
+    return {
+        "type": "new_message",
+        "message_id": message.id,
+        "sender_id": message.sender_id,
+        "recipient_id": message.recipient_id,
+        "content": message.content,
+        "is_read": message.is_read,
+        "created_at": message.created_at.isoformat() if message.created_at else None,
+        "sender_name": sender_name
+    }
+
+
+def read_receipt_event(reader_id, message_ids):
+    """Xác nhận đã đọc gửi cho người gửi tin nhắn"""
+    return {
+        "type": "messages_read",
+        "reader_id": reader_id,
+        "message_ids": sorted(message_ids)
+    }
+
+
+def typing_event(sender_id, is_typing):
+    return {
+        "type": "typing",
+        "sender_id": sender_id,
+        "is_typing": bool(is_typing)
+    }
+
+
+def send_to_user(user_id, data):
+    """Đẩy dữ liệu tới mọi kết nối WebSocket của user; lỗi channel layer chỉ được ghi log"""
+    try:
+        channel_layer = get_channel_layer()
+        async_to_sync(channel_layer.group_send)(user_group(user_id), {"type": "notify", "data": data})
+    except Exception as e:
+        logger.error(f"Lỗi khi gửi sự kiện chat qua websocket cho user {user_id}: {e}")
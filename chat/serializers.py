@@ -1,17 +1,43 @@
-from rest_framework.serializers import ModelSerializer, SerializerMethodField
+from rest_framework.serializers import ListSerializer, ModelSerializer, SerializerMethodField
+from profiles.services import get_display_names
 from .models import Message
 
+
+class MessageListSerializer(ListSerializer):
+    """Lấy tên hiển thị của mọi người trong trang tin nhắn bằng một lần truy vấn/cache"""
+
+    def to_representation(self, data):
+        messages = list(data.all() if hasattr(data, 'all') else data)
+        users = [user for message in messages for user in (message.sender, message.recipient)]
+        self.context.setdefault('display_names', {}).update(get_display_names(users))
+        return super().to_representation(messages)
+
+
 class MessageSerializer(ModelSerializer):
     recipient_fullname = SerializerMethodField()
     sender_fullname = SerializerMethodField()
     conversation_partner_fullname = SerializerMethodField()
     conversation_partner_id = SerializerMethodField()
     
+    def _display_name(self, user):
+        return self.context['display_names'][user.id] if user else ''
+    
+    def to_representation(self, instance):
+        # Serialize một tin nhắn đơn lẻ: lấy tên của người gửi và người nhận trong một lần
+        display_names = self.context.setdefault('display_names', {})
+        missing = [
+            user for user in (instance.sender, instance.recipient)
+            if user and user.id not in display_names
+        ]
+        if missing:
+            display_names.update(get_display_names(missing))
+        return super().to_representation(instance)
+    
     def get_recipient_fullname(self, obj):
-        return obj.recipient.get_full_name() if obj.recipient else ''
+        return self._display_name(obj.recipient)
     
     def get_sender_fullname(self, obj):
-        return obj.sender.get_full_name() if obj.sender else ''
+        return self._display_name(obj.sender)
     
     def get_conversation_partner_fullname(self, obj):
         # Lấy thông tin người dùng hiện tại từ context
@@ -20,10 +46,10 @@ class MessageSerializer(ModelSerializer):
             return ''
             
         # Xác định người đối thoại là sender hay recipient
-        if obj.sender.id == request.user.id:
-            return obj.recipient.get_full_name() if obj.recipient else ''
+        if obj.sender_id == request.user.id:
+            return self._display_name(obj.recipient)
         else:
-            return obj.sender.get_full_name() if obj.sender else ''
+            return self._display_name(obj.sender)
     
     def get_conversation_partner_id(self, obj):
         # Lấy thông tin người dùng hiện tại từ context
@@ -32,11 +58,13 @@ class MessageSerializer(ModelSerializer):
             return None
             
         # Xác định người đối thoại là sender hay recipient
-        if obj.sender.id == request.user.id:
-            return obj.recipient.id if obj.recipient else None
+        if obj.sender_id == request.user.id:
+            return obj.recipient_id
         else:
-            return obj.sender.id if obj.sender else None
+            return obj.sender_id
     
     class Meta:
         model = Message
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        read_only_fields = ('conversation',)
+        list_serializer_class = MessageListSerializer
@@ -0,0 +1,164 @@
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Greatest
+
+from .models import Conversation, Message
+from .realtime import message_event, read_receipt_event, send_to_user
+
+
+def get_or_create_conversation(user_a_id, user_b_id):
+    """Lấy (hoặc tạo) cuộc trò chuyện của hai người dùng, an toàn khi gửi đồng thời"""
+    user_low_id, user_high_id = Conversation.ordered_pair(user_a_id, user_b_id)
+    try:
+        with transaction.atomic():
+            conversation, _ = Conversation.objects.get_or_create(
+                user_low_id=user_low_id,
+                user_high_id=user_high_id
+            )
+    except IntegrityError:
+        # Request khác vừa tạo cùng cặp người dùng
+        conversation = Conversation.objects.get(user_low_id=user_low_id, user_high_id=user_high_id)
+    return conversation
+
+
+def _unread_field(conversation, recipient_id):
+    return 'unread_count_low' if conversation.user_low_id == recipient_id else 'unread_count_high'
+
+
+def record_messages(messages):
+    """
+    Gắn các tin nhắn vừa tạo vào cuộc trò chuyện và cập nhật tin nhắn mới nhất,
+    số tin chưa đọc của người nhận (nguyên tử giữa các request nhờ F())
+
+    Tin nhắn được gom theo cặp người dùng nên mỗi cuộc trò chuyện chỉ tốn vài câu
+    UPDATE dù có bao nhiêu tin nhắn.
+    """
+    by_pair = defaultdict(list)
+    for message in messages:
+        by_pair[Conversation.ordered_pair(message.sender_id, message.recipient_id)].append(message)
+
+    with transaction.atomic():
+        for pair_messages in by_pair.values():
+            conversation = get_or_create_conversation(pair_messages[0].sender_id, pair_messages[0].recipient_id)
+            Message.objects.filter(pk__in=[message.pk for message in pair_messages]).update(conversation=conversation)
+
+            latest = max(pair_messages, key=lambda message: message.pk)
+            # Chỉ ghi đè tin nhắn mới nhất nếu tin này mới hơn (khi gửi đồng thời)
+            Conversation.objects.filter(pk=conversation.pk).filter(
+                Q(last_message__isnull=True) | Q(last_message_id__lt=latest.pk)
+            ).update(last_message=latest, last_message_at=latest.created_at)
+
+            unread = Counter(message.recipient_id for message in pair_messages if not message.is_read)
+            if unread:
+                Conversation.objects.filter(pk=conversation.pk).update(**{
+                    _unread_field(conversation, recipient_id): F(_unread_field(conversation, recipient_id)) + count
+                    for recipient_id, count in unread.items()
+                })
+
+            for message in pair_messages:
+                message.conversation = conversation
+
+
+def record_message(message):
+    """Cập nhật cuộc trò chuyện cho một tin nhắn vừa tạo"""
+    record_messages([message])
+    return message.conversation
+
+
+def create_messages(sender, items, sender_name):
+    """
+    Tạo nhiều tin nhắn của cùng một người gửi bằng một câu INSERT (dùng cho WebSocket)
+
+    items là danh sách dict {'recipient_id', 'content'}. bulk_create không gửi signal
+    post_save nên tin nhắn được đẩy realtime cho người nhận sau khi commit.
+    """
+    with transaction.atomic():
+        messages = Message.objects.bulk_create([
+            Message(sender=sender, recipient_id=item['recipient_id'], content=item['content'])
+            for item in items
+        ])
+        record_messages(messages)
+
+        events = [(message.recipient_id, message_event(message, sender_name)) for message in messages]
+        transaction.on_commit(lambda: [send_to_user(user_id, data) for user_id, data in events])
+    return messages
+
+
+def _mark_rows_read(rows, reader_id):
+    """Giảm số tin chưa đọc theo cuộc trò chuyện và báo cho người gửi sau khi commit"""
+    counts = Counter((row['conversation_id'], row['recipient_id']) for row in rows if row['conversation_id'])
+    conversations = Conversation.objects.only('user_low').in_bulk({key[0] for key in counts})
+    for (conversation_id, recipient_id), count in counts.items():
+        conversation = conversations.get(conversation_id)
+        if conversation is None:
+            continue
+        unread_field = _unread_field(conversation, recipient_id)
+        Conversation.objects.filter(pk=conversation_id).update(
+            **{unread_field: Greatest(F(unread_field) - count, Value(0))}
+        )
+
+    by_sender = defaultdict(list)
+    for row in rows:
+        by_sender[row['sender_id']].append(row['id'])
+    transaction.on_commit(lambda: [
+        send_to_user(sender_id, read_receipt_event(reader_id, message_ids))
+        for sender_id, message_ids in by_sender.items()
+    ])
+
+
+def mark_messages_read(user_id, message_ids):
+    """
+    Đánh dấu các tin nhắn user nhận được là đã đọc bằng một câu UPDATE
+
+    Chỉ những tin nhắn thật sự chuyển từ chưa đọc sang đã đọc mới làm giảm bộ đếm
+    và được gửi xác nhận đã đọc, nên gọi lại nhiều lần không làm bộ đếm sai lệch.
+    Trả về danh sách id vừa được đánh dấu.
+    """
+    with transaction.atomic():
+        rows = list(Message.objects.select_for_update().filter(
+            id__in=message_ids,
+            recipient_id=user_id,
+            is_read=False
+        ).values('id', 'sender_id', 'recipient_id', 'conversation_id'))
+        if not rows:
+            return []
+
+        Message.objects.filter(id__in=[row['id'] for row in rows]).update(is_read=True)
+        _mark_rows_read(rows, user_id)
+    return [row['id'] for row in rows]
+
+
+def mark_message_read(message):
+    """
+    Đánh dấu tin nhắn đã đọc và giảm số tin chưa đọc của người nhận
+
+    Chỉ giảm bộ đếm khi tin nhắn thật sự chuyển từ chưa đọc sang đã đọc, nên gọi
+    lại nhiều lần (hoặc đồng thời) không làm bộ đếm sai lệch.
+    """
+    with transaction.atomic():
+        updated = Message.objects.filter(pk=message.pk, is_read=False).update(is_read=True)
+        message.is_read = True
+        if not updated:
+            return False
+
+        _mark_rows_read([{
+            'id': message.pk,
+            'sender_id': message.sender_id,
+            'recipient_id': message.recipient_id,
+            'conversation_id': message.conversation_id
+        }], message.recipient_id)
+    return True
+
+
+def get_inbox(user):
+    """Cuộc trò chuyện của user, mới nhất trước (một truy vấn dùng index hộp thư)"""
+    return Conversation.objects.filter(
+        Q(user_low=user) | Q(user_high=user),
+        last_message__isnull=False
+    ).select_related(
+        'last_message',
+        'last_message__sender',
+        'last_message__recipient'
+    ).order_by('-last_message_at', '-id')
@@ -1,3 +1,81 @@
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import UserAccount
+from .models import Conversation, Message
+from .services import create_messages, get_inbox, mark_message_read, mark_messages_read, record_message
+
+
+def create_user(name):
+    return UserAccount.objects.create(username=name, email=f'{name}@test.local', is_active=True)
+
+
+class ConversationCounterTests(TestCase):
+    """Tin nhắn mới nhất và số tin chưa đọc của Conversation phải khớp với bảng Message"""
+
+    def setUp(self):
+        # Tạo theo thứ tự để high có id lớn hơn low
+        self.low = create_user('low')
+        self.high = create_user('high')
+
+    def send(self, sender, recipient, count=1):
+        return create_messages(
+            sender, [{'recipient_id': recipient.id, 'content': f'tin {i}'} for i in range(count)], sender.username
+        )
+
+    def conversation(self):
+        return Conversation.objects.get()
+
+    def test_one_conversation_per_pair_with_unread_counts(self):
+        self.send(self.low, self.high, 2)
+        latest = self.send(self.high, self.low)[-1]
+
+        conversation = self.conversation()
+        self.assertEqual((conversation.user_low_id, conversation.user_high_id), (self.low.id, self.high.id))
+        self.assertEqual(conversation.unread_count_for(self.high.id), 2)
+        self.assertEqual(conversation.unread_count_for(self.low.id), 1)
+        self.assertEqual(conversation.last_message_id, latest.id)
+        self.assertEqual(conversation.partner_id(self.low.id), self.high.id)
+
+    def test_late_record_does_not_override_newer_last_message(self):
+        # Hai request gửi đồng thời, tin cũ hơn được ghi nhận sau cùng
+        older, newer = Message.objects.bulk_create([
+            Message(sender=self.low, recipient=self.high, content='cũ'),
+            Message(sender=self.low, recipient=self.high, content='mới'),
+        ])
+        record_message(newer)
+        record_message(older)
+
+        conversation = self.conversation()
+        self.assertEqual(conversation.last_message_id, newer.id)
+        self.assertEqual(conversation.unread_count_for(self.high.id), 2)
+
+    def test_mark_messages_read_is_idempotent(self):
+        messages = self.send(self.low, self.high, 3)
+        ids = [message.id for message in messages]
+
+        self.assertEqual(sorted(mark_messages_read(self.high.id, ids[:2])), sorted(ids[:2]))
+        self.assertEqual(self.conversation().unread_count_for(self.high.id), 1)
+
+        # Đọc lại các tin đã đọc không làm giảm bộ đếm thêm
+        self.assertEqual(mark_messages_read(self.high.id, ids[:2]), [])
+        self.assertEqual(mark_messages_read(self.high.id, ids), [ids[2]])
+        self.assertEqual(self.conversation().unread_count_for(self.high.id), 0)
+
+    def test_only_recipient_can_mark_read(self):
+        ids = [message.id for message in self.send(self.low, self.high, 2)]
+
+        self.assertEqual(mark_messages_read(self.low.id, ids), [])
+        self.assertEqual(self.conversation().unread_count_for(self.high.id), 2)
+
+    def test_mark_message_read_decrements_once(self):
+        message = self.send(self.low, self.high, 2)[0]
+
+        self.assertTrue(mark_message_read(message))
+        self.assertFalse(mark_message_read(Message.objects.get(pk=message.pk)))
+        self.assertEqual(self.conversation().unread_count_for(self.high.id), 1)
+
+    def test_inbox_lists_conversation_for_both_users(self):
+        self.send(self.low, self.high)
+
+        self.assertEqual(list(get_inbox(self.low)), [self.conversation()])
+        self.assertEqual(list(get_inbox(self.high)), [self.conversation()])
@@ -2,10 +2,12 @@ from django.shortcuts import render
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.db.models import Q, Max, Subquery, OuterRef
+from django.db.models import Q, Subquery, OuterRef
 from rest_framework import status
+from django.db import transaction
 from .models import Message
 from .serializers import MessageSerializer
+from .services import get_inbox, mark_message_read as mark_read, record_message
 from base.pagination import CustomPagination
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
@@ -38,6 +40,13 @@ from django.db.models.functions import Greatest
             type=openapi.TYPE_INTEGER,
             required=False
         ),
+        openapi.Parameter(
+            'before_id', 
+            openapi.IN_QUERY, 
+            description="Lấy các tin nhắn cũ hơn tin nhắn có ID này (phân trang con trỏ, mới đến cũ). Truyền 0 để lấy trang mới nhất", 
+            type=openapi.TYPE_INTEGER,
+            required=False
+        ),
         openapi.Parameter(
             'order', 
             openapi.IN_QUERY, 
@@ -115,13 +124,62 @@ def get_messages(request):
     messages = Message.objects.filter(
         Q(sender=request.user, recipient_id=conversation_with) |
         Q(recipient=request.user, sender_id=conversation_with)
-    ).order_by('-created_at')
+    ).order_by('-created_at', '-id')
+    
+    # Cuộn ngược lịch sử: lấy các tin nhắn cũ hơn before_id (không dùng OFFSET)
+    if 'before_id' in request.query_params:
+        return _get_messages_before(request, messages)
     
     paginator = CustomPagination()
-    paginated_messages = paginator.paginate_queryset(messages, request)
+    paginated_messages = paginator.paginate_queryset(messages.select_related('sender', 'recipient'), request)
     serializer = MessageSerializer(paginated_messages, many=True, context={'request': request})
     return paginator.get_paginated_response(serializer.data)
 
+def _get_messages_before(request, messages):
+    """
+    Trang tin nhắn cũ hơn tin nhắn before_id của cùng cuộc trò chuyện
+
+    Điều kiện (created_at, id) < (mốc) đi theo index message_pair_time_idx nên
+    mỗi trang tốn thời gian như nhau dù cuộn sâu đến đâu trong lịch sử.
+    """
+    try:
+        before_id = int(request.query_params.get('before_id'))
+        page_size = min(int(request.query_params.get('page_size', CustomPagination.page_size)), CustomPagination.max_page_size)
+    except (TypeError, ValueError):
+        return Response({
+            'message': 'before_id và page_size phải là số nguyên',
+            'status': status.HTTP_400_BAD_REQUEST
+        }, status=status.HTTP_400_BAD_REQUEST)
+    page_size = max(page_size, 1)
+    
+    if before_id > 0:
+        anchor = messages.filter(id=before_id).values('created_at', 'id').first()
+        if not anchor:
+            return Response({
+                'message': 'Message not found',
+                'status': status.HTTP_404_NOT_FOUND
+            }, status=status.HTTP_404_NOT_FOUND)
+        messages = messages.filter(
+            Q(created_at__lt=anchor['created_at']) |
+            Q(created_at=anchor['created_at'], id__lt=anchor['id'])
+        )
+    
+    # Lấy dư một tin nhắn để biết còn tin cũ hơn hay không
+    page = list(messages.select_related('sender', 'recipient')[:page_size + 1])
+    has_more = len(page) > page_size
+    page = page[:page_size]
+    serializer = MessageSerializer(page, many=True, context={'request': request})
+    return Response({
+        'message': 'Data retrieved successfully',
+        'status': status.HTTP_200_OK,
+        'data': {
+            'has_more': has_more,
+            'next_before_id': page[-1].id if has_more else None,
+            'page_size': page_size,
+            'results': serializer.data
+        }
+    })
+
 @swagger_auto_schema(
     method='post',
     operation_description="Gửi tin nhắn mới",
@@ -183,7 +241,10 @@ def send_message(request):
     
     serializer = MessageSerializer(data=request.data)
     if serializer.is_valid():
-        message = serializer.save(sender=request.user)
+        # Tạo tin nhắn và cập nhật cuộc trò chuyện (tin mới nhất, số tin chưa đọc) cùng lúc
+        with transaction.atomic():
+            message = serializer.save(sender=request.user)
+            record_message(message)
         # Re-serialize với context để có thông tin đầy đủ
         result_serializer = MessageSerializer(message, context={'request': request})
         return Response({
@@ -254,7 +315,7 @@ def send_message(request):
 @permission_classes([IsAuthenticated])
 def get_unread_messages(request):
     """Lấy tin nhắn chưa đọc"""
-    messages = Message.objects.filter(recipient=request.user, is_read=False)
+    messages = Message.objects.filter(recipient=request.user, is_read=False).select_related('sender', 'recipient')
     paginator = CustomPagination()
     paginated_messages = paginator.paginate_queryset(messages, request)
     serializer = MessageSerializer(paginated_messages, many=True, context={'request': request})
@@ -293,8 +354,7 @@ def mark_message_read(request, pk):
     """Đánh dấu tin nhắn đã đọc"""
     try:
         message = Message.objects.get(pk=pk)
-        message.is_read = True
-        message.save()
+        mark_read(message)
         return Response({
             'message': 'Message marked as read',
             'status': status.HTTP_200_OK
@@ -308,6 +368,22 @@ def mark_message_read(request, pk):
 @swagger_auto_schema(
     method='get',
     operation_description="Lấy danh sách cuộc trò chuyện",
+    manual_parameters=[
+        openapi.Parameter(
+            'page', 
+            openapi.IN_QUERY, 
+            description="Số trang (không truyền page/page_size thì trả về toàn bộ)", 
+            type=openapi.TYPE_INTEGER,
+            required=False
+        ),
+        openapi.Parameter(
+            'page_size', 
+            openapi.IN_QUERY, 
+            description="Số cuộc trò chuyện mỗi trang", 
+            type=openapi.TYPE_INTEGER,
+            required=False
+        ),
+    ],
     responses={
         200: openapi.Response(
             description="Lấy danh sách cuộc trò chuyện thành công",
@@ -321,8 +397,12 @@ def mark_message_read(request, pk):
                         items=openapi.Schema(
                             type=openapi.TYPE_OBJECT,
                             properties={
+                                'id': openapi.Schema(type=openapi.TYPE_INTEGER),
                                 'sender': openapi.Schema(type=openapi.TYPE_INTEGER),
-                                'recipient': openapi.Schema(type=openapi.TYPE_INTEGER)
+                                'recipient': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'partner_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'unread_count': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'last_message_at': openapi.Schema(type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME),
                             }
                         )
                     )
@@ -336,18 +416,42 @@ def mark_message_read(request, pk):
 @permission_classes([IsAuthenticated])
 def get_conversations(request):
     """Lấy danh sách cuộc trò chuyện"""
-    conversations = Message.objects.filter(
-        Q(sender=request.user) | Q(recipient=request.user)
-    ).values('sender', 'recipient').distinct()
-    return Response({
-        'message': 'Conversations retrieved successfully',
-        'status': status.HTTP_200_OK,
-        'data': conversations
-    })
+    conversations = get_inbox(request.user)
+    
+    def serialize(page):
+        return [
+            {
+                'id': conversation.id,
+                'sender': conversation.last_message.sender_id,
+                'recipient': conversation.last_message.recipient_id,
+                'partner_id': conversation.partner_id(request.user.id),
+                'unread_count': conversation.unread_count_for(request.user.id),
+                'last_message_at': conversation.last_message_at,
+            }
+            for conversation in page
+        ]
+    
+    return _inbox_response(request, conversations, serialize, 'Conversations retrieved successfully')
 
 @swagger_auto_schema(
     method='get',
     operation_description="Lấy tin nhắn mới nhất của mỗi cuộc trò chuyện",
+    manual_parameters=[
+        openapi.Parameter(
+            'page', 
+            openapi.IN_QUERY, 
+            description="Số trang (không truyền page/page_size thì trả về toàn bộ)", 
+            type=openapi.TYPE_INTEGER,
+            required=False
+        ),
+        openapi.Parameter(
+            'page_size', 
+            openapi.IN_QUERY, 
+            description="Số cuộc trò chuyện mỗi trang", 
+            type=openapi.TYPE_INTEGER,
+            required=False
+        ),
+    ],
     responses={
         200: openapi.Response(
             description="Lấy tin nhắn mới nhất thành công",
@@ -367,6 +471,7 @@ def get_conversations(request):
                                 'content': openapi.Schema(type=openapi.TYPE_STRING),
                                 'is_read': openapi.Schema(type=openapi.TYPE_BOOLEAN),
                                 'created_at': openapi.Schema(type=openapi.TYPE_STRING),
+                                'unread_count': openapi.Schema(type=openapi.TYPE_INTEGER),
                             }
                         )
                     )
@@ -380,38 +485,34 @@ def get_conversations(request):
 @permission_classes([IsAuthenticated])
 def get_latest_messages(request):
     """Lấy tin nhắn mới nhất cho mỗi cuộc trò chuyện, data trả thêm thông tin tên của người đối thoại"""
-    user_id = request.user.id
-    
-    # Tìm tin nhắn mới nhất cho mỗi cuộc trò chuyện
-    latest_messages = []
+    # Tin nhắn mới nhất được lưu sẵn trên cuộc trò chuyện nên chỉ cần một truy vấn
+    conversations = get_inbox(request.user)
     
-    # Lấy danh sách các cuộc trò chuyện từ tin nhắn
-    conversations = Message.objects.filter(
-        Q(sender=user_id) | Q(recipient=user_id)
-    ).values(
-        'sender', 'recipient'
-    ).annotate(
-        latest_id=Max('id')
-    ).order_by('-latest_id')
+    def serialize(page):
+        # Truyền request vào context để serializer có thể xác định người dùng hiện tại
+        data = MessageSerializer(
+            [conversation.last_message for conversation in page],
+            many=True,
+            context={'request': request}
+        ).data
+        for item, conversation in zip(data, page):
+            item['unread_count'] = conversation.unread_count_for(request.user.id)
+        return data
     
-    # Lấy tin nhắn mới nhất từ mỗi cuộc trò chuyện
-    for conv in conversations:
-        other_user = conv['recipient'] if conv['sender'] == user_id else conv['sender']
-        
-        # Truy vấn tin nhắn mới nhất giữa người dùng hiện tại và other_user
-        latest_message = Message.objects.filter(
-            Q(sender=user_id, recipient=other_user) | 
-            Q(sender=other_user, recipient=user_id)
-        ).order_by('-created_at').first()
-        
-        if latest_message and latest_message not in latest_messages:
-            latest_messages.append(latest_message)
-    
-    # Truyền request vào context để serializer có thể xác định người dùng hiện tại
-    serializer = MessageSerializer(latest_messages, many=True, context={'request': request})
+    return _inbox_response(request, conversations, serialize, 'Latest messages retrieved successfully')
+
+
+def _inbox_response(request, conversations, serialize, message):
+    """Trả toàn bộ hộp thư, hoặc phân trang khi client gửi page/page_size"""
+    if 'page' in request.query_params or 'page_size' in request.query_params:
+        paginator = CustomPagination()
+        page = paginator.paginate_queryset(conversations, request)
+        response = paginator.get_paginated_response(serialize(page))
+        response.data['message'] = message
+        return response
     
     return Response({
-        'message': 'Latest messages retrieved successfully',
+        'message': message,
         'status': status.HTTP_200_OK,
-        'data': serializer.data
+        'data': serialize(list(conversations))
     }, status=status.HTTP_200_OK)
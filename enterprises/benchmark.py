@@ -0,0 +1,379 @@
+"""
+Bộ đo hiệu năng (benchmark) cho các API nóng của trang tuyển dụng
+
+Được dùng bởi lệnh `python manage.py benchmark_endpoints`:
+- seed_benchmark_data: tạo bộ dữ liệu giả lập theo quy mô cấu hình (dùng bulk_create)
+- run_benchmark: đo độ trễ (p50/p95/p99), số câu truy vấn và bộ nhớ đỉnh cho từng API
+- compare_results: so sánh hai file kết quả JSON giữa các commit
+"""
+import contextlib
+import io
+import math
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import Role, UserAccount, UserRole
+from base.cache import get_cache_metrics, reset_cache_metrics
+from profiles.models import Cv
+from .create_random_posts import get_random_address
+from .models import CriteriaEntity, EnterpriseEntity, FieldEntity, PositionEntity, PostEntity
+from .search import build_enterprise_search_document, build_post_search_document
+from .services import rebuild_recommendation_feed, refresh_related_posts_for_field
+
+# Tiền tố đánh dấu dữ liệu do benchmark tạo ra
+BENCHMARK_PREFIX = 'bench'
+
+# Giá trị ngẫu nhiên cho bài đăng giả lập
+EXPERIENCES = ['Không yêu cầu', 'Dưới 1 năm', '1 năm', '2 năm', '3 năm', 'Trên 5 năm']
+TYPE_WORKINGS = ['Toàn thời gian', 'Bán thời gian', 'Thực tập', 'Remote']
+SCALES = ['1-10', '10-50', '50-100', '100-500', 'Trên 500']
+TITLE_WORDS = ['Nhân viên', 'Chuyên viên', 'Trưởng nhóm', 'Thực tập sinh', 'Kỹ sư', 'Quản lý']
+
+# Các kịch bản đo: (tên API, user thực hiện, hàm tạo URL từ dữ liệu đã seed)
+SCENARIOS = [
+    ('search_posts', None, lambda ctx: '/api/posts/search/'),
+    ('search_posts', 'candidate', lambda ctx: '/api/posts/search/'),
+    ('search_posts', None, lambda ctx: '/api/posts/search/?q=ke toan&page=2'),
+    ('search_posts', 'candidate', lambda ctx: f"/api/posts/search/?all=false&field={ctx['field_id']}"),
+    ('search_posts', None, lambda ctx: '/api/posts/search/?pagination=cursor'),
+    ('get_posts', None, lambda ctx: '/api/posts/?page=5'),
+    ('get_posts', None, lambda ctx: '/api/posts/?pagination=cursor&sort=-salary-max'),
+    ('get_post_detail', None, lambda ctx: f"/api/post/{ctx['post_id']}/"),
+    ('get_post_detail', 'candidate', lambda ctx: f"/api/post/{ctx['post_id']}/"),
+    ('get_recommended_posts', 'candidate', lambda ctx: '/api/posts/recommended/'),
+    ('enterprise_statistics', 'employer', lambda ctx: '/api/statistics/'),
+]
+
+ENDPOINTS = sorted({name for name, _, _ in SCENARIOS})
+
+
+def _get_role(name):
+    role = Role.objects.filter(name=name).first()
+    return role or Role.objects.create(name=name)
+
+
+def _create_users(kind, count, role, password):
+    users = UserAccount.objects.bulk_create([
+        UserAccount(
+            username=f'{BENCHMARK_PREFIX}_{kind}_{i}',
+            email=f'{BENCHMARK_PREFIX}_{kind}_{i}@benchmark.local',
+            password=password,
+            is_active=True
+        )
+        for i in range(count)
+    ])
+    # Một số database không trả về id sau bulk_create nên đọc lại theo username
+    users = list(UserAccount.objects.filter(
+        username__startswith=f'{BENCHMARK_PREFIX}_{kind}_'
+    ).order_by('id'))
+    UserRole.objects.bulk_create([UserRole(user=user, role=role) for user in users])
+    return users
+
+
+def seed_benchmark_data(posts=2000, enterprises=50, candidates=20, cvs_per_post=2, seed=42, stdout=None):
+    """
+    Tạo bộ dữ liệu giả lập cho benchmark
+
+    Dữ liệu được ghi bằng bulk_create (không gửi signal/thông báo), cột search_document
+    và feed gợi ý được tính trực tiếp giống như khi signal và task định kỳ chạy.
+    Nếu dữ liệu benchmark đã tồn tại (chạy lại với --keepdb) thì dùng lại.
+    """
+    if UserAccount.objects.filter(username__startswith=f'{BENCHMARK_PREFIX}_').exists():
+        if stdout:
+            stdout.write('Dữ liệu benchmark đã tồn tại, bỏ qua bước seed')
+        return
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    password = make_password(BENCHMARK_PREFIX)
+
+    fields = []
+    for i in range(max(1, enterprises // 5)):
+        fields.append(FieldEntity.objects.create(
+            name=f'Lĩnh vực {i}', code=f'{BENCHMARK_PREFIX}_field_{i}', status='active'
+        ))
+    positions = []
+    for field in fields:
+        for j in range(4):
+            positions.append(PositionEntity.objects.create(
+                name=f'{field.name} - vị trí {j}',
+                code=f'{field.code}_position_{j}',
+                field=field,
+                status='active'
+            ))
+
+    employers = _create_users('employer', enterprises, _get_role('employer'), password)
+    enterprise_objs = []
+    for i, user in enumerate(employers):
+        address = get_random_address(rng) or {'city': 'Hà Nội'}
+        enterprise = EnterpriseEntity(
+            company_name=f'Công ty Kế Toán Benchmark {i}' if i % 3 == 0 else f'Công ty Công Nghệ Benchmark {i}',
+            address=address.get('detail_address', address['city']),
+            description='Doanh nghiệp giả lập cho benchmark',
+            email_company=user.email,
+            field_of_activity=rng.choice(fields).name,
+            is_active=True,
+            phone_number='0900000000',
+            scale=rng.choice(SCALES),
+            tax=f'{i:010d}',
+            user=user,
+            city=address['city']
+        )
+        enterprise.search_document = build_enterprise_search_document(enterprise)
+        enterprise_objs.append(enterprise)
+    EnterpriseEntity.objects.bulk_create(enterprise_objs, batch_size=500)
+    enterprise_objs = list(EnterpriseEntity.objects.filter(user__in=employers).order_by('id'))
+
+    post_objs = []
+    for i in range(posts):
+        position = rng.choice(positions)
+        enterprise = rng.choice(enterprise_objs)
+        address = get_random_address(rng) or {'city': enterprise.city, 'district': '', 'detail_address': ''}
+        salary_min = rng.randrange(5, 40) * 1000000
+        post = PostEntity(
+            title=f'{rng.choice(TITLE_WORDS)} {position.name}' if i % 4 else f'Nhân viên kế toán {i}',
+            deadline=(now + timedelta(days=rng.randint(-10, 60))).date(),
+            district=address['district'],
+            detail_address=address['detail_address'],
+            experience=rng.choice(EXPERIENCES),
+            enterprise=enterprise,
+            position=position,
+            field=position.field,
+            interest='Lương tháng 13, bảo hiểm đầy đủ',
+            required='Tốt nghiệp đại học, ưu tiên có kinh nghiệm kế toán',
+            description='Mô tả công việc giả lập cho benchmark',
+            salary_min=salary_min,
+            salary_max=salary_min + rng.randrange(1, 20) * 1000000,
+            is_salary_negotiable=rng.random() < 0.2,
+            type_working=rng.choice(TYPE_WORKINGS),
+            city=address['city'],
+            is_active=rng.random() < 0.9
+        )
+        post.search_document = build_post_search_document(post)
+        post_objs.append(post)
+    PostEntity.objects.bulk_create(post_objs, batch_size=500)
+
+    # Dàn đều created_at để phân trang/thống kê theo tháng có dữ liệu thực tế
+    post_ids = list(PostEntity.objects.filter(enterprise__in=enterprise_objs).values_list('id', flat=True))
+    PostEntity.objects.bulk_update([
+        PostEntity(id=post_id, created_at=now - timedelta(minutes=rng.randint(0, 60 * 24 * 180)))
+        for post_id in post_ids
+    ], ['created_at'], batch_size=500)
+
+    candidate_users = _create_users('candidate', candidates, _get_role('candidate'), password)
+    CriteriaEntity.objects.bulk_create([
+        CriteriaEntity(
+            user=user,
+            city=rng.choice(enterprise_objs).city,
+            experience=rng.choice(EXPERIENCES),
+            field=position.field,
+            position=position,
+            scales=rng.choice(SCALES),
+            type_working=rng.choice(TYPE_WORKINGS),
+            salary_min=rng.randrange(5, 20) * 1000000
+        )
+        for user, position in ((user, rng.choice(positions)) for user in candidate_users)
+    ])
+
+    Cv.objects.bulk_create([
+        Cv(
+            user=rng.choice(candidate_users),
+            post_id=post_id,
+            name='Ứng viên benchmark',
+            email='candidate@benchmark.local',
+            phone_number='0900000000',
+            description='CV giả lập',
+            status=rng.choice(['pending', 'approved', 'rejected']),
+            is_viewed=rng.random() < 0.5
+        )
+        for post_id in post_ids
+        for _ in range(cvs_per_post)
+    ], batch_size=1000)
+
+    # Trạng thái ổn định giống production: feed gợi ý và bài đăng liên quan đã được tính sẵn
+    for criteria in CriteriaEntity.objects.filter(user__in=candidate_users):
+        rebuild_recommendation_feed(criteria)
+    for field in fields:
+        refresh_related_posts_for_field(field.id)
+
+    if stdout:
+        stdout.write(
+            f'Đã seed {len(enterprise_objs)} doanh nghiệp, {len(post_ids)} bài đăng, '
+            f'{len(candidate_users)} ứng viên, {len(post_ids) * cvs_per_post} CV'
+        )
+
+
+def get_benchmark_context():
+    """Chọn dữ liệu mẫu (bài đăng, lĩnh vực, user) dùng để tạo URL cho các kịch bản"""
+    post = PostEntity.objects.filter(
+        enterprise__user__username__startswith=f'{BENCHMARK_PREFIX}_',
+        is_active=True,
+        deadline__gte=timezone.now().date()
+    ).order_by('id').first()
+    employer = UserAccount.objects.filter(
+        username__startswith=f'{BENCHMARK_PREFIX}_employer_'
+    ).order_by('id').first()
+    candidate = UserAccount.objects.filter(
+        username__startswith=f'{BENCHMARK_PREFIX}_candidate_'
+    ).order_by('id').first()
+    return {
+        'post_id': post.id if post else 0,
+        'field_id': post.field_id if post else 0,
+        'users': {'employer': employer, 'candidate': candidate},
+    }
+
+
+def percentile(values, percent):
+    """Phân vị theo phương pháp nearest-rank"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _request(client, url):
+    # Các view in thời gian xử lý ra stdout, bỏ qua để không làm nhiễu kết quả
+    with contextlib.redirect_stdout(io.StringIO()):
+        return client.get(url)
+
+
+def measure_scenario(client, url, iterations=30, warmup=3, cold=False):
+    """Đo một URL: độ trễ từng lần gọi, số câu truy vấn và bộ nhớ đỉnh (đo riêng)"""
+    for _ in range(warmup):
+        if cold:
+            cache.clear()
+        _request(client, url)
+
+    latencies = []
+    query_counts = []
+    status_code = None
+    reset_cache_metrics()
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = _request(client, url)
+            latencies.append((time.perf_counter() - started) * 1000)
+        query_counts.append(len(queries))
+        status_code = response.status_code
+
+    cache_metrics = get_cache_metrics()
+
+    # tracemalloc làm chậm chương trình nên bộ nhớ được đo ở một lần gọi riêng
+    if cold:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        _request(client, url)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': status_code,
+        'iterations': iterations,
+        'latency_ms': {
+            'min': round(min(latencies), 3),
+            'mean': round(statistics.mean(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(max(latencies), 3),
+        },
+        'queries': {
+            'min': min(query_counts),
+            'max': max(query_counts),
+            'mean': round(statistics.mean(query_counts), 2),
+        },
+        'peak_memory_kb': round(peak_memory / 1024, 1),
+        'cache': cache_metrics,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(endpoints=None, iterations=30, warmup=3, cold=False, scale=None, stdout=None):
+    """Chạy các kịch bản benchmark và trả về kết quả dạng dict (ghi được ra JSON)"""
+    context = get_benchmark_context()
+    results = {}
+    for name, user_kind, build_url in SCENARIOS:
+        if endpoints and name not in endpoints:
+            continue
+        url = build_url(context)
+        client = APIClient()
+        if user_kind:
+            client.force_authenticate(context['users'][user_kind])
+
+        key = f'{name} {user_kind or "anonymous"} {url}'
+        results[key] = {
+            'endpoint': name,
+            'user': user_kind or 'anonymous',
+            'url': url,
+            **measure_scenario(client, url, iterations=iterations, warmup=warmup, cold=cold)
+        }
+        if stdout:
+            result = results[key]
+            stdout.write(
+                f"{key}: p50={result['latency_ms']['p50']}ms p95={result['latency_ms']['p95']}ms "
+                f"queries={result['queries']['max']} peak={result['peak_memory_kb']}KB status={result['status']}"
+            )
+
+    return {
+        'meta': {
+            'revision': _git_revision(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'cache': settings.CACHES['default']['BACKEND'],
+            'cache_mode': 'cold' if cold else 'warm',
+            'iterations': iterations,
+            'warmup': warmup,
+            'scale': scale or {},
+        },
+        'results': results,
+    }
+
+
+def compare_results(baseline, current):
+    """So sánh hai lần chạy: trả về các dòng mô tả chênh lệch p50/p95, số truy vấn và bộ nhớ"""
+    lines = []
+    for key, result in current['results'].items():
+        old = baseline['results'].get(key)
+        if not old:
+            lines.append(f'{key}: mới (không có trong baseline)')
+            continue
+
+        def change(old_value, new_value):
+            if not old_value:
+                return f'{old_value} -> {new_value}'
+            return f'{old_value} -> {new_value} ({(new_value - old_value) / old_value * 100:+.1f}%)'
+
+        lines.append(
+            f"{key}: p50 {change(old['latency_ms']['p50'], result['latency_ms']['p50'])}, "
+            f"p95 {change(old['latency_ms']['p95'], result['latency_ms']['p95'])}, "
+            f"queries {change(old['queries']['max'], result['queries']['max'])}, "
+            f"peak KB {change(old['peak_memory_kb'], result['peak_memory_kb'])}"
+        )
+    return lines
@@ -0,0 +1,85 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from enterprises.benchmark import ENDPOINTS, compare_results, run_benchmark, seed_benchmark_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Đo hiệu năng các API nóng (search_posts, get_posts, get_post_detail, '
+        'get_recommended_posts, enterprise_statistics) trên bộ dữ liệu giả lập'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=2000, help='Số bài đăng giả lập')
+        parser.add_argument('--enterprises', type=int, default=50, help='Số doanh nghiệp giả lập')
+        parser.add_argument('--candidates', type=int, default=20, help='Số ứng viên giả lập')
+        parser.add_argument('--cvs-per-post', type=int, default=2, help='Số CV cho mỗi bài đăng')
+        parser.add_argument('--seed', type=int, default=42, help='Seed ngẫu nhiên để dữ liệu lặp lại được')
+        parser.add_argument('--iterations', type=int, default=30, help='Số lần đo mỗi kịch bản')
+        parser.add_argument('--warmup', type=int, default=3, help='Số lần gọi làm nóng trước khi đo')
+        parser.add_argument(
+            '--endpoints', default='',
+            help=f'Danh sách API cần đo, cách nhau bởi dấu phẩy ({", ".join(ENDPOINTS)})'
+        )
+        parser.add_argument('--cold', action='store_true', help='Xóa cache trước mỗi lần gọi')
+        parser.add_argument('--output', default='', help='Ghi kết quả ra file JSON')
+        parser.add_argument('--compare', default='', help='File JSON của lần chạy trước để so sánh')
+        parser.add_argument(
+            '--keepdb', action='store_true',
+            help='Giữ lại database benchmark để lần chạy sau không phải seed lại'
+        )
+
+    def handle(self, *args, **options):
+        endpoints = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f'API không hợp lệ: {", ".join(sorted(unknown))}')
+
+        scale = {
+            'posts': options['posts'],
+            'enterprises': options['enterprises'],
+            'candidates': options['candidates'],
+            'cvs_per_post': options['cvs_per_post'],
+            'seed': options['seed'],
+        }
+
+        # Chạy trên database test riêng (giống manage.py test) để không ghi vào dữ liệu thật
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            seed_benchmark_data(
+                posts=options['posts'],
+                enterprises=options['enterprises'],
+                candidates=options['candidates'],
+                cvs_per_post=options['cvs_per_post'],
+                seed=options['seed'],
+                stdout=self.stdout
+            )
+            results = run_benchmark(
+                endpoints=endpoints,
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+                cold=options['cold'],
+                scale=scale,
+                stdout=self.stdout
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Đã ghi kết quả vào {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare'], 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            self.stdout.write(f"So sánh với {options['compare']} ({baseline['meta'].get('revision')}):")
+            for line in compare_results(baseline, results):
+                self.stdout.write(line)
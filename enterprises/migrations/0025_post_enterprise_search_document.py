@@ -0,0 +1,89 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:26
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Bản sao tại thời điểm tạo migration (không import enterprises.search để migration
+# không thay đổi theo code của app)
+POST_SEARCH_INDEX = 'post_search_document_trgm_idx'
+ENTERPRISE_SEARCH_INDEX = 'enterprise_search_document_trgm_idx'
+
+_HTML_TAG_RE = re.compile('<.*?>')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_search_text(text):
+    if not text:
+        return ''
+    text = _HTML_TAG_RE.sub(' ', str(text))
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return _WHITESPACE_RE.sub(' ', text).strip().lower()
+
+
+def backfill_search_documents(apps, schema_editor):
+    EnterpriseEntity = apps.get_model('enterprises', 'EnterpriseEntity')
+    PostEntity = apps.get_model('enterprises', 'PostEntity')
+
+    company_names = {}
+    enterprises = []
+    for enterprise in EnterpriseEntity.objects.only('id', 'company_name', 'field_of_activity', 'description').iterator():
+        company_names[enterprise.id] = enterprise.company_name
+        enterprise.search_document = normalize_search_text(' '.join(filter(None, [
+            enterprise.company_name, enterprise.field_of_activity, enterprise.description
+        ])))
+        enterprises.append(enterprise)
+    EnterpriseEntity.objects.bulk_update(enterprises, ['search_document'], batch_size=500)
+
+    posts = []
+    for post in PostEntity.objects.only('id', 'title', 'required', 'description', 'enterprise_id').iterator():
+        post.search_document = normalize_search_text(' '.join(filter(None, [
+            post.title, company_names.get(post.enterprise_id, ''), post.required, post.description
+        ])))
+        posts.append(post)
+    PostEntity.objects.bulk_update(posts, ['search_document'], batch_size=500)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {POST_SEARCH_INDEX} ON posts USING gin (search_document gin_trgm_ops)'
+    )
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {ENTERPRISE_SEARCH_INDEX} ON enterprises_enterpriseentity '
+        f'USING gin (search_document gin_trgm_ops)'
+    )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {POST_SEARCH_INDEX}')
+    schema_editor.execute(f'DROP INDEX IF EXISTS {ENTERPRISE_SEARCH_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enterprises', '0024_postentity_is_remove_by_admin_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enterpriseentity',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='postentity',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:28
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_priority_coefficient(apps, schema_editor):
+    EnterpriseEntity = apps.get_model('enterprises', 'EnterpriseEntity')
+    PremiumHistory = apps.get_model('transactions', 'PremiumHistory')
+
+    coefficients = {}
+    for row in PremiumHistory.objects.filter(
+        is_active=True,
+        is_cancelled=False,
+        end_date__gt=timezone.now(),
+        package__isnull=False,
+    ).order_by('created_at').values('user_id', 'package__priority_coefficient'):
+        coefficients[row['user_id']] = row['package__priority_coefficient']
+
+    for user_id, coefficient in coefficients.items():
+        if coefficient:
+            EnterpriseEntity.objects.filter(user_id=user_id).update(priority_coefficient=coefficient)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enterprises', '0025_post_enterprise_search_document'),
+        ('transactions', '0010_premiumhistory_premium_status_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enterpriseentity',
+            name='priority_coefficient',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=999, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(backfill_priority_coefficient, migrations.RunPython.noop),
+    ]
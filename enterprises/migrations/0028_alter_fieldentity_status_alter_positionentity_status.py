@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enterprises', '0027_recommendationfeedentity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fieldentity',
+            name='status',
+            field=models.CharField(choices=[('active', 'Hoạt động'), ('inactive', 'Không hoạt động')], default='active', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='positionentity',
+            name='status',
+            field=models.CharField(choices=[('active', 'Hoạt động'), ('inactive', 'Không hoạt động')], default='active', max_length=10),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enterprises', '0028_alter_fieldentity_status_alter_positionentity_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='postentity',
+            index=models.Index(fields=['modified_at'], name='post_modified_idx'),
+        ),
+    ]
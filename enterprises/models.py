@@ -1,6 +1,7 @@
 from datetime import datetime
 from django.db import models
 from accounts.models import UserAccount
+from model_utils import FieldTracker
 import re
 from rest_framework import serializers
 # from .models import ReportPostEntity, PostEntity
@@ -33,6 +34,12 @@ class EnterpriseEntity(models.Model):
     city = models.CharField(max_length=255, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
+    # Nội dung tìm kiếm đã bỏ dấu, được cập nhật bởi signal (enterprises/signals.py)
+    search_document = models.TextField(default='', blank=True, editable=False)
+    # Hệ số ưu tiên của gói Premium đang hoạt động (999 = không có Premium),
+    # được đồng bộ bởi signal của PremiumHistory (transactions/signals.py)
+    priority_coefficient = models.DecimalField(max_digits=10, decimal_places=2, default=999, db_index=True, editable=False)
+    tracker = FieldTracker(fields=['company_name'])
 
     class Meta:
         verbose_name = 'Doanh nghiệp'
@@ -118,6 +125,9 @@ class PostEntity(models.Model):
     modified_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=False, db_index=True)
     is_remove_by_admin = models.BooleanField(default=False, db_index=True)
+    # Nội dung tìm kiếm đã bỏ dấu, được cập nhật bởi signal (enterprises/signals.py)
+    search_document = models.TextField(default='', blank=True, editable=False)
+    tracker = FieldTracker(fields=['field', 'position', 'enterprise', 'is_active'])
     def __str__(self):
         return self.title
 
@@ -141,6 +151,8 @@ class PostEntity(models.Model):
             models.Index(fields=['field', 'city'], name='post_field_city_idx'),
             models.Index(fields=['position', 'city'], name='post_position_city_idx'),
             models.Index(fields=['is_active', 'deadline', 'created_at'], name='post_active_date_created_idx'),
+            # Tác vụ thống kê tìm bài đăng thay đổi từ lần chạy trước (analytics.services.changed_dates)
+            models.Index(fields=['modified_at'], name='post_modified_idx'),
         ]
 
 class CriteriaEntity(models.Model):
@@ -193,4 +205,17 @@ class ReportPostEntity(models.Model):
 
     class Meta:
         verbose_name = 'Báo cáo bài đăng'
-        verbose_name_plural = 'Báo cáo bài đăng'
\ No newline at end of file
+        verbose_name_plural = 'Báo cáo bài đăng'
+
+class RecommendationFeedEntity(models.Model):
+    """Danh sách bài đăng gợi ý đã xếp hạng sẵn cho từng user, được Celery cập nhật"""
+    user = models.OneToOneField(UserAccount, on_delete=models.CASCADE, related_name='recommendation_feed')
+    post_ids = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"Recommendation feed for {self.user.username}"
+
+    class Meta:
+        verbose_name = 'Gợi ý việc làm'
+        verbose_name_plural = 'Gợi ý việc làm'
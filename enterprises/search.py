@@ -0,0 +1,77 @@
+import re
+import unicodedata
+
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import DecimalField, Value
+from django.db.models.functions import Cast
+
+# Tên index trigram trên cột search_document (chỉ tạo trên PostgreSQL)
+POST_SEARCH_INDEX = 'post_search_document_trgm_idx'
+ENTERPRISE_SEARCH_INDEX = 'enterprise_search_document_trgm_idx'
+
+# search_rank có độ chính xác cố định để so sánh bằng với giá trị trong con trỏ phân trang
+# (số thực real của PostgreSQL không giữ nguyên giá trị sau khi qua JSON)
+SEARCH_RANK_FIELD = DecimalField(max_digits=7, decimal_places=6)
+
+_HTML_TAG_RE = re.compile('<.*?>')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_search_text(text):
+    """
+    Chuẩn hóa văn bản để tìm kiếm: bỏ thẻ HTML, bỏ dấu tiếng Việt, chữ thường
+
+    Ví dụ: "Kế Toán" -> "ke toan", "Đà Nẵng" -> "da nang"
+    """
+    if not text:
+        return ''
+    text = _HTML_TAG_RE.sub(' ', str(text))
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if unicodedata.category(ch) != 'Mn')
+    return _WHITESPACE_RE.sub(' ', text).strip().lower()
+
+
+def build_post_search_document(post):
+    """Tạo nội dung tìm kiếm cho bài đăng (tiêu đề, mô tả, yêu cầu, tên công ty)"""
+    company_name = post.enterprise.company_name if post.enterprise_id else ''
+    return normalize_search_text(' '.join(filter(None, [
+        post.title, company_name, post.required, post.description
+    ])))
+
+
+def build_enterprise_search_document(enterprise):
+    """Tạo nội dung tìm kiếm cho doanh nghiệp (tên, lĩnh vực, mô tả)"""
+    return normalize_search_text(' '.join(filter(None, [
+        enterprise.company_name, enterprise.field_of_activity, enterprise.description
+    ])))
+
+
+def trigram_search_enabled():
+    """Chỉ dùng pg_trgm khi database là PostgreSQL"""
+    return connection.vendor == 'postgresql'
+
+
+def search_queryset(queryset, keyword):
+    """
+    Lọc queryset theo từ khóa trên cột search_document và gắn điểm search_rank
+
+    - PostgreSQL: ILIKE được tăng tốc bởi GIN index pg_trgm, xếp hạng bằng
+      TrigramWordSimilarity
+    - Database khác (SQLite khi test): icontains trên cùng cột đã chuẩn hóa,
+      search_rank bằng 0
+    """
+    no_rank = Value(Decimal(0), output_field=SEARCH_RANK_FIELD)
+    term = normalize_search_text(keyword)
+    if not term:
+        return queryset.annotate(search_rank=no_rank)
+
+    queryset = queryset.filter(search_document__icontains=term)
+    if trigram_search_enabled():
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        return queryset.annotate(
+            search_rank=Cast(TrigramWordSimilarity(term, 'search_document'), output_field=SEARCH_RANK_FIELD)
+        )
+    return queryset.annotate(search_rank=no_rank)
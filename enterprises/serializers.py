@@ -9,10 +9,130 @@ def strip_html_tags(text):
         return re.sub(clean, '', text)
     return text
 
+def _context_user(context):
+    request = context.get('request')
+    if request and request.user.is_authenticated:
+        return request.user
+    return None
+
+
+def preload_post_context(context, posts):
+    """
+    Nạp trước dữ liệu theo user cho cả trang bài đăng và lưu vào context của serializer:
+    id bài đăng đã lưu, tiêu chí của user (một lần) và trạng thái premium của doanh nghiệp
+
+    Nhờ vậy serialize một trang chỉ tốn số truy vấn cố định thay vì vài truy vấn mỗi bài đăng.
+    """
+    posts = [post for post in posts if post is not None]
+    user = _context_user(context)
+    if user is not None:
+        post_ids = {post.id for post in posts} - context.setdefault('saved_loaded_ids', set())
+        if post_ids:
+            context.setdefault('saved_post_ids', set()).update(SavedPostEntity.objects.filter(
+                user=user,
+                post_id__in=post_ids
+            ).values_list('post_id', flat=True))
+            context['saved_loaded_ids'].update(post_ids)
+        if 'criteria' not in context:
+            context['criteria'] = CriteriaEntity.objects.filter(user=user).first()
+
+    # Doanh nghiệp chưa được select_related kèm user thì lấy is_premium bằng một truy vấn
+    premium = context.setdefault('enterprise_premium', {})
+    enterprise_ids = {
+        post.enterprise_id for post in posts
+        if post.enterprise_id not in premium and not (
+            PostEntity.enterprise.is_cached(post) and EnterpriseEntity.user.is_cached(post.enterprise)
+        )
+    }
+    if enterprise_ids:
+        premium.update(EnterpriseEntity.objects.filter(id__in=enterprise_ids).values_list('id', 'user__is_premium'))
+
+
+def matches_criteria(criteria, post):
+    """Bài đăng phù hợp với tiêu chí khi đạt tối thiểu 7 điểm (so sánh theo id, không truy vấn thêm)"""
+    score = 0
+
+    # City (4 điểm)
+    if criteria.city and post.city and criteria.city.lower() == post.city.lower():
+        score += 4
+
+    # Experience (3 điểm)
+    if criteria.experience and post.experience and criteria.experience.lower() == post.experience.lower():
+        score += 3
+
+    # Type of working (3 điểm)
+    if criteria.type_working and post.type_working and criteria.type_working.lower() == post.type_working.lower():
+        score += 3
+
+    # Scales (2 điểm)
+    if criteria.scales and post.enterprise and post.enterprise.scale and criteria.scales.lower() == post.enterprise.scale.lower():
+        score += 2
+
+    # Field (5 điểm): field trực tiếp hoặc field qua position
+    if criteria.field_id:
+        if post.field_id == criteria.field_id:
+            score += 5
+        elif post.position_id and post.position.field_id == criteria.field_id:
+            score += 5
+
+    # Position (5 điểm)
+    if criteria.position_id and post.position_id == criteria.position_id:
+        score += 5
+
+    # Salary (3 điểm)
+    if criteria.salary_min and post.salary_min and post.salary_min >= criteria.salary_min:
+        score += 3
+
+    return score >= 7
+
+
+class PostContextListSerializer(serializers.ListSerializer):
+    """Nạp trước dữ liệu theo user cho cả trang trước khi serialize từng bài đăng"""
+
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        preload_post_context(self.context, posts)
+        return super().to_representation(posts)
+
+
+class PostContextMixin:
+    """
+    is_saved / is_enterprise_premium / matches_criteria đọc từ dữ liệu đã nạp trước trong
+    context (xem preload_post_context); khi serialize một bài đăng đơn lẻ thì tự nạp cho bài đó
+    """
+
+    def _post_context(self, obj):
+        if obj.id not in self.context.get('saved_loaded_ids', ()) or 'criteria' not in self.context:
+            preload_post_context(self.context, [obj])
+        return self.context
+
+    def get_is_saved(self, obj):
+        """Kiểm tra xem bài đăng có được lưu bởi người dùng hiện tại không"""
+        if _context_user(self.context) is None:
+            return False
+        return obj.id in self._post_context(obj).get('saved_post_ids', ())
+
+    def get_is_enterprise_premium(self, obj):
+        """Kiểm tra xem doanh nghiệp có phải là premium không"""
+        if EnterpriseEntity.user.is_cached(obj.enterprise):
+            return obj.enterprise.user.is_premium
+        premium = self.context.get('enterprise_premium', {})
+        if obj.enterprise_id not in premium:
+            preload_post_context(self.context, [obj])
+        return self.context['enterprise_premium'][obj.enterprise_id]
+
+    def get_matches_criteria(self, obj):
+        """Kiểm tra xem bài đăng có phù hợp với tiêu chí của người dùng không"""
+        if _context_user(self.context) is None:
+            return False
+        criteria = self._post_context(obj).get('criteria')
+        return bool(criteria) and matches_criteria(criteria, obj)
+
+
 class EnterpriseSerializer(serializers.ModelSerializer):
     class Meta:
         model = EnterpriseEntity
-        fields = '__all__'
+        exclude = ('search_document', 'priority_coefficient')
         read_only_fields = ('user', 'created_at', 'modified_at')
 
 class EnterpriseDetailSerializer(serializers.ModelSerializer):
@@ -42,7 +162,7 @@ class PositionSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('created_at', 'modified_at')
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(PostContextMixin, serializers.ModelSerializer):
     position = serializers.PrimaryKeyRelatedField(queryset=PositionEntity.objects.all())
     field = serializers.PrimaryKeyRelatedField(queryset=FieldEntity.objects.all(), required=False)
     enterprise_name = serializers.CharField(source='enterprise.company_name', read_only=True)
@@ -61,6 +181,7 @@ class PostSerializer(serializers.ModelSerializer):
             'is_saved', 'is_enterprise_premium', 'matches_criteria', 'experience', 'level', 'time_working'
         ]
         read_only_fields = ['created_at', 'is_active', 'is_saved', 'is_enterprise_premium', 'matches_criteria']
+        list_serializer_class = PostContextListSerializer
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -69,72 +190,7 @@ class PostSerializer(serializers.ModelSerializer):
         data['interest'] = strip_html_tags(data.get('interest'))
         return data
 
-    def get_is_saved(self, obj):
-        """Kiểm tra xem bài đăng có được lưu bởi người dùng hiện tại không"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return SavedPostEntity.objects.filter(user=request.user, post=obj).exists()
-        return False
-
-    def get_is_enterprise_premium(self, obj):
-        """Kiểm tra xem doanh nghiệp có phải là premium không"""
-        return obj.enterprise.user.is_premium
-        
-    def get_matches_criteria(self, obj):
-        """Kiểm tra xem bài đăng có phù hợp với tiêu chí của người dùng không"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            try:
-                criteria = CriteriaEntity.objects.get(user=request.user)
-                score = 0
-                
-                # City (4 điểm)
-                if criteria.city and obj.city and criteria.city.lower() == obj.city.lower():
-                    score += 4
-                    
-                # Experience (3 điểm)
-                if criteria.experience and obj.experience and criteria.experience.lower() == obj.experience.lower():
-                    score += 3
-                    
-                # Type of working (3 điểm)
-                if criteria.type_working and obj.type_working and criteria.type_working.lower() == obj.type_working.lower():
-                    score += 3
-                    
-                # Scales (2 điểm)
-                if criteria.scales and obj.enterprise and obj.enterprise.scale and criteria.scales.lower() == obj.enterprise.scale.lower():
-                    score += 2
-                    
-                # Field (5 điểm)
-                if criteria.field:
-                    field_id = criteria.field.id if hasattr(criteria.field, 'id') else criteria.field
-                    
-                    # Kiểm tra field trực tiếp
-                    if obj.field and ((hasattr(obj.field, 'id') and obj.field.id == field_id) or obj.field == field_id):
-                        score += 5
-                    # Kiểm tra field qua position
-                    elif obj.position and obj.position.field and ((hasattr(obj.position.field, 'id') and obj.position.field.id == field_id) or obj.position.field == field_id):
-                        score += 5
-                
-                # Position (5 điểm)
-                if criteria.position:
-                    position_id = criteria.position.id if hasattr(criteria.position, 'id') else criteria.position
-                    
-                    if obj.position and ((hasattr(obj.position, 'id') and obj.position.id == position_id) or obj.position == position_id):
-                        score += 5
-                
-                # Salary (3 điểm)
-                if criteria.salary_min and obj.salary_min and obj.salary_min >= criteria.salary_min:
-                    score += 3
-                
-                # Công việc phù hợp khi điểm đạt tối thiểu 7 điểm
-                return score >= 7
-                
-            except CriteriaEntity.DoesNotExist:
-                pass
-        
-        return False
-
-class PostDetailSerializer(serializers.ModelSerializer):
+class PostDetailSerializer(PostContextMixin, serializers.ModelSerializer):
     position = serializers.PrimaryKeyRelatedField(queryset=PositionEntity.objects.all())
     enterprise_name = serializers.CharField(source='enterprise.company_name', read_only=True)
     enterprise_logo = serializers.CharField(source='enterprise.logo_url', read_only=True)
@@ -152,6 +208,7 @@ class PostDetailSerializer(serializers.ModelSerializer):
             'is_saved', 'is_enterprise_premium', 'matches_criteria', 'experience', 'level', 'time_working'
         ]
         read_only_fields = ['created_at', 'is_active', 'is_saved', 'is_enterprise_premium', 'matches_criteria']
+        list_serializer_class = PostContextListSerializer
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -160,71 +217,6 @@ class PostDetailSerializer(serializers.ModelSerializer):
         data['interest'] = strip_html_tags(data.get('interest'))
         return data
 
-    def get_is_saved(self, obj):
-        """Kiểm tra xem bài đăng có được lưu bởi người dùng hiện tại không"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return SavedPostEntity.objects.filter(user=request.user, post=obj).exists()
-        return False
-
-    def get_is_enterprise_premium(self, obj):
-        """Kiểm tra xem doanh nghiệp có phải là premium không"""
-        return obj.enterprise.user.is_premium
-        
-    def get_matches_criteria(self, obj):
-        """Kiểm tra xem bài đăng có phù hợp với tiêu chí của người dùng không"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            try:
-                criteria = CriteriaEntity.objects.get(user=request.user)
-                score = 0
-                
-                # City (4 điểm)
-                if criteria.city and obj.city and criteria.city.lower() == obj.city.lower():
-                    score += 4
-                    
-                # Experience (3 điểm)
-                if criteria.experience and obj.experience and criteria.experience.lower() == obj.experience.lower():
-                    score += 3
-                    
-                # Type of working (3 điểm)
-                if criteria.type_working and obj.type_working and criteria.type_working.lower() == obj.type_working.lower():
-                    score += 3
-                    
-                # Scales (2 điểm)
-                if criteria.scales and obj.enterprise and obj.enterprise.scale and criteria.scales.lower() == obj.enterprise.scale.lower():
-                    score += 2
-                    
-                # Field (5 điểm)
-                if criteria.field:
-                    field_id = criteria.field.id if hasattr(criteria.field, 'id') else criteria.field
-                    
-                    # Kiểm tra field trực tiếp
-                    if obj.field and ((hasattr(obj.field, 'id') and obj.field.id == field_id) or obj.field == field_id):
-                        score += 5
-                    # Kiểm tra field qua position
-                    elif obj.position and obj.position.field and ((hasattr(obj.position.field, 'id') and obj.position.field.id == field_id) or obj.position.field == field_id):
-                        score += 5
-                
-                # Position (5 điểm)
-                if criteria.position:
-                    position_id = criteria.position.id if hasattr(criteria.position, 'id') else criteria.position
-                    
-                    if obj.position and ((hasattr(obj.position, 'id') and obj.position.id == position_id) or obj.position == position_id):
-                        score += 5
-                
-                # Salary (3 điểm)
-                if criteria.salary_min and obj.salary_min and obj.salary_min >= criteria.salary_min:
-                    score += 3
-                
-                # Công việc phù hợp khi điểm đạt tối thiểu 7 điểm
-                return score >= 7
-                
-            except CriteriaEntity.DoesNotExist:
-                pass
-        
-        return False
-
 class PostEnterpriseSerializer(serializers.ModelSerializer):
     enterprise_name = serializers.CharField(source='enterprise.company_name', read_only=True)
     enterprise_logo = serializers.CharField(source='enterprise.logo_url', read_only=True)
@@ -247,7 +239,7 @@ class PostEnterpriseForEmployerSerializer(serializers.ModelSerializer):
 class PostUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = PostEntity
-        fields = '__all__'
+        exclude = ('search_document',)
         read_only_fields = ('created_at', 'modified_at', 'is_active', 'enterprise', 'position', 'field')
 
 class CriteriaSerializer(serializers.ModelSerializer):
@@ -256,16 +248,21 @@ class CriteriaSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('user', 'created_at', 'modified_at')
 
+class SavedPostListSerializer(serializers.ListSerializer):
+    """Nạp trước dữ liệu theo user cho mọi bài đăng trong trang bài đã lưu"""
+
+    def to_representation(self, data):
+        saved_posts = list(data.all() if hasattr(data, 'all') else data)
+        preload_post_context(self.context, [saved_post.post for saved_post in saved_posts])
+        return super().to_representation(saved_posts)
+
+
 class SavedPostSerializer(serializers.ModelSerializer):
+    # Serializer lồng nhau dùng chung context (request, dữ liệu đã nạp trước) của serializer cha
     post_detail = PostSerializer(source='post', read_only=True)
     
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        # Truyền context cho PostSerializer
-        data['post_detail'] = PostSerializer(instance.post, context=self.context).data
-        return data
-    
     class Meta:
+        list_serializer_class = SavedPostListSerializer
         model = SavedPostEntity
         fields = ['id', 'user', 'post', 'post_detail', 'created_at']
         read_only_fields = ('created_at',)
@@ -274,7 +271,7 @@ class SavedPostSerializer(serializers.ModelSerializer):
             'post': {'write_only': True}
         }
 
-class PostListSerializer(serializers.ModelSerializer):
+class PostListSerializer(PostContextMixin, serializers.ModelSerializer):
     """Serializer để hiển thị danh sách bài đăng liên quan ngắn gọn"""
     position_name = serializers.CharField(source='position.name', read_only=True)
     enterprise_name = serializers.CharField(source='enterprise.company_name', read_only=True)
@@ -282,17 +279,6 @@ class PostListSerializer(serializers.ModelSerializer):
     is_saved = serializers.SerializerMethodField()
     is_enterprise_premium = serializers.SerializerMethodField()
     
-    def get_is_saved(self, obj):
-        """Kiểm tra xem bài đăng có được lưu bởi người dùng hiện tại không"""
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return SavedPostEntity.objects.filter(user=request.user, post=obj).exists()
-        return False
-    
-    def get_is_enterprise_premium(self, obj):
-        """Kiểm tra xem doanh nghiệp có phải là premium không"""
-        return obj.enterprise.user.is_premium
-    
     class Meta:
         model = PostEntity
         fields = [
@@ -300,6 +286,7 @@ class PostListSerializer(serializers.ModelSerializer):
             'is_salary_negotiable', 'city', 'position_name', 'enterprise_name', 
             'enterprise_logo', 'deadline', 'is_saved', 'experience', 'is_enterprise_premium'
         ]
+        list_serializer_class = PostContextListSerializer
 
 
 class ReportPostSerializer(serializers.ModelSerializer):
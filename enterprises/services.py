@@ -0,0 +1,332 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q, F, Case, When, Value, IntegerField, BooleanField
+from django.utils import timezone
+
+from base.cache import get_or_compute, invalidate_tags, tagged_cache_key
+from transactions.models import PremiumHistory
+from .models import EnterpriseEntity, PostEntity, RecommendationFeedEntity
+
+# Hệ số ưu tiên mặc định cho doanh nghiệp không có gói Premium (càng thấp càng ưu tiên)
+DEFAULT_PRIORITY_COEFFICIENT = 999
+
+# Ngưỡng điểm để một bài đăng được coi là phù hợp với tiêu chí
+MATCH_SCORE_THRESHOLD = 7
+
+# Số bài đăng gợi ý trả về và số bài lưu sẵn trong feed (dư ra để bù bài hết hạn)
+RECOMMENDATION_LIMIT = 10
+RECOMMENDATION_FEED_SIZE = 50
+
+# Tag cache cho danh sách/tìm kiếm bài đăng và doanh nghiệp
+# - POSTS_CACHE_TAG: mọi response liên quan bài đăng (thay đổi thứ hạng, doanh nghiệp, vị trí)
+# - POSTS_ALL_CACHE_TAG: response không lọc theo tag chi tiết, đổi khi có bất kỳ bài đăng nào thay đổi
+POSTS_CACHE_TAG = 'posts'
+POSTS_ALL_CACHE_TAG = 'posts:all'
+ENTERPRISES_CACHE_TAG = 'enterprises'
+
+
+# Thời gian cache thống kê doanh nghiệp (giây)
+ENTERPRISE_STATS_CACHE_TIMEOUT = 60
+
+# Số bài đăng liên quan trong trang chi tiết và thời gian cache (giây)
+RELATED_POSTS_LIMIT = 7
+RELATED_POSTS_CACHE_TIMEOUT = 60 * 60 * 2
+# Số bài đăng mới nhất mỗi lĩnh vực được tác vụ định kỳ tính sẵn bài đăng liên quan
+RELATED_POSTS_PRECOMPUTE_LIMIT = 200
+POST_DETAIL_CACHE_TIMEOUT = 60 * 5
+
+
+def enterprise_stats_cache_tag(enterprise_id):
+    return f'enterprise_stats:{enterprise_id}'
+
+
+def post_detail_cache_tag(post_id):
+    return f'post_detail:{post_id}'
+
+
+def post_field_cache_tag(field_id):
+    return f'posts:field:{field_id}'
+
+
+def post_enterprise_cache_tag(enterprise_id):
+    return f'posts:enterprise:{enterprise_id}'
+
+
+def post_search_cache_tags(params):
+    """
+    Chọn tag cho một response tìm kiếm bài đăng
+
+    Các bộ lọc được kết hợp bằng AND, nên chỉ cần một tag của bộ lọc so khớp chính xác
+    là đủ để bắt mọi thay đổi ảnh hưởng tới kết quả. Bộ lọc thành phố là so khớp
+    chuỗi con (icontains) nên không gắn tag riêng mà dùng POSTS_ALL_CACHE_TAG.
+    """
+    field_param = params.get('field', '')
+    if field_param.isdigit():
+        return [POSTS_CACHE_TAG, post_field_cache_tag(int(field_param))]
+    return [POSTS_CACHE_TAG, POSTS_ALL_CACHE_TAG]
+
+
+def get_priority_coefficients(user_ids):
+    """Lấy hệ số ưu tiên của gói Premium đang hoạt động theo user_id"""
+    # Gói mới nhất thắng nếu user có nhiều gói đang hoạt động
+    coefficients = {}
+    for row in PremiumHistory.objects.filter(
+        user_id__in=user_ids,
+        is_active=True,
+        is_cancelled=False,
+        end_date__gt=timezone.now(),
+        package__isnull=False,
+    ).order_by('created_at').values('user_id', 'package__priority_coefficient'):
+        coefficients[row['user_id']] = row['package__priority_coefficient']
+    return {
+        user_id: coefficients.get(user_id) or DEFAULT_PRIORITY_COEFFICIENT
+        for user_id in user_ids
+    }
+
+
+def refresh_enterprise_priority(user_ids):
+    """
+    Tính lại hệ số ưu tiên cho các doanh nghiệp của những user được chỉ định
+
+    Được gọi khi PremiumHistory thay đổi (thanh toán thành công, hủy gói, hết hạn)
+    để cột EnterpriseEntity.priority_coefficient luôn khớp với gói đang hoạt động.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+
+    # Gom user theo hệ số để mỗi giá trị chỉ cần một câu UPDATE
+    users_by_coefficient = {}
+    for user_id, coefficient in get_priority_coefficients(user_ids).items():
+        users_by_coefficient.setdefault(coefficient, []).append(user_id)
+
+    updated = 0
+    with transaction.atomic():
+        for coefficient, ids in users_by_coefficient.items():
+            updated += EnterpriseEntity.objects.filter(user_id__in=ids).exclude(
+                priority_coefficient=coefficient
+            ).update(priority_coefficient=coefficient)
+
+    if updated:
+        # Thứ hạng bài đăng thay đổi nên mọi cache danh sách đều không còn đúng
+        # (sau commit nếu đang nằm trong transaction của nơi gọi)
+        transaction.on_commit(lambda: invalidate_tags(POSTS_CACHE_TAG))
+
+
+def annotate_priority_coefficient(queryset):
+    """
+    Gắn hệ số ưu tiên Premium của doanh nghiệp vào queryset PostEntity
+
+    Đọc trực tiếp cột đã được chuẩn hóa EnterpriseEntity.priority_coefficient
+    nên chỉ cần JOIN, không cần cache hay subquery vào PremiumHistory.
+    """
+    return queryset.annotate(
+        priority_coefficient=F('enterprise__priority_coefficient')
+    ).annotate(
+        is_enterprise_premium=Case(
+            When(priority_coefficient__lt=DEFAULT_PRIORITY_COEFFICIENT, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        )
+    )
+
+
+def _score_when(condition, points):
+    return Case(When(condition, then=Value(points)), default=Value(0), output_field=IntegerField())
+
+
+def annotate_match_score(queryset, criteria=None, params=None):
+    """
+    Tính điểm phù hợp của bài đăng trong database (thay cho vòng lặp Python)
+
+    Điểm được cộng theo tiêu chí của user (nếu có) và theo các tham số tìm kiếm.
+    Bài đăng có điểm >= MATCH_SCORE_THRESHOLD được đánh dấu matches_criteria.
+    """
+    params = params or {}
+    terms = []
+
+    if criteria:
+        if criteria.city:
+            terms.append(_score_when(Q(city__iexact=criteria.city), 4))
+        if criteria.experience:
+            terms.append(_score_when(Q(experience__iexact=criteria.experience), 3))
+        if criteria.type_working:
+            terms.append(_score_when(Q(type_working__iexact=criteria.type_working), 3))
+        if criteria.scales:
+            terms.append(_score_when(Q(enterprise__scale__iexact=criteria.scales), 2))
+        if criteria.field_id:
+            terms.append(_score_when(
+                Q(field_id=criteria.field_id) | Q(position__field_id=criteria.field_id), 5
+            ))
+        if criteria.position_id:
+            terms.append(_score_when(Q(position_id=criteria.position_id), 5))
+        if criteria.salary_min:
+            terms.append(_score_when(Q(salary_min__gte=criteria.salary_min), 3))
+
+    if params.get('city'):
+        terms.append(_score_when(Q(city__iexact=params['city']), 4))
+    if params.get('experience'):
+        terms.append(_score_when(Q(experience__iexact=params['experience']), 3))
+    if params.get('type_working'):
+        terms.append(_score_when(Q(type_working__iexact=params['type_working']), 3))
+    if params.get('scales'):
+        terms.append(_score_when(Q(enterprise__scale__iexact=params['scales']), 2))
+
+    score = Value(0, output_field=IntegerField())
+    for term in terms:
+        score = score + term
+
+    return queryset.annotate(match_score=score).annotate(
+        matches_criteria=Case(
+            When(match_score__gte=MATCH_SCORE_THRESHOLD, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField()
+        )
+    )
+
+
+def filter_recommendation_candidates(queryset, criteria):
+    """
+    Lọc bài đăng bắt buộc phải đáp ứng tiêu chí của user (trong database)
+
+    - Cùng lĩnh vực (trực tiếp hoặc qua vị trí)
+    - Lương thỏa thuận hoặc lương tối thiểu >= mức lương yêu cầu
+    """
+    if not criteria.field_id:
+        return queryset.none()
+    queryset = queryset.filter(Q(field_id=criteria.field_id) | Q(position__field_id=criteria.field_id))
+    if criteria.salary_min is not None and criteria.salary_min > 0:
+        queryset = queryset.filter(Q(is_salary_negotiable=True) | Q(salary_min__gte=criteria.salary_min))
+    return queryset
+
+
+def annotate_recommendation_score(queryset, criteria):
+    """
+    Tính điểm gợi ý việc làm trong database cho các bài đăng đã qua
+    filter_recommendation_candidates (nên luôn có 4 điểm lĩnh vực)
+    """
+    position_q = Q(position_id=criteria.position_id) if criteria.position_id else None
+    city_q = Q(city__iexact=criteria.city) if criteria.city else None
+    has_salary = criteria.salary_min is not None and criteria.salary_min > 0
+
+    terms = [Value(4, output_field=IntegerField())]  # Cùng lĩnh vực
+    if position_q:
+        # Vị trí (3) + thưởng khớp vị trí (1)
+        terms.append(_score_when(position_q, 4))
+        if has_salary:
+            # Thưởng khớp cả lương và vị trí
+            terms.append(_score_when(position_q, 1))
+    if has_salary:
+        # Lương thỏa thuận (1), lương đạt yêu cầu (2)
+        terms.append(Case(
+            When(is_salary_negotiable=True, then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField()
+        ))
+    if city_q:
+        # Thành phố (2) + thưởng khớp thành phố (1)
+        terms.append(_score_when(city_q, 3))
+        if position_q:
+            # Thưởng khớp cả vị trí và thành phố
+            terms.append(_score_when(position_q & city_q, 1))
+    if criteria.type_working:
+        terms.append(_score_when(Q(type_working__iexact=criteria.type_working), 1))
+    if criteria.experience:
+        terms.append(_score_when(Q(experience__iexact=criteria.experience), 1))
+    if criteria.scales:
+        terms.append(_score_when(Q(enterprise__scale__iexact=criteria.scales), 1))
+
+    score = terms[0]
+    for term in terms[1:]:
+        score = score + term
+    return queryset.annotate(recommendation_score=score)
+
+
+def compute_recommended_post_ids(criteria, limit=RECOMMENDATION_FEED_SIZE):
+    """Tính danh sách ID bài đăng gợi ý đã xếp hạng cho một tiêu chí"""
+    posts = filter_recommendation_candidates(PostEntity.objects.filter(
+        is_remove_by_admin=False,
+        is_active=True,
+        deadline__gt=timezone.now()
+    ), criteria)
+    return list(annotate_recommendation_score(posts, criteria).order_by(
+        '-recommendation_score', '-created_at'
+    ).values_list('id', flat=True)[:limit])
+
+
+def rebuild_recommendation_feed(criteria):
+    """Tính lại và lưu feed gợi ý của user sở hữu tiêu chí"""
+    post_ids = compute_recommended_post_ids(criteria)
+    feed, _ = RecommendationFeedEntity.objects.update_or_create(
+        user_id=criteria.user_id,
+        defaults={'post_ids': post_ids}
+    )
+    return feed
+
+
+def related_posts_cache_key(post_id, field_id):
+    """Key cache bài đăng liên quan, tự hết hiệu lực khi bài đăng cùng lĩnh vực thay đổi"""
+    return tagged_cache_key(
+        'related_posts',
+        {'post_id': post_id},
+        [POSTS_CACHE_TAG, post_field_cache_tag(field_id)]
+    )
+
+
+def _related_posts_queryset(field_id):
+    return PostEntity.objects.filter(
+        is_active=True,
+        deadline__gt=timezone.now(),
+        field_id=field_id
+    ).select_related('enterprise', 'enterprise__user', 'field', 'position')
+
+
+def _serialize_related_posts(posts):
+    # is_saved luôn False trong cache, view gắn lại theo user hiện tại
+    from .serializers import PostListSerializer
+    return PostListSerializer(posts, many=True).data
+
+
+def compute_related_posts(post):
+    """Tính danh sách bài đăng liên quan (đã serialize) của một bài đăng"""
+    related_posts = _related_posts_queryset(post.field_id).exclude(id=post.id).annotate(
+        relevance_score=Case(
+            When(position_id=post.position_id, then=Value(3)),
+            When(city=post.city, then=Value(2)),
+            When(enterprise_id=post.enterprise_id, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField()
+        )
+    ).order_by('-relevance_score', '-created_at', '-id')[:RELATED_POSTS_LIMIT]
+    return _serialize_related_posts(list(related_posts))
+
+
+def get_related_posts(post):
+    """Lấy bài đăng liên quan từ cache, tính lại nếu chưa được tính sẵn"""
+    return get_or_compute(
+        related_posts_cache_key(post.id, post.field_id),
+        lambda: compute_related_posts(post),
+        RELATED_POSTS_CACHE_TIMEOUT
+    )
+
+
+def refresh_related_posts(post):
+    """Tính lại và ghi cache bài đăng liên quan của một bài đăng (một truy vấn có LIMIT)"""
+    cache.set(
+        related_posts_cache_key(post.id, post.field_id),
+        compute_related_posts(post),
+        RELATED_POSTS_CACHE_TIMEOUT
+    )
+
+
+def refresh_related_posts_for_field(field_id, limit=RELATED_POSTS_PRECOMPUTE_LIMIT):
+    """
+    Tính sẵn bài đăng liên quan cho các bài đăng mới nhất của một lĩnh vực
+
+    Chỉ limit bài mới nhất được tính sẵn (mỗi bài một truy vấn xếp hạng có LIMIT),
+    các bài cũ hơn được tính khi có người xem.
+    """
+    posts = list(_related_posts_queryset(field_id).order_by('-created_at', '-id')[:limit])
+    for post in posts:
+        refresh_related_posts(post)
+    return len(posts)
@@ -0,0 +1,122 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from base.cache import invalidate_tags
+from .models import CriteriaEntity, EnterpriseEntity, FieldEntity, PositionEntity, PostEntity
+from .search import build_enterprise_search_document, build_post_search_document
+from .tasks import (
+    rebuild_recommendation_feed_task, refresh_recommendation_feeds_for_post, refresh_related_posts_task
+)
+from .services import (
+    ENTERPRISES_CACHE_TAG, POSTS_ALL_CACHE_TAG, POSTS_CACHE_TAG, enterprise_stats_cache_tag,
+    get_priority_coefficients, post_detail_cache_tag, post_enterprise_cache_tag, post_field_cache_tag
+)
+
+
+@receiver(pre_save, sender=PostEntity)
+def update_post_search_document(sender, instance, **kwargs):
+    """Cập nhật nội dung tìm kiếm của bài đăng trước khi lưu"""
+    instance.search_document = build_post_search_document(instance)
+
+
+@receiver(pre_save, sender=EnterpriseEntity)
+def update_enterprise_search_document(sender, instance, **kwargs):
+    """Cập nhật nội dung tìm kiếm của doanh nghiệp trước khi lưu"""
+    instance.search_document = build_enterprise_search_document(instance)
+    if instance._state.adding and instance.user_id:
+        # Doanh nghiệp mới của user đã có Premium thì nhận luôn hệ số ưu tiên
+        instance.priority_coefficient = get_priority_coefficients([instance.user_id])[instance.user_id]
+
+
+@receiver(post_save, sender=EnterpriseEntity)
+def refresh_posts_search_document(sender, instance, created, **kwargs):
+    """Tên công ty thay đổi thì cập nhật lại nội dung tìm kiếm của các bài đăng"""
+    if created or not instance.tracker.has_changed('company_name'):
+        return
+
+    posts = list(instance.posts.only('id', 'title', 'required', 'description', 'enterprise_id'))
+    for post in posts:
+        post.enterprise = instance
+        post.search_document = build_post_search_document(post)
+    PostEntity.objects.bulk_update(posts, ['search_document'], batch_size=500)
+
+
+@receiver(post_save, sender=PostEntity)
+@receiver(post_delete, sender=PostEntity)
+def invalidate_post_cache(sender, instance, **kwargs):
+    """Vô hiệu hóa cache danh sách/tìm kiếm chứa bài đăng vừa thay đổi"""
+    tracker = instance.tracker
+    enterprise_ids = {instance.enterprise_id, tracker.previous('enterprise')}
+    position_ids = {instance.position_id, tracker.previous('position')}
+    field_ids = {instance.field_id, tracker.previous('field')}
+    # Bài đăng cũng được lọc theo lĩnh vực của vị trí
+    field_ids.update(PositionEntity.objects.filter(
+        id__in=[pid for pid in position_ids if pid]
+    ).values_list('field_id', flat=True))
+
+    tags = [POSTS_ALL_CACHE_TAG, post_detail_cache_tag(instance.id)]
+    tags += [post_enterprise_cache_tag(eid) for eid in enterprise_ids if eid]
+    tags += [enterprise_stats_cache_tag(eid) for eid in enterprise_ids if eid]
+    tags += [post_field_cache_tag(fid) for fid in field_ids if fid]
+    # Vô hiệu hóa sau commit: request đọc giữa chừng sẽ cache dữ liệu cũ dưới version tag mới
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+    # Chỉ tính sẵn danh sách liên quan của chính bài đăng này; danh sách của các bài
+    # cùng lĩnh vực đã hết hiệu lực theo tag và được tính lại khi có người xem
+    if kwargs.get('signal') is post_save and instance.field_id:
+        transaction.on_commit(lambda: refresh_related_posts_task.delay(instance.id))
+
+
+@receiver(post_save, sender='profiles.Cv')
+@receiver(post_delete, sender='profiles.Cv')
+def invalidate_enterprise_stats_on_cv_change(sender, instance, **kwargs):
+    """CV được nộp, đổi trạng thái hoặc bị xóa thì thống kê doanh nghiệp không còn đúng"""
+    # Số ứng viên trong chi tiết bài đăng cũng thay đổi
+    tags = [post_detail_cache_tag(instance.post_id)]
+    if sender.post.is_cached(instance):
+        enterprise_id = instance.post.enterprise_id
+    else:
+        enterprise_id = PostEntity.objects.filter(id=instance.post_id).values_list('enterprise_id', flat=True).first()
+    if enterprise_id:
+        tags.append(enterprise_stats_cache_tag(enterprise_id))
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+@receiver(post_save, sender='interviews.Interview')
+@receiver(post_delete, sender='interviews.Interview')
+def invalidate_enterprise_stats_on_interview_change(sender, instance, **kwargs):
+    """Lịch phỏng vấn thay đổi thì thống kê doanh nghiệp không còn đúng"""
+    tag = enterprise_stats_cache_tag(instance.enterprise_id)
+    transaction.on_commit(lambda: invalidate_tags(tag))
+
+
+@receiver(post_save, sender=EnterpriseEntity)
+@receiver(post_delete, sender=EnterpriseEntity)
+@receiver(post_save, sender=PositionEntity)
+@receiver(post_delete, sender=PositionEntity)
+@receiver(post_save, sender=FieldEntity)
+@receiver(post_delete, sender=FieldEntity)
+def invalidate_listing_cache(sender, instance, **kwargs):
+    """Thông tin doanh nghiệp/vị trí/lĩnh vực xuất hiện trong mọi kết quả nên vô hiệu hóa toàn bộ"""
+    transaction.on_commit(lambda: invalidate_tags(POSTS_CACHE_TAG, ENTERPRISES_CACHE_TAG))
+
+
+@receiver(post_save, sender=CriteriaEntity)
+def schedule_feed_rebuild_on_criteria_change(sender, instance, **kwargs):
+    """Tiêu chí thay đổi thì tính lại feed gợi ý của user ở background"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: rebuild_recommendation_feed_task.delay(user_id))
+
+
+@receiver(post_save, sender=PostEntity)
+def schedule_feed_refresh_on_post_publish(sender, instance, created, **kwargs):
+    """Bài đăng mới được đăng (hoặc đổi lĩnh vực) thì cập nhật feed của các user cùng lĩnh vực"""
+    if not instance.is_active or instance.is_remove_by_admin:
+        return
+    tracker = instance.tracker
+    if not (created or tracker.has_changed('is_active') or tracker.has_changed('field')
+            or tracker.has_changed('position')):
+        return
+    post_id = instance.id
+    transaction.on_commit(lambda: refresh_recommendation_feeds_for_post.delay(post_id))
@@ -0,0 +1,101 @@
+from celery import shared_task
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
+
+
+@shared_task
+def rebuild_recommendation_feed_task(user_id):
+    """
+    Task tính lại feed gợi ý việc làm của một user (khi tiêu chí thay đổi)
+    """
+    from .models import CriteriaEntity
+    from .services import rebuild_recommendation_feed
+
+    criteria = CriteriaEntity.objects.filter(user_id=user_id).first()
+    if criteria:
+        rebuild_recommendation_feed(criteria)
+
+
+@shared_task
+def refresh_recommendation_feeds_for_post(post_id):
+    """
+    Task cập nhật feed gợi ý của các user cùng lĩnh vực khi có bài đăng mới được đăng
+    """
+    from .models import CriteriaEntity, PostEntity
+    from .services import rebuild_recommendation_feed
+
+    post = PostEntity.objects.select_related('position').filter(id=post_id).first()
+    if not post:
+        return 0
+
+    field_ids = {post.field_id, post.position.field_id if post.position else None} - {None}
+    if not field_ids:
+        return 0
+
+    # Chỉ những user có tiêu chí cùng lĩnh vực mới bị ảnh hưởng
+    criteria_list = CriteriaEntity.objects.filter(field_id__in=field_ids)
+    if not post.is_salary_negotiable:
+        criteria_list = criteria_list.filter(Q(salary_min__isnull=True) | Q(salary_min__lte=post.salary_min))
+
+    count = 0
+    for criteria in criteria_list.iterator():
+        rebuild_recommendation_feed(criteria)
+        count += 1
+    return count
+
+
+@shared_task
+def rebuild_stale_recommendation_feeds():
+    """
+    Task định kỳ tính lại các feed gợi ý cũ hơn 1 ngày (loại bỏ bài đăng đã hết hạn)
+    """
+    from .models import CriteriaEntity
+    from .services import rebuild_recommendation_feed
+
+    stale_before = timezone.now() - timedelta(days=1)
+    criteria_list = CriteriaEntity.objects.filter(
+        Q(user__recommendation_feed__isnull=True) |
+        Q(user__recommendation_feed__updated_at__lt=stale_before)
+    )
+
+    count = 0
+    for criteria in criteria_list.iterator():
+        rebuild_recommendation_feed(criteria)
+        count += 1
+    return count
+
+
+@shared_task
+def refresh_related_posts_task(post_id):
+    """
+    Task tính sẵn bài đăng liên quan của bài đăng vừa thay đổi
+
+    Các bài đăng khác cùng lĩnh vực chỉ bị vô hiệu hóa cache (theo tag) và được tính
+    lại khi có người xem hoặc ở lần chạy định kỳ.
+    """
+    from .models import PostEntity
+    from .services import refresh_related_posts
+
+    post = PostEntity.objects.filter(id=post_id, field__isnull=False).first()
+    if not post:
+        return 0
+    refresh_related_posts(post)
+    return 1
+
+
+@shared_task
+def refresh_all_related_posts():
+    """
+    Task định kỳ tính lại bài đăng liên quan của mọi lĩnh vực (loại bỏ bài đăng đã hết hạn)
+    """
+    from .models import PostEntity
+    from .services import refresh_related_posts_for_field
+
+    field_ids = PostEntity.objects.filter(
+        is_active=True,
+        deadline__gt=timezone.now(),
+        field__isnull=False
+    ).order_by().values_list('field_id', flat=True).distinct()
+
+    return sum(refresh_related_posts_for_field(field_id) for field_id in list(field_ids))
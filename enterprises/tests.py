@@ -1,3 +1,143 @@
+from datetime import timedelta
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import UserAccount
+from base.cache import get_tag_versions, tagged_cache_key
+from .models import EnterpriseEntity, FieldEntity, PositionEntity, PostEntity
+from .services import (
+    POSTS_ALL_CACHE_TAG, enterprise_stats_cache_tag, post_detail_cache_tag,
+    post_enterprise_cache_tag, post_field_cache_tag
+)
+
+
+def create_enterprise(name):
+    user = UserAccount.objects.create(username=name, email=f'{name}@test.local', is_active=True)
+    return EnterpriseEntity.objects.create(
+        company_name=f'Công ty {name}', address='Hà Nội', description='', email_company=user.email,
+        field_of_activity='CNTT', phone_number='0900000000', scale='10-50', tax='0', user=user, city='Hà Nội'
+    )
+
+
+class PostCacheInvalidationTests(TestCase):
+    """Lưu/xóa bài đăng phải vô hiệu hóa đúng các tag cache liên quan"""
+
+    def setUp(self):
+        cache.clear()
+        self.field = FieldEntity.objects.create(name='CNTT', code='it', status='active')
+        self.other_field = FieldEntity.objects.create(name='Kế toán', code='acc', status='active')
+        self.position = PositionEntity.objects.create(name='Dev', code='dev', field=self.field, status='active')
+        self.enterprise = create_enterprise('a')
+        self.other_enterprise = create_enterprise('b')
+        self.post = PostEntity.objects.create(
+            title='Lập trình viên', enterprise=self.enterprise, position=self.position, field=self.field,
+            city='Hà Nội', deadline=(timezone.now() + timedelta(days=10)).date(), is_active=True
+        )
+
+    def tags(self, *extra):
+        return [
+            POSTS_ALL_CACHE_TAG,
+            post_detail_cache_tag(self.post.id),
+            post_enterprise_cache_tag(self.enterprise.id),
+            enterprise_stats_cache_tag(self.enterprise.id),
+            post_field_cache_tag(self.field.id),
+            *extra
+        ]
+
+    def assertAllChanged(self, tags, before):
+        after = get_tag_versions(tags)
+        for tag, old, new in zip(tags, before, after):
+            self.assertNotEqual(old, new, f'tag {tag} không được vô hiệu hóa')
+
+    def test_save_invalidates_post_tags(self):
+        tags = self.tags()
+        before = get_tag_versions(tags)
+        key = tagged_cache_key('search_posts_results', {'q': 'dev'}, tags)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Lập trình viên Python'
+            self.post.save()
+
+        self.assertAllChanged(tags, before)
+        self.assertNotEqual(key, tagged_cache_key('search_posts_results', {'q': 'dev'}, tags))
+
+    def test_invalidation_waits_for_commit(self):
+        tags = self.tags()
+        before = get_tag_versions(tags)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Lập trình viên Java'
+            self.post.save()
+            # Request đọc trước khi commit không được cache dữ liệu cũ dưới version tag mới
+            self.assertEqual(get_tag_versions(tags), before)
+
+        self.assertAllChanged(tags, before)
+
+    def test_moving_post_invalidates_old_and_new_owner(self):
+        tags = self.tags(
+            post_enterprise_cache_tag(self.other_enterprise.id),
+            post_field_cache_tag(self.other_field.id)
+        )
+        before = get_tag_versions(tags)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.enterprise = self.other_enterprise
+            self.post.field = self.other_field
+            self.post.save()
+
+        self.assertAllChanged(tags, before)
+
+    def test_delete_invalidates_post_tags(self):
+        tags = self.tags()
+        before = get_tag_versions(tags)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.delete()
+
+        self.assertAllChanged(tags, before)
+
+    def test_unrelated_tags_are_kept(self):
+        tags = [post_enterprise_cache_tag(self.other_enterprise.id), post_field_cache_tag(self.other_field.id)]
+        before = get_tag_versions(tags)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.title = 'Lập trình viên Go'
+            self.post.save()
+
+        self.assertEqual(get_tag_versions(tags), before)
+
+
+class SearchPostsPaginationTests(TestCase):
+    """Phân trang offset của tìm kiếm bài đăng"""
+
+    def setUp(self):
+        cache.clear()
+        field = FieldEntity.objects.create(name='CNTT', code='it', status='active')
+        position = PositionEntity.objects.create(name='Dev', code='dev', field=field, status='active')
+        enterprise = create_enterprise('a')
+        for i in range(3):
+            PostEntity.objects.create(
+                title=f'Lập trình viên {i}', enterprise=enterprise, position=position, field=field,
+                city='Hà Nội', deadline=(timezone.now() + timedelta(days=10)).date(), is_active=True
+            )
+        self.client = APIClient()
+
+    def search(self, **params):
+        response = self.client.get(reverse('search-posts'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+
+    def test_page_below_one_returns_first_page(self):
+        for page in ('0', '-1'):
+            data = self.search(page=page, page_size='2')
+            self.assertEqual(data['page'], 1)
+            self.assertEqual(len(data['results']), 2)
 
-# Create your tests here.
+    def test_page_size_below_one_is_clamped(self):
+        data = self.search(page_size='-5')
+        self.assertEqual((data['page_size'], data['total_pages']), (1, 3))
+        self.assertEqual(len(data['results']), 1)
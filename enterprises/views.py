@@ -12,22 +12,28 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 
-from transactions.models import PremiumHistory
 from .models import (
     EnterpriseEntity,
     PostEntity,
     FieldEntity,
     PositionEntity,
     CriteriaEntity,
-    SavedPostEntity
+    SavedPostEntity,
+    RecommendationFeedEntity
 )
 from .serializers import (
     EnterpriseDetailSerializer, EnterprisePostDetailSerializer, EnterpriseSerializer, PostDetailSerializer, PostEnterpriseSerializer, PostSerializer,
     FieldSerializer, PositionSerializer, CriteriaSerializer,
-    PostUpdateSerializer, PostEnterpriseForEmployerSerializer, SavedPostSerializer, PostListSerializer
+    PostUpdateSerializer, PostEnterpriseForEmployerSerializer, SavedPostSerializer
 )
 from profiles.models import Cv
 from profiles.serializers import CvSerializer, CvStatusSerializer
+from .services import (
+    ENTERPRISES_CACHE_TAG, ENTERPRISE_STATS_CACHE_TIMEOUT, POST_DETAIL_CACHE_TIMEOUT, POSTS_CACHE_TAG,
+    RECOMMENDATION_LIMIT, annotate_match_score, enterprise_stats_cache_tag, annotate_priority_coefficient,
+    get_related_posts, post_detail_cache_tag, post_search_cache_tags, rebuild_recommendation_feed
+)
+from .search import search_queryset
 from base.permissions import (
     IsEnterpriseOwner, IsPostOwner,
     IsFieldManager, IsPositionManager, IsCriteriaOwner,
@@ -36,11 +42,11 @@ from base.permissions import (
 from base.utils import create_permission_class_with_admin_override
 from base.aws_utils import upload_to_s3
 from notifications.services import NotificationService
-from base.pagination import CustomPagination
+from base.pagination import CustomPagination, KeysetPagination
+from base.cache import get_or_compute, tagged_cache_key
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from base.cloudinary_utils import delete_image_from_cloudinary, upload_image_to_cloudinary
-from django.utils.http import urlencode
 import os
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 
@@ -601,50 +607,11 @@ def delete_enterprise(request):
 def get_enterprise_premium(request):
     time_start = datetime.now()
     
-    # Lấy tất cả doanh nghiệp có user premium
-    enterprises = EnterpriseEntity.objects.filter(user__is_premium=True)
-    
-    # Import for premium sorting
-    from transactions.models import PremiumHistory
-    from django.utils import timezone
-    
-    # Lấy danh sách user_ids từ các doanh nghiệp premium
-    user_ids = [e.user_id for e in enterprises]
-    
-    # Lấy premium histories
-    premium_histories = PremiumHistory.objects.filter(
-        user_id__in=user_ids,
-        is_active=True,
-        is_cancelled=False,
-        end_date__gt=timezone.now()
-    ).select_related('package')
-    
-    # Map user_id to premium_history
-    user_premiums = {}
-    for ph in premium_histories:
-        if ph.user_id not in user_premiums:
-            user_premiums[ph.user_id] = ph
-    
-    # Tính hệ số ưu tiên cho mỗi doanh nghiệp
-    priority_coefficients = {}
-    for enterprise in enterprises:
-        premium = user_premiums.get(enterprise.user_id)
-        if premium and premium.package:
-            priority_coefficients[enterprise.id] = premium.package.priority_coefficient
-        else:
-            priority_coefficients[enterprise.id] = 999
-    
-    # Tạo list tuple (enterprise, priority) để sắp xếp
-    enterprise_priority_pairs = [(enterprise, priority_coefficients.get(enterprise.id, 999)) for enterprise in enterprises]
-    
-    # Sắp xếp theo hệ số ưu tiên (thấp -> cao) và thời gian tạo (mới -> cũ)
-    enterprise_priority_pairs.sort(key=lambda pair: (
-        pair[1],  # Sắp xếp theo hệ số ưu tiên 
-        -(pair[0].created_at.timestamp() if hasattr(pair[0], 'created_at') and pair[0].created_at else 0)
-    ))
-    
-    # Lấy doanh nghiệp đã sắp xếp
-    sorted_enterprises = [pair[0] for pair in enterprise_priority_pairs]
+    # Lấy tất cả doanh nghiệp có user premium, sắp xếp theo hệ số ưu tiên (thấp -> cao)
+    # và thời gian tạo (mới -> cũ) ngay trong database
+    sorted_enterprises = EnterpriseEntity.objects.filter(
+        user__is_premium=True
+    ).order_by('priority_coefficient', '-created_at', '-id')
     
     # Phân trang
     paginator = CustomPagination()
@@ -668,6 +635,24 @@ def get_enterprise_premium(request):
             type=openapi.TYPE_STRING,
             required=False
         ),
+        openapi.Parameter(
+            'cursor', openapi.IN_QUERY, 
+            description="Con trỏ trang tiếp theo (next_cursor của response trước), dùng phân trang keyset thay cho page", 
+            type=openapi.TYPE_STRING,
+            required=False
+        ),
+        openapi.Parameter(
+            'pagination', openapi.IN_QUERY, 
+            description="Đặt 'cursor' để dùng phân trang keyset cho trang đầu tiên", 
+            type=openapi.TYPE_STRING,
+            required=False
+        ),
+        openapi.Parameter(
+            'include_total', openapi.IN_QUERY, 
+            description="Chế độ cursor: 'true' để trả thêm tổng số bản ghi (được cache)", 
+            type=openapi.TYPE_STRING,
+            required=False
+        ),
     ],
     responses={
         200: openapi.Response(
@@ -706,10 +691,21 @@ def get_posts(request):
         # Sắp xếp cơ bản theo tham số
     if (sort == '-salary-max'):
         posts = posts.order_by('-salary_max')
+        ordering = ('-salary_max', '-id')
     elif (sort == '-salary-min'):
         posts = posts.order_by('-salary_min')
-    elif (sort == '-created_at'):
+        ordering = ('-salary_min', '-id')
+    else:
         posts = posts.order_by('-created_at')
+        ordering = ('-created_at', '-id')
+    
+    # Phân trang theo con trỏ (cursor) cho feed cuộn vô hạn, không cần OFFSET và COUNT(*)
+    if KeysetPagination.is_requested(request):
+        paginator = KeysetPagination()
+        paginated_posts = paginator.paginate_queryset(posts, request, ordering=ordering)
+        serializer = PostSerializer(paginated_posts, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+    
     paginator = CustomPagination()
     paginated_posts = paginator.paginate_queryset(posts, request)
     serializer = PostSerializer(paginated_posts, many=True, context={'request': request})
@@ -1175,7 +1171,7 @@ def search_enterprises(request):
         'page': request.query_params.get('page', '1'),
         'page_size': request.query_params.get('page_size', '10')
     }
-    cache_key = f'enterprises_search_{urlencode(params)}'
+    cache_key = tagged_cache_key('enterprises_search', params, [ENTERPRISES_CACHE_TAG])
     
     cached_response = cache.get(cache_key)
     if cached_response is not None:
@@ -1185,11 +1181,8 @@ def search_enterprises(request):
     enterprises = EnterpriseEntity.objects.filter(is_active=True)
     
     if params['q']:
-        enterprises = enterprises.filter(
-            Q(company_name__icontains=params['q']) |
-            Q(description__icontains=params['q']) |
-            Q(field_of_activity__icontains=params['q'])
-        )
+        # Tìm kiếm không dấu trên cột search_document (index trigram trên PostgreSQL)
+        enterprises = search_queryset(enterprises, params['q'])
     
     if params['city']:
         enterprises = enterprises.filter(city__iexact=params['city'])
@@ -1204,7 +1197,11 @@ def search_enterprises(request):
     sort_by = params['sort_by']
     if params['sort_order'] == 'desc':
         sort_by = f'-{sort_by}'
-    enterprises = enterprises.order_by(sort_by)
+    if params['q'] and 'sort_by' not in request.query_params:
+        # Không chỉ định sắp xếp thì ưu tiên kết quả khớp từ khóa nhất
+        enterprises = enterprises.order_by('-search_rank', sort_by)
+    else:
+        enterprises = enterprises.order_by(sort_by)
     
     paginator = CustomPagination()
     paginated_enterprises = paginator.paginate_queryset(enterprises, request)
@@ -1312,6 +1309,24 @@ def search_enterprises(request):
             type=openapi.TYPE_INTEGER,
             required=False
         ),
+        openapi.Parameter(
+            'cursor', openapi.IN_QUERY, 
+            description="Con trỏ trang tiếp theo (next_cursor của response trước), dùng phân trang keyset thay cho page", 
+            type=openapi.TYPE_STRING,
+            required=False
+        ),
+        openapi.Parameter(
+            'pagination', openapi.IN_QUERY, 
+            description="Đặt 'cursor' để dùng phân trang keyset cho trang đầu tiên", 
+            type=openapi.TYPE_STRING,
+            required=False
+        ),
+        openapi.Parameter(
+            'include_total', openapi.IN_QUERY, 
+            description="Chế độ cursor: 'true' để trả thêm tổng số bản ghi (được cache)", 
+            type=openapi.TYPE_STRING,
+            required=False
+        ),
         openapi.Parameter(
             'sort_by', openapi.IN_QUERY, 
             description="Trường sắp xếp (ví dụ: 'created_at', 'salary_min', 'salary_max')", 
@@ -1394,7 +1409,6 @@ def search_enterprises(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def search_posts(request):
-    time_start = datetime.now()
     params = {}
     for key in ['q', 'city', 'position', 'experience', 'type_working', 'scales', 'field', 'salary_min', 'salary_max', 'negotiable', 'all']:
         value = request.query_params.get(key, '')
@@ -1405,16 +1419,37 @@ def search_posts(request):
     params['sort_order'] = request.query_params.get('sort_order', 'desc')
     params['page'] = request.query_params.get('page', '1')
     params['page_size'] = request.query_params.get('page_size', '10')
+    # Phân trang con trỏ (keyset): cursor và include_total cũng thuộc cache key
+    use_keyset = KeysetPagination.is_requested(request)
+    if use_keyset:
+        params['pagination'] = 'cursor'
+        for key in ['cursor', 'include_total']:
+            value = request.query_params.get(key, '')
+            if value:
+                params[key] = value
     
     # Mặc định all=true
     if 'all' not in params:
         params['all'] = 'true'
     
-    cache_key = f"search_posts_results_{hash(frozenset(params.items()))}"
+    # Lấy thông tin user criteria nếu đã đăng nhập (cần thiết cho việc tính điểm)
+    user = request.user
+    user_criteria = None
+    if user.is_authenticated:
+        user_criteria = CriteriaEntity.objects.filter(user=user).first()
+
+    # Key ổn định giữa các worker, gắn tag để được vô hiệu hóa khi bài đăng thay đổi.
+    # Điểm phù hợp phụ thuộc vào tiêu chí nên tiêu chí là một phần của key,
+    # còn is_saved phụ thuộc vào từng user nên được gắn sau khi đọc cache.
+    cache_key = tagged_cache_key(
+        'search_posts_results',
+        {'params': params, 'criteria': _criteria_cache_params(user_criteria)},
+        post_search_cache_tags(params)
+    )
     
     cached_data = cache.get(cache_key)
     if cached_data is not None:
-        return Response(cached_data)
+        return Response(_apply_saved_flags(cached_data, user))
     query = PostEntity.objects.filter(
         is_active=True,
         is_remove_by_admin=False,
@@ -1424,13 +1459,8 @@ def search_posts(request):
     # Áp dụng bộ lọc tìm kiếm từ params nếu có (chưa thực thi truy vấn)
     if params.get("q") != None:
         if len(params.get('q')) > 0:
-            search_term = params.get('q')
-            query = query.filter(
-                Q(title__icontains=search_term) |
-                Q(description__icontains=search_term) |
-                Q(required__icontains=search_term) |
-                Q(enterprise__company_name__icontains=search_term)
-            )
+            # Tìm kiếm không dấu trên cột search_document (index trigram trên PostgreSQL)
+            query = search_queryset(query, params.get('q'))
 
     if params.get("city"):
         if len(params.get('city')) > 0:
@@ -1473,256 +1503,62 @@ def search_posts(request):
     if params.get("negotiable"):
         if len(params.get('negotiable')) > 0:
             query = query.filter(is_salary_negotiable=True)
-    time_query_build = datetime.now()
-    
-    # Cải thiện hiệu suất bằng select_related trước khi thực hiện truy vấn
-    filtered_query = query.select_related(
-        'position', 
-        'field', 
-        'enterprise'
-    )
-    # Chỉ lấy các trường cần thiết cho việc tính điểm và sắp xếp
-    # Dùng values() để chuyển đổi QuerySet sang dictionary để xử lý nhanh hơn
-    post_data = list(filtered_query.values(
-        'id', 'title', 'city', 'experience', 'type_working', 
-        'salary_min', 'salary_max', 'is_salary_negotiable', 'created_at',
-        'enterprise_id', 'position_id', 'field_id',
-        'enterprise__scale', 'position__field_id'
-    ))
-
-    time_initial_query = datetime.now()
+
+    # Trang và kích thước trang không hợp lệ được đưa về giá trị nhỏ nhất thay vì lỗi slice âm
+    page = max(int(params.get('page', 1)), 1)
+    page_size = max(int(params.get('page_size', 10)), 1)
+    empty_data = {
+        'message': 'Data retrieved successfully',
+        'status': status.HTTP_200_OK,
+        'data': {
+            'links': {
+                'next': None,
+                'previous': None,
+            },
+            'total': 0,
+            'page': page,
+            'total_pages': 0,
+            'page_size': page_size,
+            'results': []
+        }
+    }
+
     # Nếu không có kết quả lọc và all=true, lấy tất cả bài đăng
-    if len(post_data) == 0:
-        if params.get('q') != None:
-            if len(params.get('q')) !=0:
+    if not query.exists():
+        if params.get('q'):
+            if use_keyset:
                 return Response({
                     'message': 'Data retrieved successfully',
                     'status': status.HTTP_200_OK,
-                    'data': {
-                        'links': {
-                            'next': None,
-                            'previous': None,
-                        },
-                        'total': 0,
-                        'page': int(params.get('page', 1)),
-                        'total_pages': 0,
-                        'page_size': int(params.get('page_size', 10)),
-                        'results': []
-                    }
+                    'data': KeysetPagination().get_empty_data(request)
                 })
-        # Thực hiện query lại để lấy tất cả bài đăng active
+            return Response(empty_data)
         if params.get('all') == 'true':
-            post_data = list(PostEntity.objects.filter(
+            query = PostEntity.objects.filter(
                 is_active=True,
+                is_remove_by_admin=False,
                 deadline__gte=datetime.now()
-            ).values(
-                'id', 'title', 'city', 'experience', 'type_working', 
-                'salary_min', 'salary_max', 'is_salary_negotiable', 'created_at',
-                'enterprise_id', 'position_id', 'field_id',
-                'enterprise__scale', 'position__field_id'
-            ))
-    
-    # Lấy thông tin user criteria nếu đã đăng nhập (cần thiết cho việc tính điểm)
-    user = request.user
-    user_criteria = None
-    if user.is_authenticated:
-        try:
-            user_criteria = CriteriaEntity.objects.select_related('field', 'position').get(user=user)
-        except CriteriaEntity.DoesNotExist:
-            pass
-    # Tối ưu thông tin premium cho các doanh nghiệp
-    enterprise_ids = {post['enterprise_id'] for post in post_data if post['enterprise_id'] is not None}
-    
-    # Cache thông tin hệ số ưu tiên
-    priority_cache_key = 'enterprise_priority_coefficients'
-    enterprise_premium_coefficients = cache.get(priority_cache_key, {})
-    
-    # Chỉ truy vấn enterprise và premium cho các doanh nghiệp chưa có trong cache
-    missing_enterprise_ids = [eid for eid in enterprise_ids if eid not in enterprise_premium_coefficients]
-    
-    if missing_enterprise_ids:
-        # Truy vấn hiệu quả: chỉ lấy enterprise.user_id
-        enterprise_users = {}
-        for item in EnterpriseEntity.objects.filter(id__in=missing_enterprise_ids).values('id', 'user_id'):
-            enterprise_users[item['id']] = item['user_id']
-        
-        if enterprise_users:
-            # Lấy premium histories hiệu quả với một truy vấn
-            user_ids = list(enterprise_users.values())
-            
-            # Tạo map user_id -> priority_coefficient
-            user_premium_coefficients = {}
-            
-            for ph in PremiumHistory.objects.filter(
-                user_id__in=user_ids,
-                is_active=True,
-                is_cancelled=False,
-                end_date__gt=timezone.now()
-            ).select_related('package').values('user_id', 'package__priority_coefficient'):
-                user_premium_coefficients[ph['user_id']] = ph['package__priority_coefficient']
-            
-            # Tính toán priority coefficients cho các doanh nghiệp thiếu
-            for enterprise_id, user_id in enterprise_users.items():
-                coefficient = user_premium_coefficients.get(user_id)
-                enterprise_premium_coefficients[enterprise_id] = coefficient if coefficient else 999
-            
-            # Lưu vào cache trong 1 giờ
-            cache.set(priority_cache_key, enterprise_premium_coefficients, 60 * 60)
-    
-    time_premium_fetch = datetime.now()
-    print(f"Premium data fetch time: {time_premium_fetch - time_initial_query} seconds")
-    
-    # Tính điểm và priority cho mỗi post
-    scored_posts = []
-    for post in post_data:
-        score = 0
-        post_obj = {**post}  # Tạo copy để không ảnh hưởng đến dữ liệu gốc
-        
-        # Tính điểm dựa trên criteria của user (nếu có)
-        if user_criteria:
-            # City (4 điểm)
-            if user_criteria.city and post['city'] and post['city'].lower() == user_criteria.city.lower():
-                score += 4
-            
-            # Experience (3 điểm)
-            if user_criteria.experience and post['experience'] and post['experience'].lower() == user_criteria.experience.lower():
-                score += 3
-            
-            # Type of working (3 điểm)
-            if user_criteria.type_working and post['type_working'] and post['type_working'].lower() == user_criteria.type_working.lower():
-                score += 3
-            
-            # Scales (2 điểm)
-            if user_criteria.scales and post['enterprise__scale'] and post['enterprise__scale'].lower() == user_criteria.scales.lower():
-                score += 2
-            
-            # Field (5 điểm)
-            if user_criteria.field:
-                if (post['field_id'] and post['field_id'] == user_criteria.field.id) or \
-                   (post['position__field_id'] and post['position__field_id'] == user_criteria.field.id):
-                    score += 5
-            
-            # Position (5 điểm)
-            if user_criteria.position and post['position_id'] and post['position_id'] == user_criteria.position.id:
-                score += 5
-            
-            # Salary (3 điểm)
-            if user_criteria.salary_min and post['salary_min'] and post['salary_min'] >= user_criteria.salary_min:
-                score += 3
-        
-        # Tính điể''m dựa trên các tham số tìm kiếm
-        if params.get('city') and post['city'] and post['city'].lower() == params.get('city').lower():
-            score += 4
-        
-        if params.get('experience') and post['experience'] and post['experience'].lower() == params.get('experience').lower():
-            score += 3
-        
-        if params.get('type_working') and post['type_working'] and post['type_working'].lower() == params.get('type_working').lower():
-            score += 3
-        
-        if params.get('scales') and post['enterprise__scale'] and post['enterprise__scale'].lower() == params.get('scales').lower():
-            score += 2
-        
-        # Lưu điểm và đánh dấu matches_criteria
-        post_obj['match_score'] = score
-        post_obj['matches_criteria'] = score >= 7
-        post_obj['priority_coefficient'] = enterprise_premium_coefficients.get(post['enterprise_id'], 999)
-        post_obj['is_enterprise_premium'] = post_obj['priority_coefficient'] < 999
-        
-        scored_posts.append(post_obj)
-    
-    time_scoring = datetime.now()
-    print(f"Post scoring time: {time_scoring - time_premium_fetch} seconds")
-    
-    # Lọc và sắp xếp posts theo tiêu chí
+            )
+
+    # Tính điểm phù hợp, hệ số ưu tiên premium và sắp xếp ngay trong database
+    ranked_query = annotate_match_score(
+        annotate_priority_coefficient(query),
+        criteria=user_criteria,
+        params=params
+    )
     if params.get('all') == 'false':
         # Nếu all=false, chỉ giữ lại những bài đăng phù hợp với tiêu chí
-        filtered_posts = [post for post in scored_posts if post['matches_criteria']]
+        ranked_query = ranked_query.filter(matches_criteria=True)
+        ordering = ['-created_at', '-id']
     else:
-        # all=true: Sắp xếp posts theo matches_criteria rồi đến hệ số ưu tiên và thời gian tạo
-        filtered_posts = sorted(
-            scored_posts,
-            key=lambda p: (
-                not p['matches_criteria'], 
-                p['priority_coefficient'], 
-                -(p['created_at'].timestamp() if isinstance(p['created_at'], datetime) else 0)
-            )
-        )
-    
-    time_sorting = datetime.now()
-    print(f"Sorting time: {time_sorting - time_scoring} seconds")
-    
-    # Lấy danh sách ID đã sắp xếp
-    sorted_post_ids = [post['id'] for post in filtered_posts]
-    
-    # Nếu không có kết quả, trả về rỗng
-    if not sorted_post_ids:
-        # Trả về response rỗng với định dạng phân trang
-        empty_data = {
-            'message': 'Data retrieved successfully',
-            'status': status.HTTP_200_OK,
-            'data': {
-                'links': {
-                    'next': None,
-                    'previous': None,
-                },
-                'total': 0,
-                'page': int(params.get('page', 1)),
-                'total_pages': 0,
-                'page_size': int(params.get('page_size', 10)),
-                'results': []
-            }
-        }
-        cache.set(cache_key, empty_data, 60 * 5)
-        return Response(empty_data)
-    
-    # Tạo bản đồ thông tin post để sử dụng sau
-    post_info_map = {post['id']: post for post in filtered_posts}
-    
-    # Tạo paginator instance và tính toán pagination
-    page = int(params.get('page', 1))
-    page_size = int(params.get('page_size', 10))
-    
-    # Tính toán phân trang thủ công
-    start_idx = (page - 1) * page_size
-    end_idx = min(start_idx + page_size, len(sorted_post_ids))
-    
-    # Chỉ lấy ID cho trang hiện tại
-    current_page_ids = sorted_post_ids[start_idx:end_idx]
-    
-    time_pagination = datetime.now()
-    print(f"Pagination time: {time_pagination - time_sorting} seconds")
-    
-    # Chuẩn bị truy vấn trực tiếp vào database sử dụng các ID đã lọc và sắp xếp cho trang hiện tại
-    # Sử dụng từ điển để lưu trữ kết quả
-    paged_data = {
-        'links': {
-            'next': f'?page={page + 1}' if end_idx < len(sorted_post_ids) else None,
-            'previous': f'?page={page - 1}' if page > 1 else None,
-        },
-        'total': len(sorted_post_ids),
-        'page': page,
-        'total_pages': (len(sorted_post_ids) + page_size - 1) // page_size,
-        'page_size': page_size,
-        'results': []
-    }
-    
-    saved_post_ids = set()
-    if user.is_authenticated:
-        saved_post_ids = set(SavedPostEntity.objects.filter(
-            user=user, 
-            post_id__in=current_page_ids
-        ).values_list('post_id', flat=True))
-    
-    from django.db.models import Prefetch, F, Value as V
-    from django.db.models.functions import Concat
-    
-    # Chỉ truy vấn các trường cần thiết
-    posts_with_relations = PostEntity.objects.filter(
-        id__in=current_page_ids
-    ).select_related(
-        'position', 
-        'field', 
+        # all=true: Sắp xếp theo matches_criteria rồi đến hệ số ưu tiên và thời gian tạo
+        ordering = ['-matches_criteria', 'priority_coefficient', '-created_at', '-id']
+        if params.get('q'):
+            # Có từ khóa thì kết quả khớp hơn được xếp trước trong cùng mức ưu tiên
+            ordering.insert(2, '-search_rank')
+    ranked_query = ranked_query.order_by(*ordering).select_related(
+        'position',
+        'field',
         'enterprise'
     ).only(
         # Post fields
@@ -1732,20 +1568,39 @@ def search_posts(request):
         # Related fields (có thể tự động nạp)
         'position_id', 'field_id', 'enterprise_id'
     )
-    
-    # Tạo từ điển sắp xếp để giữ đúng thứ tự của kết quả
-    position_map = {id: idx for idx, id in enumerate(current_page_ids)}
-    
-    # Sắp xếp kết quả theo thứ tự ban đầu
-    sorted_results = sorted(posts_with_relations, key=lambda post: position_map.get(post.id, 999))
-    
-    time_fetch_detail = datetime.now()
-    print(f"Fetch detail time: {time_fetch_detail - time_pagination} seconds")
-    
+
+    if use_keyset:
+        # Keyset: lấy trang theo điều kiện trên các cột sắp xếp, không COUNT(*) mặc định
+        paginator = KeysetPagination()
+        page_posts = paginator.paginate_queryset(ranked_query, request, ordering=ordering)
+        paged_data = paginator.get_paginated_data([])
+    else:
+        total = ranked_query.count()
+
+        # Nếu không có kết quả, trả về rỗng
+        if total == 0:
+            cache.set(cache_key, empty_data, 60 * 5)
+            return Response(empty_data)
+
+        # Chỉ lấy bản ghi của trang hiện tại (LIMIT/OFFSET trong database)
+        start_idx = (page - 1) * page_size
+        end_idx = min(start_idx + page_size, total)
+        page_posts = list(ranked_query[start_idx:end_idx]) if start_idx < total else []
+
+        paged_data = {
+            'links': {
+                'next': f'?page={page + 1}' if end_idx < total else None,
+                'previous': f'?page={page - 1}' if page > 1 else None,
+            },
+            'total': total,
+            'page': page,
+            'total_pages': (total + page_size - 1) // page_size,
+            'page_size': page_size,
+            'results': []
+        }
+
     # Biến đổi dữ liệu sang định dạng cần thiết
-    for post in sorted_results:
-        post_info = post_info_map.get(post.id, {})
-        
+    for post in page_posts:
         # Tạo từ điển kết quả thủ công để tránh gọi serializer nặng nề
         result = {
             'id': post.id,
@@ -1766,11 +1621,11 @@ def search_posts(request):
             'enterprise': post.enterprise_id,
             'enterprise_name': post.enterprise.company_name if post.enterprise else None,
             'enterprise_logo': post.enterprise.logo_url if post.enterprise else None,
-            'is_saved': post.id in saved_post_ids,
-            'is_enterprise_premium': post_info.get('is_enterprise_premium', False),
-            'matches_criteria': post_info.get('matches_criteria', False)
+            'is_saved': False,
+            'is_enterprise_premium': post.is_enterprise_premium,
+            'matches_criteria': post.matches_criteria
         }
-        
+
         # Thêm thông tin position
         if post.position:
             result['position'] = {
@@ -1796,9 +1651,6 @@ def search_posts(request):
         
         paged_data['results'].append(result)
     
-    time_transform = datetime.now()
-    print(f"Transform time: {time_transform - time_fetch_detail} seconds")
-    
     # Định dạng phản hồi cuối cùng theo yêu cầu
     response_data = {
         'message': 'Data retrieved successfully',
@@ -1807,7 +1659,44 @@ def search_posts(request):
     }
     
     cache.set(cache_key, response_data, 60 * 5)  # Cache trong 5 phút
-    return Response(response_data)
+    return Response(_apply_saved_flags(response_data, user))
+
+
+def _criteria_cache_params(criteria):
+    """Các giá trị tiêu chí ảnh hưởng tới điểm phù hợp, dùng làm một phần của cache key"""
+    if not criteria:
+        return None
+    return {
+        'city': criteria.city,
+        'experience': criteria.experience,
+        'type_working': criteria.type_working,
+        'scales': criteria.scales,
+        'field': criteria.field_id,
+        'position': criteria.position_id,
+        'salary_min': criteria.salary_min,
+    }
+
+
+def _apply_saved_flags(response_data, user):
+    """Gắn is_saved của user hiện tại vào kết quả (dùng chung cache giữa các user)"""
+    results = response_data['data']['results']
+    if not user.is_authenticated or not results:
+        return response_data
+
+    saved_post_ids = set(SavedPostEntity.objects.filter(
+        user=user,
+        post_id__in=[result['id'] for result in results]
+    ).values_list('post_id', flat=True))
+    return {
+        **response_data,
+        'data': {
+            **response_data['data'],
+            'results': [
+                {**result, 'is_saved': result['id'] in saved_post_ids}
+                for result in results
+            ]
+        }
+    }
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -1815,108 +1704,19 @@ def get_recommended_posts(request):
     try:
         criteria = CriteriaEntity.objects.get(user=request.user)
         
-        # Lấy tất cả các bài đăng active, không bị loại bỏ và chưa hết hạn
-        posts = PostEntity.objects.filter(
+        # Đọc feed đã xếp hạng sẵn (được Celery cập nhật), chỉ tính trực tiếp khi chưa có feed
+        feed = RecommendationFeedEntity.objects.filter(user=request.user).first()
+        if feed is None:
+            feed = rebuild_recommendation_feed(criteria)
+        
+        # Bỏ các bài đăng đã hết hạn hoặc bị ẩn kể từ lần cập nhật feed
+        posts_by_id = PostEntity.objects.filter(
+            id__in=feed.post_ids,
             is_remove_by_admin=False, 
             is_active=True,
             deadline__gt=timezone.now()
-        ).select_related('enterprise', 'position', 'position__field', 'field')
-        
-        # ĐIỀU KIỆN LƯƠNG - LOẠI BỎ NGAY CÁC BÀI ĐĂNG CÓ LƯƠNG THẤP HƠN YÊU CẦU
-        filtered_posts = []
-        if criteria.salary_min is not None and criteria.salary_min > 0:
-            # Lọc bài đăng ngay từ đầu theo điều kiện lương
-            for post in posts:
-                # Chỉ giữ lại bài đăng:
-                # 1. Có lương thỏa thuận HOẶC
-                # 2. Có mức lương tối thiểu >= mức lương yêu cầu
-                if post.is_salary_negotiable or (post.salary_min is not None and post.salary_min >= criteria.salary_min):
-                    filtered_posts.append(post)
-        else:
-            # Nếu không có yêu cầu lương, giữ nguyên danh sách
-            filtered_posts = list(posts)
-        
-        # Tạo danh sách kết quả với điểm số
-        result = []
-        
-        for post in filtered_posts:
-            score = 0
-            
-            # ĐIỀU KIỆN BẮT BUỘC: Post phải cùng lĩnh vực
-            field_match = False
-            if criteria.field:
-                # Kiểm tra field trực tiếp của post
-                if post.field and post.field.id == criteria.field.id:
-                    field_match = True
-                # Kiểm tra field qua position
-                elif post.position and post.position.field and post.position.field.id == criteria.field.id:
-                    field_match = True
-            
-            if field_match:
-                score += 4  # Giảm từ 6 xuống 4
-            
-            # Nếu không cùng lĩnh vực thì bỏ qua bài đăng này
-            if not field_match:
-                continue
-                
-            # Vị trí - quan trọng thứ hai
-            position_match = False
-            if criteria.position and post.position and criteria.position.id == post.position.id:
-                score += 3  # Giảm từ 5 xuống 3
-                position_match = True
-            
-            # Mức lương - đã lọc ở trước đó
-            salary_match = False
-            if criteria.salary_min is not None and criteria.salary_min > 0:
-                if post.is_salary_negotiable:
-                    # Lương thỏa thuận
-                    score += 1
-                    salary_match = True
-                else:
-                    # Lương đạt yêu cầu (đã lọc ở trên)
-                    score += 2  # Giảm từ 4 xuống 2
-                    salary_match = True
-            
-            # Thành phố
-            city_match = False
-            if criteria.city and post.city and criteria.city.lower() == post.city.lower():
-                score += 2  # Giảm từ 3 xuống 2
-                city_match = True
-                
-            # Loại hình công việc
-            if criteria.type_working and post.type_working and criteria.type_working.lower() == post.type_working.lower():
-                score += 1  # Giảm từ 2 xuống 1
-                
-            # Kinh nghiệm
-            if criteria.experience and post.experience and criteria.experience.lower() == post.experience.lower():
-                score += 1  # Giảm từ 2 xuống 1
-                
-            # Quy mô công ty
-            if criteria.scales and post.enterprise and criteria.scales.lower() == post.enterprise.scale.lower():
-                score += 1  # Giữ nguyên
-            
-            # Cộng thêm điểm nếu đáp ứng nhiều tiêu chí cùng lúc
-            if position_match:
-                score += 1  # Giảm từ 2 xuống 1
-                
-            if city_match:
-                score += 1  # Giữ nguyên
-                
-            if salary_match and position_match:
-                score += 1  # Giảm từ 2 xuống 1
-                
-            if position_match and city_match:
-                score += 1  # Giảm từ 2 xuống 1
-                
-            # Nới lỏng ngưỡng điểm từ 6 xuống 4 (chỉ cần field match)
-            if score >= 4:
-                result.append((post, score))
-        
-        # Sắp xếp kết quả theo điểm số giảm dần, sau đó theo thời gian tạo mới nhất
-        result.sort(key=lambda x: (-x[1], -x[0].created_at.timestamp()))
-        
-        # Lấy danh sách các bài đăng đã sắp xếp (giới hạn 10 bài đăng)
-        sorted_posts = [item[0] for item in result[:10]]
+        ).select_related('enterprise', 'enterprise__user', 'position', 'field').in_bulk()
+        sorted_posts = [posts_by_id[post_id] for post_id in feed.post_ids if post_id in posts_by_id][:RECOMMENDATION_LIMIT]
         
         paginator = CustomPagination()
         paginated_posts = paginator.paginate_queryset(sorted_posts, request)
@@ -2324,36 +2124,22 @@ def delete_post(request, pk):
 def get_post_detail(request, pk):
     """Chi tiết bài đăng"""
     try:
-        from django.db.models import Count, Q, Prefetch, Case, When, Value, IntegerField
         from profiles.models import Cv
-        from django.core.cache import cache
-        import time
-        
-        # Đo thời gian thực hiện
-        start_time = time.time()
         
-        post = PostEntity.objects.select_related(
-            'enterprise', 
-            'enterprise__user',
-            'position',
-            'field'
-        ).get(pk=pk)
-        
-        serializer = PostDetailSerializer(post)
-        data = serializer.data
-        
-        # Thêm thông tin bổ sung về doanh nghiệp
-        data['enterprise_logo'] = post.enterprise.logo_url
-        data['user_id'] = post.enterprise.user.id
-        data['is_enterprise_premium'] = post.enterprise.user.is_premium
-        data['enterprise_address'] = post.enterprise.address
+        # Phần không phụ thuộc user được cache chung, vô hiệu hóa khi bài đăng hoặc CV thay đổi
+        cache_key = tagged_cache_key(
+            'post_detail',
+            {'post_id': pk},
+            [POSTS_CACHE_TAG, post_detail_cache_tag(pk)]
+        )
+        detail = get_or_compute(cache_key, lambda: _build_post_detail(pk), POST_DETAIL_CACHE_TIMEOUT)
         
-        # Tối ưu truy vấn đếm ứng viên bằng cách tạo index và sử dụng pk thay vì object
-        total_applicants = Cv.objects.filter(post_id=pk).count()
+        data = dict(detail['data'])
+        total_applicants = detail['total_applicants']
         
         # Xử lý quyền xem thông tin ứng viên - sử dụng IDs để so sánh thay vì objects
         if request.user.is_authenticated:
-            is_owner = post.enterprise.user_id == request.user.id
+            is_owner = data['user_id'] == request.user.id
             if is_owner or request.user.is_premium:
                 data['total_applicants'] = total_applicants
                 data['can_view_applicants'] = True
@@ -2378,38 +2164,14 @@ def get_post_detail(request, pk):
             data['can_chat_with_employer'] = False
             data['latest_application_date'] = None
             
-        # Lấy danh sách bài đăng liên quan với một truy vấn hiệu quả
-        # Chỉ lấy các bài đăng có cùng field
-        related_posts_query = PostEntity.objects.filter(
-            is_active=True,
-            deadline__gt=timezone.now(),
-            field_id=post.field_id  # Chỉ lấy bài đăng cùng field
-        ).exclude(id=post.id).select_related(
-            'enterprise',
-            'field',
-            'position'
-        )
-        
-        # Tính điểm liên quan cho mỗi bài đăng sử dụng Case/When để tránh nhiều truy vấn
-        related_posts_query = related_posts_query.annotate(
-            relevance_score=Case(
-                When(position_id=post.position_id, then=Value(3)),  # Ưu tiên cùng vị trí
-                When(city=post.city, then=Value(2)),  # Tiếp đến là cùng thành phố
-                When(enterprise_id=post.enterprise_id, then=Value(1)),  # Cuối cùng là cùng doanh nghiệp
-                default=Value(0),
-                output_field=IntegerField()
-            )
-        ).order_by('-relevance_score', '-created_at')[:7]  # Giới hạn 7 bài đăng liên quan
-        
-        # Thực hiện truy vấn và lấy kết quả
-        related_posts = list(related_posts_query)
-        
-        # Serialize kết quả
-        related_posts_serializer = PostListSerializer(related_posts, many=True, context={'request': request})
-        data['related_posts'] = related_posts_serializer.data
+        # Bài đăng liên quan được tính sẵn theo lĩnh vực (cache riêng), chỉ cần gắn is_saved của user
+        data['related_posts'] = _apply_saved_flags(
+            {'data': {'results': get_related_posts(PostEntity(**detail['related_source']))}},
+            request.user
+        )['data']['results']
         
         # Thông tin field
-        data['field'] = post.field.name if post.field else None
+        data['field'] = detail['field']
         
         # Tạo response để cache và trả về
         response_data = {
@@ -2418,10 +2180,6 @@ def get_post_detail(request, pk):
             'data': data
         }
         
-        
-        # In thời gian thực hiện để theo dõi hiệu suất
-        print(f"Execution time: {time.time() - start_time:.4f}s (from database)")
-        
         return Response(response_data)
     except PostEntity.DoesNotExist:
         return Response({
@@ -2429,6 +2187,40 @@ def get_post_detail(request, pk):
             'status': status.HTTP_404_NOT_FOUND
         }, status=status.HTTP_404_NOT_FOUND)
 
+
+def _build_post_detail(pk):
+    """Phần chi tiết bài đăng dùng chung cho mọi user (không gồm thông tin riêng của user)"""
+    from profiles.models import Cv
+
+    post = PostEntity.objects.select_related(
+        'enterprise', 
+        'enterprise__user',
+        'position',
+        'field'
+    ).get(pk=pk)
+    
+    data = PostDetailSerializer(post).data
+    
+    # Thêm thông tin bổ sung về doanh nghiệp
+    data['enterprise_logo'] = post.enterprise.logo_url
+    data['user_id'] = post.enterprise.user.id
+    data['is_enterprise_premium'] = post.enterprise.user.is_premium
+    data['enterprise_address'] = post.enterprise.address
+    
+    return {
+        'data': data,
+        'total_applicants': Cv.objects.filter(post_id=pk).count(),
+        # Các trường dùng để tìm bài đăng liên quan
+        'related_source': {
+            'id': post.id,
+            'field_id': post.field_id,
+            'position_id': post.position_id,
+            'city': post.city,
+            'enterprise_id': post.enterprise_id,
+        },
+        'field': post.field.name if post.field else None,
+    }
+
 @swagger_auto_schema(
     method='get',
     operation_description='Lấy danh sách vị trí công việc',
@@ -2880,106 +2672,111 @@ def enterprise_statistics(request):
             'status': status.HTTP_404_NOT_FOUND
         }, status=status.HTTP_404_NOT_FOUND)
     
-    # Thống kê tin tuyển dụng
-    from django.utils import timezone
-    from datetime import datetime, timedelta
-    from django.db.models import Count, Q
+    # Dữ liệu thống kê được cache ngắn hạn theo doanh nghiệp,
+    # bị vô hiệu hóa khi CV, phỏng vấn hoặc bài đăng của doanh nghiệp thay đổi
+    cache_key = tagged_cache_key(
+        'enterprise_statistics', {'enterprise_id': enterprise.id},
+        [enterprise_stats_cache_tag(enterprise.id)]
+    )
+    data = get_or_compute(
+        cache_key, lambda: _build_enterprise_statistics(enterprise), ENTERPRISE_STATS_CACHE_TIMEOUT
+    )
     
-    # Lấy tất cả bài đăng của doanh nghiệp
+    return Response({
+        'message': 'Thống kê thành công',
+        'status': status.HTTP_200_OK,
+        'data': data
+    }, status=status.HTTP_200_OK)
+
+
+def _build_enterprise_statistics(enterprise):
+    """Tính thống kê doanh nghiệp bằng một số ít truy vấn tổng hợp (conditional aggregation)"""
+    from datetime import timedelta
+    from django.db.models.functions import TruncMonth
+    from interviews.models import Interview
+
+    now = timezone.now()
+    today = timezone.localdate()
+
+    # Thống kê tin tuyển dụng
     posts = PostEntity.objects.filter(enterprise=enterprise)
-    total_posts = posts.count()
-    active_posts = posts.filter(is_active=True, deadline__gt=timezone.now().date()).count()
+    post_totals = posts.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True, deadline__gt=today)),
+    )
+    total_posts = post_totals['total']
+    active_posts = post_totals['active']
     expired_posts = total_posts - active_posts
     
-    # Thống kê ứng viên
-    from profiles.models import Cv
-    
-    # Lấy tất cả CV ứng tuyển vào các bài đăng của doanh nghiệp
+    # Thống kê ứng viên ứng tuyển vào các bài đăng của doanh nghiệp
     cvs = Cv.objects.filter(post__enterprise=enterprise)
-    total_applicants = cvs.count()
-    pending_applicants = cvs.filter(status='pending').count()
-    approved_applicants = cvs.filter(status='approved').count()
-    rejected_applicants = cvs.filter(status='rejected').count()
+    cv_totals = cvs.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='pending')),
+        approved=Count('id', filter=Q(status='approved')),
+        rejected=Count('id', filter=Q(status='rejected')),
+    )
     
     # Thống kê phỏng vấn
-    from interviews.models import Interview
-    
-    interviews = Interview.objects.filter(enterprise=enterprise)
-    total_interviews = interviews.count()
-    upcoming_interviews = interviews.filter(
-        interview_date__gt=timezone.now(),
-        status__in=['pending', 'accepted']
-    ).count()
-    completed_interviews = interviews.filter(status='completed').count()
-    
-    # Thống kê theo tháng (6 tháng gần nhất)
-    end_date = timezone.now().date()
-    start_date = (end_date - timedelta(days=180))
-    
-    # Khởi tạo mảng các tháng
-    monthly_stats = []
-    current_date = start_date
-    while current_date <= end_date:
-        month_start = datetime(current_date.year, current_date.month, 1).date()
-        if current_date.month == 12:
-            month_end = datetime(current_date.year + 1, 1, 1).date() - timedelta(days=1)
-        else:
-            month_end = datetime(current_date.year, current_date.month + 1, 1).date() - timedelta(days=1)
-        
-        # Đếm số ứng viên trong tháng
-        month_applicants = cvs.filter(created_at__date__gte=month_start, created_at__date__lte=month_end).count()
-        
-        # Đếm số tin đăng trong tháng
-        month_posts = posts.filter(created_at__date__gte=month_start, created_at__date__lte=month_end).count()
-        
-        monthly_stats.append({
-            'month': month_start.strftime('%m/%Y'),
-            'applicants': month_applicants,
-            'posts': month_posts
-        })
-        
-        # Chuyển sang tháng tiếp theo
-        if current_date.month == 12:
-            current_date = datetime(current_date.year + 1, 1, 1).date()
-        else:
-            current_date = datetime(current_date.year, current_date.month + 1, 1).date()
-    
-    # Thống kê chi tiết theo từng bài đăng (10 bài đăng gần nhất)
-    post_stats = []
-    recent_posts = posts.order_by('-created_at')[:10]
+    interview_totals = Interview.objects.filter(enterprise=enterprise).aggregate(
+        total=Count('id'),
+        upcoming=Count('id', filter=Q(interview_date__gt=now, status__in=['pending', 'accepted'])),
+        completed=Count('id', filter=Q(status='completed')),
+    )
     
-    for post in recent_posts:
-        post_cvs = Cv.objects.filter(post=post)
-        post_stats.append({
-            'id': post.id,
-            'title': post.title,
-            'total_applicants': post_cvs.count(),
-            'pending_applicants': post_cvs.filter(status='pending').count(),
-            'approved_applicants': post_cvs.filter(status='approved').count(),
-            'rejected_applicants': post_cvs.filter(status='rejected').count(),
-        })
+    # Thống kê theo tháng (6 tháng gần nhất), mỗi loại chỉ một truy vấn GROUP BY tháng
+    first_month = (today - timedelta(days=180)).replace(day=1)
+    months = []
+    current = first_month
+    while current <= today:
+        months.append(current)
+        current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    def count_by_month(queryset):
+        rows = queryset.filter(created_at__date__gte=first_month).annotate(
+            month=TruncMonth('created_at')
+        ).values('month').annotate(total=Count('id')).values_list('month', 'total')
+        return {month.strftime('%m/%Y'): total for month, total in rows}
+
+    monthly_applicants = count_by_month(cvs)
+    monthly_posts = count_by_month(posts)
+    monthly_stats = [
+        {
+            'month': month.strftime('%m/%Y'),
+            'applicants': monthly_applicants.get(month.strftime('%m/%Y'), 0),
+            'posts': monthly_posts.get(month.strftime('%m/%Y'), 0),
+        }
+        for month in months
+    ]
+    
+    # Thống kê chi tiết theo từng bài đăng (10 bài đăng gần nhất) trong một truy vấn
+    recent_posts = posts.order_by('-created_at').annotate(
+        total_applicants=Count('cvs'),
+        pending_applicants=Count('cvs', filter=Q(cvs__status='pending')),
+        approved_applicants=Count('cvs', filter=Q(cvs__status='approved')),
+        rejected_applicants=Count('cvs', filter=Q(cvs__status='rejected')),
+    ).values(
+        'id', 'title', 'total_applicants', 'pending_applicants',
+        'approved_applicants', 'rejected_applicants'
+    )[:10]
+    post_stats = list(recent_posts)
     
     # Tổng hợp dữ liệu
     data = {
         'total_posts': total_posts,
         'active_posts': active_posts,
         'expired_posts': expired_posts,
-        'total_applicants': total_applicants,
-        'pending_applicants': pending_applicants,
-        'approved_applicants': approved_applicants,
-        'rejected_applicants': rejected_applicants,
-        'total_interviews': total_interviews,
-        'upcoming_interviews': upcoming_interviews,
-        'completed_interviews': completed_interviews,
+        'total_applicants': cv_totals['total'],
+        'pending_applicants': cv_totals['pending'],
+        'approved_applicants': cv_totals['approved'],
+        'rejected_applicants': cv_totals['rejected'],
+        'total_interviews': interview_totals['total'],
+        'upcoming_interviews': interview_totals['upcoming'],
+        'completed_interviews': interview_totals['completed'],
         'monthly_stats': monthly_stats,
         'post_stats': post_stats
     }
-    
-    return Response({
-        'message': 'Thống kê thành công',
-        'status': status.HTTP_200_OK,
-        'data': data
-    }, status=status.HTTP_200_OK)
+    return data
 
 @swagger_auto_schema(
     method='post',
@@ -3117,7 +2914,11 @@ def save_post(request):
 @permission_classes([IsAuthenticated])
 def get_saved_posts(request):
     """Lấy danh sách bài đăng đã lưu của người dùng"""
-    saved_posts = SavedPostEntity.objects.filter(user=request.user).order_by('-created_at')
+    saved_posts = SavedPostEntity.objects.filter(user=request.user).select_related(
+        'post__enterprise__user',
+        'post__position',
+        'post__field'
+    ).order_by('-created_at')
     
     # Phân trang
     page = request.query_params.get('page', 1)
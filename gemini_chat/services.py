@@ -1,12 +1,14 @@
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Q, Count
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
 from django.utils import timezone
 from datetime import datetime
 
-from enterprises.models import EnterpriseEntity, PostEntity, FieldEntity, PositionEntity, CriteriaEntity
+from enterprises.models import PostEntity, CriteriaEntity
 from profiles.models import Cv, UserInfo
 from accounts.models import UserAccount, UserRole
+from base.cache import get_or_compute
 from .models import GeminiChatSession, GeminiChatMessage
 
 import google.generativeai as genai
@@ -19,6 +21,13 @@ import logging
 # Cấu hình Google Generative AI API
 genai.configure(api_key=settings.GEMINI_API_KEY)
 
+# Snapshot dữ liệu hệ thống dùng cho prompt, dùng chung giữa các worker.
+# Celery làm mới định kỳ (refresh_system_snapshot_task) nên TTL dài hơn chu kỳ làm mới
+SYSTEM_SNAPSHOT_CACHE_KEY = 'gemini_system_snapshot'
+SYSTEM_SNAPSHOT_CACHE_TIMEOUT = 60 * 60
+
+logger = logging.getLogger(__name__)
+
 class GeminiChatService:
     """Service để tương tác với Gemini API và quản lý chat"""
     
@@ -56,20 +65,12 @@ class GeminiChatService:
         
         self.model_name = "gemini-2.0-flash"
     
-        # Cache dữ liệu hệ thống để tái sử dụng
-        self.system_data_cache = None
-        self.cache_last_updated = None
-        self.cache_ttl = 3600  # 1 giờ (thời gian tính bằng giây)
-    
     def get_system_prompt(self, user):
         """Tạo system prompt dựa trên vai trò của user và dữ liệu hệ thống"""
         current_time = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
         
-        # Lấy dữ liệu hệ thống
-        system_data = self.get_system_data()
-        
-        # Format dữ liệu hệ thống thành văn bản
-        system_data_text = self._format_system_data_for_prompt(system_data)
+        # Dữ liệu hệ thống đã được format sẵn trong snapshot
+        system_data_text = self.get_system_data_text()
         
         base_prompt = f"""Bạn là trợ lý AI hỗ trợ người dùng trên website tuyển dụng 'JobHub'. Hiện tại là {current_time}.
 
@@ -492,35 +493,16 @@ THÔNG TIN DÀNH CHO NGƯỜI TÌM VIỆC:
     
     def get_stats_data(self):
         """Lấy thống kê hệ thống"""
-        from enterprises.models import PostEntity, EnterpriseEntity
-        
-        # Đếm số lượng việc làm đang hoạt động
-        active_jobs_count = PostEntity.objects.filter(is_active=True).count()
-        
-        # Đếm tổng số việc làm
-        total_jobs_count = PostEntity.objects.count()
-        
-        # Đếm số lượng doanh nghiệp
-        enterprise_count = EnterpriseEntity.objects.count()
-        
-        # Đếm số lượng người dùng
-        user_count = UserAccount.objects.count()
-        
-        # Đếm số lượng ứng viên (người dùng có vai trò 'candidate')
-        candidates_count = UserAccount.objects.filter(user_roles__role__name='candidate').count()
-        
-        # Tính mức lương trung bình
-        avg_salary_min = PostEntity.objects.filter(is_active=True, salary_min__isnull=False).values_list('salary_min', flat=True)
-        avg_salary_max = PostEntity.objects.filter(is_active=True, salary_max__isnull=False).values_list('salary_max', flat=True)
-        
-        avg_min = round(sum(avg_salary_min) / len(avg_salary_min)) if avg_salary_min else 0
-        avg_max = round(sum(avg_salary_max) / len(avg_salary_max)) if avg_salary_max else 0
-        
-        # Việc làm theo thành phố
-        city_stats = PostEntity.objects.filter(is_active=True).values('city').annotate(count=Count('city')).order_by('-count')[:5]
-        
-        # Việc làm theo lĩnh vực
-        field_stats = PostEntity.objects.filter(is_active=True).values('field__name').annotate(count=Count('field')).order_by('-count')[:5]
+        stats = self.get_stats_data_raw()
+        active_jobs_count = stats['active_jobs_count']
+        total_jobs_count = stats['total_jobs_count']
+        enterprise_count = stats['enterprise_count']
+        user_count = stats['user_count']
+        candidates_count = stats['candidates_count']
+        avg_min = stats['avg_min']
+        avg_max = stats['avg_max']
+        city_stats = stats['city_stats']
+        field_stats = stats['field_stats']
         
         # Format kết quả thành markdown
         markdown_result = "### Thống kê hệ thống JobHub\n\n"
@@ -667,9 +649,8 @@ THÔNG TIN DÀNH CHO NGƯỜI TÌM VIỆC:
             if simple_response:
                 return simple_response
             
-            # Lấy dữ liệu hệ thống
-            system_data = self.get_system_data()
-            system_data_text = self._format_system_data_for_prompt(system_data)
+            # Dữ liệu hệ thống đã được format sẵn trong snapshot
+            system_data_text = self.get_system_data_text()
 
             # Khởi tạo model Gemini
             model = self._initialize_generative_model()
@@ -797,7 +778,9 @@ Yêu cầu:
         from enterprises.models import PostEntity, FieldEntity, PositionEntity
         
         # Lấy 10 việc làm mới nhất đang hoạt động
-        recent_posts = PostEntity.objects.filter(is_active=True).order_by('-created_at')[:10]
+        recent_posts = PostEntity.objects.filter(is_active=True).select_related(
+            'enterprise', 'position', 'field'
+        ).order_by('-created_at')[:10]
         
         # Lấy các vị trí công việc
         positions = PositionEntity.objects.all()[:20]
@@ -973,46 +956,21 @@ Yêu cầu:
                 else:
                     return ' '.join(words[:8]) + '...' 
 
+    def build_system_data(self):
+        """Lấy dữ liệu hệ thống từ database"""
+        return {
+            "basic_job_data": self.get_basic_job_data(),
+            "stats_data": self.get_stats_data_raw(),
+            "updated_at": timezone.localtime().strftime("%d/%m/%Y %H:%M:%S")
+        }
+
     def get_system_data(self, force_refresh=False):
-        """Lấy dữ liệu hệ thống từ database và cache lại"""
-        current_time = datetime.now()
-        
-        # Kiểm tra nếu cache đã hết hạn hoặc bị buộc làm mới
-        if (self.system_data_cache is None or 
-            self.cache_last_updated is None or 
-            (current_time - self.cache_last_updated).total_seconds() > self.cache_ttl or 
-            force_refresh):
-            try:
-                # Lấy dữ liệu cơ bản
-                all_job = PostEntity.objects.all()
-                all_company = EnterpriseEntity.objects.all()
-                all_position = PositionEntity.objects.all()
-                all_field = FieldEntity.objects.all()
+        """Dữ liệu hệ thống lấy từ snapshot dùng chung (xem get_system_snapshot)"""
+        return get_system_snapshot(force_refresh=force_refresh)['data']
 
-                basic_job_data = self.get_basic_job_data()
-                
-                # Lấy dữ liệu thống kê
-                stats_data = self.get_stats_data_raw()
-                
-                # Tổng hợp dữ liệu hệ thống
-                self.system_data_cache = {
-                    "all_job": all_job,
-                    "all_company": all_company,
-                    "all_position": all_position,
-                    "all_field": all_field,
-                    "basic_job_data": basic_job_data,
-                    "stats_data": stats_data,
-                    "updated_at": current_time.strftime("%d/%m/%Y %H:%M:%S")
-                }
-                
-                self.cache_last_updated = current_time
-                
-            except Exception as e:
-                self.logger.error(f"Lỗi khi lấy dữ liệu hệ thống: {str(e)}")
-                if self.system_data_cache is None:
-                    self.system_data_cache = {"error": "Không thể lấy dữ liệu hệ thống"}
-        
-        return self.system_data_cache
+    def get_system_data_text(self):
+        """Dữ liệu hệ thống đã được format sẵn cho prompt"""
+        return get_system_snapshot()['text']
         
     def _format_system_data_for_prompt(self, system_data):
         """Format dữ liệu hệ thống thành văn bản ngắn gọn cho system prompt"""
@@ -1054,11 +1012,16 @@ Yêu cầu:
         """Lấy dữ liệu thống kê hệ thống dạng raw"""
         from enterprises.models import PostEntity, EnterpriseEntity
         
-        # Đếm số lượng việc làm đang hoạt động
-        active_jobs_count = PostEntity.objects.filter(is_active=True).count()
-        
-        # Đếm tổng số việc làm
-        total_jobs_count = PostEntity.objects.count()
+        # Số việc làm và mức lương trung bình được tính trong database bằng một truy vấn
+        # (Avg bỏ qua giá trị NULL)
+        post_stats = PostEntity.objects.aggregate(
+            total_jobs_count=Count('id'),
+            active_jobs_count=Count('id', filter=Q(is_active=True)),
+            avg_salary_min=Avg('salary_min', filter=Q(is_active=True)),
+            avg_salary_max=Avg('salary_max', filter=Q(is_active=True))
+        )
+        active_jobs_count = post_stats['active_jobs_count']
+        total_jobs_count = post_stats['total_jobs_count']
         
         # Đếm số lượng doanh nghiệp
         enterprise_count = EnterpriseEntity.objects.count()
@@ -1069,12 +1032,8 @@ Yêu cầu:
         # Đếm số lượng ứng viên (người dùng có vai trò 'candidate')
         candidates_count = UserAccount.objects.filter(user_roles__role__name='candidate').count()
         
-        # Tính mức lương trung bình
-        avg_salary_min = PostEntity.objects.filter(is_active=True, salary_min__isnull=False).values_list('salary_min', flat=True)
-        avg_salary_max = PostEntity.objects.filter(is_active=True, salary_max__isnull=False).values_list('salary_max', flat=True)
-        
-        avg_min = round(sum(avg_salary_min) / len(avg_salary_min)) if avg_salary_min else 0
-        avg_max = round(sum(avg_salary_max) / len(avg_salary_max)) if avg_salary_max else 0
+        avg_min = round(post_stats['avg_salary_min'] or 0)
+        avg_max = round(post_stats['avg_salary_max'] or 0)
         
         # Việc làm theo thành phố
         city_stats = PostEntity.objects.filter(is_active=True).values('city').annotate(count=Count('city')).order_by('-count')[:5]
@@ -1092,4 +1051,40 @@ Yêu cầu:
             'avg_max': avg_max,
             'city_stats': list(city_stats),
             'field_stats': list(field_stats)
-        } 
\ No newline at end of file
+        } 
+
+
+def build_system_snapshot():
+    """Lấy dữ liệu hệ thống và format sẵn phần prompt"""
+    service = GeminiChatService()
+    data = service.build_system_data()
+    return {
+        "data": data,
+        "text": service._format_system_data_for_prompt(data)
+    }
+
+
+def refresh_system_snapshot():
+    """Tính lại snapshot và ghi đè vào cache (request vẫn đọc bản cũ trong lúc tính)"""
+    snapshot = build_system_snapshot()
+    cache.set(SYSTEM_SNAPSHOT_CACHE_KEY, snapshot, SYSTEM_SNAPSHOT_CACHE_TIMEOUT)
+    return snapshot
+
+
+def get_system_snapshot(force_refresh=False):
+    """
+    Snapshot dữ liệu hệ thống cho prompt của trợ lý AI
+
+    Thường chỉ là một lần đọc cache; khi chưa có (lần chạy đầu, cache bị xóa) chỉ một
+    request tính lại, các request khác chờ kết quả đó.
+    """
+    if force_refresh:
+        return refresh_system_snapshot()
+    try:
+        return get_or_compute(SYSTEM_SNAPSHOT_CACHE_KEY, build_system_snapshot, SYSTEM_SNAPSHOT_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Lỗi khi lấy dữ liệu hệ thống: {str(e)}")
+        return {
+            "data": {"error": "Không thể lấy dữ liệu hệ thống"},
+            "text": "Không có dữ liệu hệ thống."
+        }
@@ -0,0 +1,12 @@
+from celery import shared_task
+
+
+@shared_task
+def refresh_system_snapshot_task():
+    """
+    Task định kỳ làm mới snapshot dữ liệu hệ thống dùng cho prompt của trợ lý AI
+    """
+    from .services import refresh_system_snapshot
+
+    snapshot = refresh_system_snapshot()
+    return snapshot['data'].get('updated_at')
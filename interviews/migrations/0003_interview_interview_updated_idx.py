@@ -0,0 +1,21 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enterprises', '0029_postentity_post_modified_idx'),
+        ('interviews', '0002_alter_interview_options'),
+        ('profiles', '0006_cv_cv_modified_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='interview',
+            index=models.Index(fields=['updated_at'], name='interview_updated_idx'),
+        ),
+    ]
@@ -31,3 +31,6 @@ class Interview(models.Model):
         ordering = ['-interview_date']
         verbose_name = 'Cuộc phỏng vấn'
         verbose_name_plural = 'Cuộc phỏng vấn'
+        indexes = [
+            models.Index(fields=['updated_at'], name='interview_updated_idx'),
+        ]
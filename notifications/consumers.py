@@ -6,11 +6,12 @@ from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from chat.consumers import ChatConsumerMixin
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
-class NotificationConsumer(AsyncJsonWebsocketConsumer):
+class NotificationConsumer(ChatConsumerMixin, AsyncJsonWebsocketConsumer):
     async def connect(self):
         logger.info(f"WebSocket kết nối mới: {self.scope['client']}")
         
@@ -32,6 +33,9 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):
         logger.info(f"WebSocket ngắt kết nối: {self.scope['client']} với mã {close_code}")
         
         if self.authenticated and self.user_id:
+            # Ghi nốt tin nhắn chat còn chờ trong lô
+            await self.close_chat()
+
             # Chỉ rời nhóm nếu đã xác thực thành công
             try:
                 logger.info(f"Rời channel_layer group cho user: {self.user_id}")
@@ -92,8 +96,9 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):
                         'message': f'Authentication error: {str(e)}'
                     })
         else:
-            # Đã xác thực, xử lý các message khác
-            logger.info(f"Nhận message từ user đã xác thực {self.user_id}: {content}")
+            # Đã xác thực, xử lý tin nhắn chat (gửi, đang gõ, đã đọc) và các message khác
+            if not await self.receive_chat(content):
+                logger.info(f"Nhận message từ user đã xác thực {self.user_id}: {content}")
 
     @database_sync_to_async
     def get_user_from_token(self, token):
@@ -119,4 +124,11 @@ class NotificationConsumer(AsyncJsonWebsocketConsumer):
         """Gửi thông báo tới client"""
         if self.authenticated:
             logger.info(f"Gửi thông báo tới user {self.user_id}: {event}")
-            await self.send_json(event['data'])
\ No newline at end of file
+            await self.send_json(event['data'])
+
+    async def notify_batch(self, event):
+        """Gửi nhiều thông báo (cùng một lần group_send) tới client"""
+        if self.authenticated:
+            logger.info(f"Gửi {len(event['data'])} thông báo tới user {self.user_id}")
+            for data in event['data']:
+                await self.send_json(data)
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='aggregate_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -20,6 +20,8 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     link = models.CharField(max_length=10000, default='')
+    # Số thông báo đã được gộp vào dòng này (job dọn dẹp gộp các lần xem cùng một CV)
+    aggregate_count = models.PositiveIntegerField(default=1)
     
     # Để lưu reference tới object gây ra notification (CV, Post, etc)
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
@@ -29,4 +31,10 @@ class Notification(models.Model):
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Thông báo'
-        verbose_name_plural = 'Thông báo'
\ No newline at end of file
+        verbose_name_plural = 'Thông báo'
+        indexes = [
+            # Danh sách thông báo của user (mới nhất trước)
+            models.Index(fields=['recipient', 'created_at'], name='notification_recipient_idx'),
+            # Đếm lại số thông báo chưa đọc khi bộ đếm trong cache bị mất
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='notification_unread_idx'),
+        ]
\ No newline at end of file
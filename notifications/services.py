@@ -1,6 +1,204 @@
 # notifications/services.py
+import logging
+import re
+import weakref
+from collections import Counter
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+
 from .models import Notification
 
+logger = logging.getLogger(__name__)
+
+# Bộ đếm thông báo chưa đọc được cập nhật khi tạo/đọc thông báo; hết hạn thì đếm lại từ database
+UNREAD_COUNT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def unread_count_cache_key(user_id):
+    return f'notification_unread:{user_id}'
+
+
+def get_unread_counts(user_ids):
+    """
+    Số thông báo chưa đọc của nhiều user: đọc bộ đếm trong cache, những user chưa có
+    bộ đếm được đếm lại bằng một truy vấn GROUP BY. Trả về dict {user_id: số chưa đọc}.
+    """
+    keys = {unread_count_cache_key(user_id): user_id for user_id in set(user_ids)}
+    counts = {keys[key]: max(count, 0) for key, count in cache.get_many(list(keys)).items()}
+
+    missing = [user_id for user_id in keys.values() if user_id not in counts]
+    if missing:
+        loaded = dict(
+            Notification.objects.filter(recipient_id__in=missing, is_read=False)
+            .values('recipient_id').annotate(count=Count('id'))
+            .order_by().values_list('recipient_id', 'count')
+        )
+        for user_id in missing:
+            count = loaded.get(user_id, 0)
+            # add để không ghi đè bộ đếm vừa được tăng/giảm ở request khác
+            if not cache.add(unread_count_cache_key(user_id), count, UNREAD_COUNT_CACHE_TIMEOUT):
+                count = max(cache.get(unread_count_cache_key(user_id), count), 0)
+            counts[user_id] = count
+    return counts
+
+
+def get_unread_count(user_id):
+    """Số thông báo chưa đọc của user (O(1) khi bộ đếm đã có trong cache)"""
+    return get_unread_counts([user_id])[user_id]
+
+
+def change_unread_count(user_id, delta):
+    """Tăng/giảm bộ đếm; nếu bộ đếm chưa có thì để lần đọc sau đếm lại từ database"""
+    if not delta:
+        return
+    try:
+        if cache.incr(unread_count_cache_key(user_id), delta) < 0:
+            cache.delete(unread_count_cache_key(user_id))
+    except ValueError:
+        pass
+
+
+def reset_unread_count(user_id, count=0):
+    cache.set(unread_count_cache_key(user_id), count, UNREAD_COUNT_CACHE_TIMEOUT)
+
+
+def invalidate_unread_counts(user_ids):
+    cache.delete_many([unread_count_cache_key(user_id) for user_id in user_ids])
+
+
+# Hậu tố số lần của thông báo đã được gộp, ví dụ "... đã được xem (3 lần)"
+AGGREGATE_SUFFIX_RE = re.compile(r' \(\d+ lần\)$')
+
+
+def delete_old_read_notifications(before, batch_size):
+    """
+    Xóa thông báo đã đọc tạo trước thời điểm before, mỗi lần tối đa batch_size dòng
+
+    Xóa theo từng batch id để mỗi transaction ngắn và không khóa bảng lâu.
+    Trả về tổng số dòng đã xóa.
+    """
+    deleted = 0
+    while True:
+        ids = list(
+            Notification.objects.filter(is_read=True, created_at__lt=before)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        # Chỉ xóa thông báo đã đọc nên không ảnh hưởng bộ đếm chưa đọc
+        deleted += Notification.objects.filter(id__in=ids, is_read=True).delete()[0]
+        if len(ids) < batch_size:
+            return deleted
+
+
+def collapse_cv_viewed_notifications(batch_size):
+    """
+    Gộp các thông báo 'cv_viewed' của cùng một CV gửi cho cùng một user thành một dòng
+
+    Giữ lại dòng mới nhất, ghi số lần vào aggregate_count và nội dung, xóa các dòng cũ.
+    Dòng gộp là chưa đọc nếu còn bất kỳ thông báo nào chưa đọc. Mỗi vòng xử lý tối đa
+    batch_size nhóm. Trả về số dòng đã xóa.
+    """
+    removed = 0
+    while True:
+        groups = list(
+            Notification.objects.filter(notification_type='cv_viewed')
+            .values('recipient_id', 'content_type_id', 'object_id')
+            .annotate(
+                rows=Count('id'),
+                latest_id=Max('id'),
+                total=Sum('aggregate_count'),
+                unread=Count('id', filter=Q(is_read=False))
+            )
+            .filter(rows__gt=1)
+            .order_by()[:batch_size]
+        )
+        if not groups:
+            return removed
+
+        latest = Notification.objects.in_bulk([group['latest_id'] for group in groups])
+        with transaction.atomic():
+            for group in groups:
+                kept = latest[group['latest_id']]
+                removed += Notification.objects.filter(
+                    notification_type='cv_viewed',
+                    recipient_id=group['recipient_id'],
+                    content_type_id=group['content_type_id'],
+                    object_id=group['object_id'],
+                    id__lt=kept.id
+                ).delete()[0]
+                Notification.objects.filter(id=kept.id).update(
+                    aggregate_count=group['total'],
+                    is_read=group['unread'] == 0,
+                    message=f"{AGGREGATE_SUFFIX_RE.sub('', kept.message)} ({group['total']} lần)"
+                )
+            # Số thông báo chưa đọc đã thay đổi, để lần đọc sau đếm lại
+            recipient_ids = {group['recipient_id'] for group in groups}
+            transaction.on_commit(lambda: invalidate_unread_counts(recipient_ids))
+
+        if len(groups) < batch_size:
+            return removed
+
+
+class NotificationBatch:
+    """
+    Các thông báo được tạo trong cùng một transaction
+
+    Được gửi sang Celery một lần khi transaction commit (một callback on_commit duy nhất).
+    payloads là thông báo đã có đủ nội dung, cv_events là sự kiện CV mà nội dung
+    (tên bài đăng, công ty, người nhận) được lấy ở Celery để request không phải truy vấn thêm.
+    """
+
+    def __init__(self):
+        self.payloads = []
+        self.cv_events = []
+
+    def flush(self):
+        payloads, self.payloads = self.payloads, []
+        cv_events, self.cv_events = self.cv_events, []
+        if not payloads and not cv_events:
+            return
+        from .tasks import create_notifications_task
+        try:
+            create_notifications_task.delay(payloads, cv_events)
+        except Exception as e:
+            # Broker không hoạt động: vẫn lưu thông báo để người dùng thấy khi tải lại
+            logger.error(f"Không thể đưa {len(payloads) + len(cv_events)} thông báo vào hàng đợi: {str(e)}")
+            NotificationService.create_notifications(
+                payloads + NotificationService.build_cv_notifications(cv_events)
+            )
+
+
+def _current_batch(connection):
+    """
+    Batch đang chờ commit của transaction hiện tại trên connection (None nếu chưa có)
+
+    Connection chỉ giữ weakref, tham chiếu mạnh duy nhất là callback on_commit của batch:
+    transaction (hoặc savepoint tạo ra batch) rollback thì Django bỏ callback, batch bị
+    thu hồi và transaction sau bắt đầu batch mới. Thông báo được thêm trong một savepoint
+    con đã rollback vẫn được gửi cùng batch; sự kiện CV không còn tồn tại bị bỏ qua ở task.
+    """
+    ref = getattr(connection, '_notification_batch', None)
+    return ref() if ref is not None else None
+
+
+def _enqueue(kind, item):
+    connection = transaction.get_connection()
+    batch = _current_batch(connection) if connection.in_atomic_block else None
+    if batch is None:
+        batch = NotificationBatch()
+        getattr(batch, kind).append(item)
+        if connection.in_atomic_block:
+            connection._notification_batch = weakref.ref(batch)
+        # Ngoài transaction callback được gọi ngay
+        transaction.on_commit(batch.flush, robust=True)
+    else:
+        getattr(batch, kind).append(item)
+
+
 class NotificationService:
     @staticmethod
     def create_notification(recipient, notification_type, title, link, message, related_object):
@@ -13,6 +211,108 @@ class NotificationService:
             content_object=related_object
         )
 
+    @staticmethod
+    def enqueue_notification(recipient, notification_type, title, link, message, related_object):
+        """
+        Đưa thông báo vào hàng đợi thay vì ghi database và gửi WebSocket ngay trong request
+
+        Các thông báo của cùng một transaction được gom lại, sau khi commit mới được
+        gửi sang Celery (create_notifications_task) để tạo bằng bulk_create và đẩy realtime.
+        """
+        _enqueue('payloads', {
+            'recipient_id': getattr(recipient, 'pk', recipient),
+            'notification_type': notification_type,
+            'title': title,
+            'link': link,
+            'message': message,
+            'content_type_id': ContentType.objects.get_for_model(related_object).id,
+            'object_id': related_object.pk
+        })
+
+    @staticmethod
+    def enqueue_cv_event(cv_id, event, old_status=None, new_status=None):
+        """
+        Đưa thông báo về CV vào hàng đợi chỉ với id CV (không cần truy vấn bài đăng/công ty)
+
+        event: 'cv_received' (gửi nhà tuyển dụng), 'cv_viewed' hoặc 'cv_status_changed' (gửi ứng viên)
+        """
+        _enqueue('cv_events', {
+            'cv_id': cv_id,
+            'event': event,
+            'old_status': old_status,
+            'new_status': new_status
+        })
+
+    @staticmethod
+    def build_cv_notifications(cv_events):
+        """Tạo nội dung thông báo cho các sự kiện CV bằng một truy vấn"""
+        if not cv_events:
+            return []
+        from profiles.models import Cv
+
+        cvs = Cv.objects.select_related('post__enterprise').in_bulk({event['cv_id'] for event in cv_events})
+        content_type_id = ContentType.objects.get_for_model(Cv).id
+
+        payloads = []
+        for event in cv_events:
+            cv = cvs.get(event['cv_id'])
+            if cv is None:
+                # CV đã bị xóa trước khi task chạy
+                continue
+            post = cv.post
+            if event['event'] == 'cv_received':
+                payload = {
+                    'recipient_id': post.enterprise.user_id,
+                    'notification_type': 'cv_received',
+                    'title': 'Có CV mới',
+                    'link': f'/employer/posts/{post.id}',
+                    'message': f'Bạn nhận được CV mới cho vị trí {post.title}'
+                }
+            elif event['event'] == 'cv_viewed':
+                payload = {
+                    'recipient_id': cv.user_id,
+                    'notification_type': 'cv_viewed',
+                    'title': 'CV của bạn đã được xem',
+                    'link': f'/job/{post.id}',
+                    'message': f'CV của bạn ứng tuyển vị trí {post.title} của công ty {post.enterprise.company_name} đã được xem'
+                }
+            else:
+                payload = {
+                    'recipient_id': cv.user_id,
+                    'notification_type': 'cv_status_changed',
+                    'title': 'Trạng thái CV đã thay đổi',
+                    'link': f'/job/{post.id}',
+                    'message': f'CV của bạn tới vị trí {post.title} của công ty {post.enterprise.company_name} đã được chuyển từ {NotificationService.translate_status(event["old_status"])} sang {NotificationService.translate_status(event["new_status"])}'
+                }
+            payload.update(content_type_id=content_type_id, object_id=cv.id)
+            payloads.append(payload)
+        return payloads
+
+    @staticmethod
+    def create_notifications(payloads):
+        """Tạo nhiều thông báo bằng một câu INSERT và tăng bộ đếm chưa đọc; trả về danh sách id"""
+        with transaction.atomic():
+            notifications = Notification.objects.bulk_create([Notification(**payload) for payload in payloads])
+            counts = Counter(notification.recipient_id for notification in notifications)
+            transaction.on_commit(lambda: [
+                change_unread_count(user_id, count) for user_id, count in counts.items()
+            ])
+        return [notification.id for notification in notifications]
+
+    @staticmethod
+    def mark_as_read(user_id, notification_id):
+        """Đánh dấu đã đọc; chỉ giảm bộ đếm khi thông báo thật sự chuyển sang đã đọc"""
+        updated = Notification.objects.filter(id=notification_id, recipient_id=user_id, is_read=False).update(is_read=True)
+        if updated:
+            change_unread_count(user_id, -updated)
+        return updated
+
+    @staticmethod
+    def mark_all_as_read(user_id):
+        updated = Notification.objects.filter(recipient_id=user_id, is_read=False).update(is_read=True)
+        reset_unread_count(user_id)
+        return updated
+
     @staticmethod
     def notify_cv_viewed(cv):
         NotificationService.create_notification(
@@ -34,7 +334,7 @@ class NotificationService:
             message=f'CV của bạn Service tới vị trí {cv.post.title} của công ty {cv.post.enterprise.company_name} đã được chuyển sang trạng thái {NotificationService.translate_status(new_status)}',
             related_object=cv
         )
-    
+
     def translate_status(status):
         if status == 'pending':
             return 'Chờ duyệt'
@@ -1,10 +1,12 @@
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.db.models import signals
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from .models import Notification
-from .services import NotificationService
+from .services import NotificationService, change_unread_count
+from .tasks import push_notifications_task
 from profiles.models import Cv
 from django.contrib.contenttypes.models import ContentType
 from model_utils import FieldTracker
@@ -14,82 +16,40 @@ logger = logging.getLogger(__name__)
 
 @receiver(post_save, sender=Cv)
 def handle_cv_changes(sender, instance, created, **kwargs):
-    """Xử lý các thay đổi liên quan đến CV"""
-    
+    """
+    Xử lý các thay đổi liên quan đến CV
+
+    Trạng thái cũ lấy từ FieldTracker, nội dung thông báo (bài đăng, công ty) được lấy
+    ở Celery nên lưu CV không tốn thêm truy vấn nào.
+    """
+
     # Trường hợp CV mới được tạo
     if created:
-        NotificationService.create_notification(
-            recipient=instance.post.enterprise.user,
-            notification_type='cv_received',
-            title='Có CV mới',
-            link=f'/employer/posts/{instance.post.id}',
-            message=f'Bạn nhận được CV mới cho vị trí {instance.post.title}',
-            related_object=instance
-        )
+        NotificationService.enqueue_cv_event(instance.id, 'cv_received')
         return
 
     # Trường hợp trạng thái CV thay đổi
     if instance.tracker.has_changed('status'):
-        old_status = instance.tracker.previous('status')
-        NotificationService.create_notification(
-            recipient=instance.user,
-            notification_type='cv_status_changed',
-            title='Trạng thái CV đã thay đổi',
-            link=f'/job/{instance.post.id}',
-            message=f'CV của bạn tới vị trí {instance.post.title} của công ty {instance.post.enterprise.company_name} đã được chuyển từ {NotificationService.translate_status(old_status)} sang {NotificationService.translate_status(instance.status)}',
-            related_object=instance
+        NotificationService.enqueue_cv_event(
+            instance.id,
+            'cv_status_changed',
+            old_status=instance.tracker.previous('status'),
+            new_status=instance.status
         )
 
-@receiver(signals.pre_save, sender=Cv)
-def store_old_status(sender, instance, **kwargs):
-    """Lưu trạng thái cũ trước khi cập nhật"""
-    if instance.id:
-        old_instance = sender.objects.get(id=instance.id)
-        instance._old_status = old_instance.status
-
 # Signal cho việc xem CV
 @receiver(signals.post_save, sender='profiles.CvView')
 def handle_cv_view(sender, instance, created, **kwargs):
-    """Xử lý khi CV được xem"""
+    """Xử lý khi CV được xem (nội dung thông báo được lấy ở Celery, không truy vấn trong request)"""
     if created:
-        # Thêm log để debug
-        logger.info(f"Signal handle_cv_view được gọi: CvView #{instance.id}, CV #{instance.cv.id}")
-        
-        # Tạo và gửi thông báo
-        title = 'CV của bạn đã được xem'
-        message = f'CV của bạn ứng tuyển vị trí {instance.cv.post.title} của công ty {instance.cv.post.enterprise.company_name} đã được xem'
-        link = f'/job/{instance.cv.post.id}'
-        
-        try:
-            # Sử dụng hàm utils để vừa tạo thông báo trong database vừa gửi realtime
-            create_and_send_notification(
-                user=instance.cv.user,
-                notification_type='cv_viewed',
-                title=title,
-                link=link,
-                message=message,
-                related_object=instance.cv
-            )
-            logger.info(f"Đã gửi thông báo realtime cho user {instance.cv.user.id} về việc xem CV #{instance.cv.id}")
-        except Exception as e:
-            logger.error(f"Lỗi khi tạo và gửi thông báo: {str(e)}")
-            
-            # Vẫn cố gắng tạo thông báo qua NotificationService nếu có lỗi
-            NotificationService.create_notification(
-                recipient=instance.cv.user,
-                notification_type='cv_viewed',
-                title=title,
-                link=link,
-                message=message,
-                related_object=instance.cv
-            )
+        NotificationService.enqueue_cv_event(instance.cv_id, 'cv_viewed')
 
 # Signal cho việc đánh dấu CV
 @receiver(signals.post_save, sender='profiles.CvMark')
 def handle_cv_mark(sender, instance, created, **kwargs):
     """Xử lý khi CV được đánh dấu"""
     if created:
-        NotificationService.create_notification(
+        NotificationService.enqueue_notification(
             recipient=instance.cv.user,
             notification_type='cv_marked',
             title='CV của bạn đã được đánh dấu',
@@ -103,7 +63,7 @@ def handle_cv_mark(sender, instance, created, **kwargs):
 def handle_interview_invitation(sender, instance, created, **kwargs):
     """Xử lý khi có lời mời phỏng vấn"""
     if created:
-        NotificationService.create_notification(
+        NotificationService.enqueue_notification(
             recipient=instance.candidate,
             notification_type='interview_invited',
             title='Lời mời phỏng vấn',
@@ -169,52 +129,31 @@ def handle_new_message(sender, instance, created, **kwargs):
         except Exception as e:
             print(f"Lỗi khi gửi tin nhắn qua websocket: {e}")
 
-def send_notification_to_websocket(notification):
-    """Gửi notification qua WebSocket"""
-    channel_layer = get_channel_layer()
-    
-    # Dữ liệu cơ bản của thông báo
-    data = {
-        "id": notification.id,
-        "type": notification.notification_type,
-        "title": notification.title,
-        "message": notification.message,
-        "link": notification.link,
-        "is_read": notification.is_read,
-        "created_at": notification.created_at.isoformat(),
-        "related_object": {
-            "type": notification.content_type.model,
-            "id": notification.object_id
-        }
-    }
-    
-    # Nếu là thông báo tin nhắn mới, thêm thông tin chi tiết
-    if notification.notification_type == 'message_received' and notification.content_object:
-        message = notification.content_object
-        data.update({
-            "type": "new_message",
-            "message_id": message.id,
-            "sender_id": message.sender.id,
-            "recipient_id": message.recipient.id,
-            "content": message.content,
-            "is_read": message.is_read,
-            "sender_name": message.sender.get_full_name() or message.sender.username
-        })
-    
-    async_to_sync(channel_layer.group_send)(
-        f"user_{notification.recipient.id}",
-        {
-            "type": "notify",
-            "data": data
-        }
-    )
-
 # Kết nối signal với websocket
 @receiver(post_save, sender=Notification)
 def notification_created(sender, instance, created, **kwargs):
-    """Gửi notification qua WebSocket khi được tạo"""
+    """
+    Thông báo tạo lẻ (ngoài batch của Celery): tăng bộ đếm và đẩy WebSocket sau khi commit
+
+    Không gọi channel layer trong transaction của người ghi; transaction rollback thì
+    callback bị bỏ nên client không nhận thông báo/số chưa đọc không tồn tại.
+    """
     if created:
-        send_notification_to_websocket(instance)
+        notification_id, recipient_id, is_read = instance.id, instance.recipient_id, instance.is_read
+
+        def push():
+            if not is_read:
+                change_unread_count(recipient_id, 1)
+            # Task gửi kèm số thông báo chưa đọc mới
+            push_notifications_task.delay([notification_id])
+
+        transaction.on_commit(push, robust=True)
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    """Thông báo chưa đọc bị xóa thì giảm bộ đếm"""
+    if not instance.is_read:
+        change_unread_count(instance.recipient_id, -1)
 
 def translate_status(status):
     if status == 'pending':
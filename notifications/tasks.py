@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+
+@shared_task(
+    autoretry_for=(DatabaseError,),
+    retry_backoff=True,
+    retry_backoff_max=60,
+    max_retries=5
+)
+def create_notifications_task(payloads, cv_events=None):
+    """
+    Task tạo các thông báo đã được gom trong một transaction rồi đẩy realtime
+
+    cv_events (thông báo về CV) được lấy nội dung ở đây bằng một truy vấn.
+    bulk_create chạy trong một transaction nên khi lỗi sẽ thử lại toàn bộ mà không tạo trùng.
+    """
+    from .services import NotificationService
+
+    payloads = payloads + NotificationService.build_cv_notifications(cv_events or [])
+    notification_ids = NotificationService.create_notifications(payloads)
+    push_notifications_task.delay(notification_ids)
+    return len(notification_ids)
+
+
+@shared_task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_backoff_max=60,
+    max_retries=5
+)
+def push_notifications_task(notification_ids):
+    """
+    Task đẩy thông báo qua WebSocket (tách riêng để Redis lỗi chỉ làm thử lại bước gửi)
+    """
+    from .models import Notification
+    from .utils import send_notifications_to_websocket
+
+    notifications = Notification.objects.filter(id__in=notification_ids).select_related('content_type')
+    return send_notifications_to_websocket(notifications)
+
+
+@shared_task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_backoff_max=60,
+    max_retries=3
+)
+def push_unread_count_task(user_id):
+    """
+    Task đẩy số thông báo chưa đọc mới (sau khi đọc/đánh dấu tất cả đã đọc)
+    """
+    from .utils import send_unread_count
+
+    send_unread_count(user_id)
+
+
+@shared_task
+def cleanup_notifications():
+    """
+    Task định kỳ giữ bảng thông báo nhỏ: gộp các thông báo xem CV lặp lại và xóa
+    thông báo đã đọc cũ hơn NOTIFICATION_RETENTION_DAYS ngày (theo từng batch)
+    """
+    from .services import collapse_cv_viewed_notifications, delete_old_read_notifications
+
+    batch_size = settings.NOTIFICATION_CLEANUP_BATCH_SIZE
+    collapsed = collapse_cv_viewed_notifications(batch_size)
+    before = timezone.now() - timedelta(days=settings.NOTIFICATION_RETENTION_DAYS)
+    deleted = delete_old_read_notifications(before, batch_size)
+    return {'collapsed': collapsed, 'deleted': deleted}
@@ -1,3 +1,129 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from accounts.models import UserAccount
+from enterprises.models import EnterpriseEntity, FieldEntity, PositionEntity, PostEntity
+from profiles.models import Cv, CvView
+from . import tasks
+from .services import NotificationService
+
+
+def cv_ids(call):
+    """id CV trong một lần gọi create_notifications_task.delay(payloads, cv_events)"""
+    payloads, cv_events = call.args
+    return [event['cv_id'] for event in cv_events]
+
+
+class NotificationBatchTests(TransactionTestCase):
+    """
+    Thông báo tạo trong một transaction được gửi sang Celery một lần sau khi commit
+
+    Dùng TransactionTestCase để transaction commit/rollback thật (TestCase bọc cả test
+    trong một transaction nên callback on_commit không chạy như thực tế).
+    """
+
+    def setUp(self):
+        patcher = mock.patch.object(tasks.create_notifications_task, 'delay')
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def enqueue(self, *ids):
+        for cv_id in ids:
+            NotificationService.enqueue_cv_event(cv_id, 'cv_received')
+
+    def test_one_delivery_per_transaction(self):
+        with transaction.atomic():
+            self.enqueue(1, 2, 3)
+            self.delay.assert_not_called()
+
+        self.assertEqual([cv_ids(call) for call in self.delay.call_args_list], [[1, 2, 3]])
+
+    def test_outside_transaction_is_sent_immediately(self):
+        self.enqueue(1)
+        self.enqueue(2)
+
+        self.assertEqual([cv_ids(call) for call in self.delay.call_args_list], [[1], [2]])
+
+    def test_rollback_drops_batch(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                self.enqueue(1, 2)
+                raise ValueError
+        self.delay.assert_not_called()
+
+        # Transaction sau bắt đầu batch mới, không mang theo thông báo đã rollback
+        with transaction.atomic():
+            self.enqueue(3)
+        self.assertEqual([cv_ids(call) for call in self.delay.call_args_list], [[3]])
+
+    def test_rolled_back_savepoint_that_created_batch_is_dropped(self):
+        with transaction.atomic():
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    self.enqueue(1)
+                    raise ValueError
+            self.enqueue(2)
+
+        self.assertEqual([cv_ids(call) for call in self.delay.call_args_list], [[2]])
+
+    def test_released_savepoint_joins_outer_batch(self):
+        with transaction.atomic():
+            with transaction.atomic():
+                self.enqueue(1)
+            self.enqueue(2)
+
+        self.assertEqual([cv_ids(call) for call in self.delay.call_args_list], [[1, 2]])
+
+
+class CvNotificationTests(TransactionTestCase):
+    """Nội dung thông báo về CV được lấy ở Celery từ id CV"""
+
+    def setUp(self):
+        patcher = mock.patch.object(tasks.create_notifications_task, 'delay')
+        self.delay = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.employer = UserAccount.objects.create(username='employer', email='employer@test.local', is_active=True)
+        self.candidate = UserAccount.objects.create(username='candidate', email='candidate@test.local', is_active=True)
+        field = FieldEntity.objects.create(name='CNTT', code='it', status='active')
+        position = PositionEntity.objects.create(name='Dev', code='dev', field=field, status='active')
+        self.enterprise = EnterpriseEntity.objects.create(
+            company_name='Công ty A', address='Hà Nội', description='', email_company='a@test.local',
+            field_of_activity='CNTT', phone_number='0900000000', scale='10-50', tax='0',
+            user=self.employer, city='Hà Nội'
+        )
+        self.post = PostEntity.objects.create(
+            title='Lập trình viên', enterprise=self.enterprise, position=position, field=field, city='Hà Nội',
+            deadline=(timezone.now() + timedelta(days=10)).date(), is_active=True
+        )
+        self.cv = Cv.objects.create(
+            user=self.candidate, post=self.post, name='Ứng viên', email='candidate@test.local',
+            phone_number='0900000001', description=''
+        )
+
+    def test_cv_created_and_viewed_enqueue_events_only(self):
+        self.delay.reset_mock()
+        CvView.objects.create(cv=self.cv, viewer=self.enterprise)
+
+        payloads, cv_events = self.delay.call_args.args
+        self.assertEqual(payloads, [])
+        self.assertEqual([(event['cv_id'], event['event']) for event in cv_events], [(self.cv.id, 'cv_viewed')])
+
+    def test_build_cv_notifications(self):
+        payloads = NotificationService.build_cv_notifications([
+            {'cv_id': self.cv.id, 'event': 'cv_received', 'old_status': None, 'new_status': None},
+            {'cv_id': self.cv.id, 'event': 'cv_viewed', 'old_status': None, 'new_status': None},
+            {'cv_id': self.cv.id + 1000, 'event': 'cv_viewed', 'old_status': None, 'new_status': None},
+        ])
+
+        # CV không còn tồn tại bị bỏ qua
+        self.assertEqual(
+            [(payload['recipient_id'], payload['notification_type']) for payload in payloads],
+            [(self.employer.id, 'cv_received'), (self.candidate.id, 'cv_viewed')]
+        )
+        self.assertIn(self.post.title, payloads[1]['message'])
+        self.assertIn(self.enterprise.company_name, payloads[1]['message'])
@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 from channels.layers import get_channel_layer
@@ -54,53 +55,98 @@ def send_notification_to_user(user_id, notification_type, title, message, data=N
         logger.error(f"Lỗi khi gửi thông báo realtime: {str(e)}")
         return False
 
+def build_notification_data(notification):
+    """Dữ liệu WebSocket của một thông báo đã lưu trong database"""
+    data = {
+        "id": notification.id,
+        "type": notification.notification_type,
+        "title": notification.title,
+        "message": notification.message,
+        "link": notification.link,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at.isoformat(),
+        "related_object": {
+            "type": notification.content_type.model,
+            "id": notification.object_id
+        }
+    }
+
+    # Nếu là thông báo tin nhắn mới, thêm thông tin chi tiết
+    if notification.notification_type == 'message_received' and notification.content_object:
+        message = notification.content_object
+        data.update({
+            "type": "new_message",
+            "message_id": message.id,
+            "sender_id": message.sender.id,
+            "recipient_id": message.recipient.id,
+            "content": message.content,
+            "is_read": message.is_read,
+            "sender_name": message.sender.get_full_name() or message.sender.username
+        })
+    return data
+
+def unread_count_data(count):
+    return {"type": "unread_count", "unread_count": count}
+
+def send_unread_count(user_id):
+    """Đẩy số thông báo chưa đọc hiện tại của user qua WebSocket"""
+    from .services import get_unread_count
+
+    channel_layer = get_channel_layer()
+    async_to_sync(channel_layer.group_send)(
+        f"user_{user_id}",
+        {"type": "notify", "data": unread_count_data(get_unread_count(user_id))}
+    )
+
+def send_notifications_to_websocket(notifications):
+    """
+    Đẩy nhiều thông báo qua WebSocket: mỗi người nhận một lần group_send (sự kiện
+    notify_batch), tất cả trong cùng một vòng event loop
+
+    Lỗi của channel layer được đẩy lên để task Celery thử lại.
+    """
+    from .services import get_unread_counts
+
+    by_recipient = {}
+    for notification in notifications:
+        by_recipient.setdefault(notification.recipient_id, []).append(build_notification_data(notification))
+    if not by_recipient:
+        return 0
+
+    # Gửi kèm số thông báo chưa đọc mới để client cập nhật badge
+    for user_id, count in get_unread_counts(by_recipient).items():
+        by_recipient[user_id].append(unread_count_data(count))
+
+    channel_layer = get_channel_layer()
+
+    async def send_all():
+        await asyncio.gather(*(
+            channel_layer.group_send(f"user_{user_id}", {"type": "notify_batch", "data": items})
+            for user_id, items in by_recipient.items()
+        ))
+
+    async_to_sync(send_all)()
+    return len(by_recipient)
+
 def create_and_send_notification(user, notification_type, title, link, message, related_object=None):
     """
-    Tạo thông báo trong cơ sở dữ liệu và gửi thông báo realtime
-    
+    Đưa thông báo vào hàng đợi: thông báo được tạo trong database và gửi realtime
+    ở Celery sau khi transaction hiện tại commit
+
     Args:
         user: Đối tượng User
         notification_type: Loại thông báo
         title: Tiêu đề
         link: Đường dẫn liên kết
         message: Nội dung thông báo
-        related_object: Đối tượng liên quan (optional)
+        related_object: Đối tượng liên quan
     """
-    try:
-        # 1. Tạo thông báo trong database
-        from .services import NotificationService
-        notification = NotificationService.create_notification(
-            recipient=user,
-            notification_type=notification_type,
-            title=title,
-            link=link,
-            message=message,
-            related_object=related_object
-        )
-        
-        # 2. Gửi thông báo realtime
-        notification_data = {
-            'notification_id': notification.id,
-            'link': link,
-            'created_at': notification.created_at.isoformat()
-        }
-        
-        if related_object:
-            # Thêm object_id và content_type nếu có related_object
-            notification_data.update({
-                'object_id': related_object.id,
-                'content_type': related_object._meta.model_name
-            })
-        
-        send_notification_to_user(
-            user_id=user.id,
-            notification_type=notification_type,
-            title=title,
-            message=message,
-            data=notification_data
-        )
-        
-        return notification
-    except Exception as e:
-        logger.error(f"Lỗi khi tạo và gửi thông báo: {str(e)}")
-        return None 
\ No newline at end of file
+    from .services import NotificationService
+    NotificationService.enqueue_notification(
+        recipient=user,
+        notification_type=notification_type,
+        title=title,
+        link=link,
+        message=message,
+        related_object=related_object
+    )
@@ -2,6 +2,8 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from .models import Notification
 from .serializers import NotificationSerializer
+from .services import NotificationService, get_unread_count as unread_count
+from .tasks import push_unread_count_task
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from base.pagination import CustomPagination
@@ -10,10 +12,16 @@ from drf_yasg import openapi
 from base.permissions import AdminAccessPermission
 from base.utils import create_permission_class_with_admin_override
 from django.shortcuts import render
+from django.db import transaction
 
 # Tạo các lớp quyền kết hợp với quyền admin
 AdminOrNotificationOwner = create_permission_class_with_admin_override(IsAuthenticated)
 
+
+def _push_unread_count(user_id):
+    """Đẩy số chưa đọc mới qua WebSocket ở Celery (request chỉ đưa vào hàng đợi)"""
+    transaction.on_commit(lambda: push_unread_count_task.delay(user_id), robust=True)
+
 @swagger_auto_schema(
     method='get',
     operation_description="""
@@ -148,12 +156,12 @@ def get_notifications(request):
 @permission_classes([IsAuthenticated, AdminOrNotificationOwner])
 def mark_as_read(request, notification_id):
     notification = get_object_or_404(
-        Notification, 
+        Notification.objects.only('id'),
         id=notification_id,
         recipient=request.user
     )
-    notification.is_read = True
-    notification.save()
+    if NotificationService.mark_as_read(request.user.id, notification.id):
+        _push_unread_count(request.user.id)
     return Response({'message': 'Đã đánh dấu là đã đọc'})
 
 @swagger_auto_schema(
@@ -190,11 +198,8 @@ def mark_as_read(request, notification_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, AdminOrNotificationOwner])
 def get_unread_count(request):
-    count = Notification.objects.filter(
-        recipient=request.user,
-        is_read=False
-    ).count()
-    return Response({'unread_count': count})
+    # Đọc bộ đếm được duy trì khi tạo/đọc thông báo thay vì COUNT toàn bảng
+    return Response({'unread_count': unread_count(request.user.id)})
 
 def websocket_test(request):
     """View để hiển thị trang test WebSocket"""
@@ -203,6 +208,7 @@ def websocket_test(request):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_all_as_read(request):
-    Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+    NotificationService.mark_all_as_read(request.user.id)
+    _push_unread_count(request.user.id)
     return Response({'message': 'Đã đánh dấu tất cả là đã đọc'})
 
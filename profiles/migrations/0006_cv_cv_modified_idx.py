@@ -0,0 +1,20 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('enterprises', '0029_postentity_post_modified_idx'),
+        ('profiles', '0005_cv_cv_post_user_idx_cv_cv_post_status_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cv',
+            index=models.Index(fields=['modified_at'], name='cv_modified_idx'),
+        ),
+    ]
@@ -60,6 +60,7 @@ class Cv(models.Model):
             models.Index(fields=['user', 'created_at'], name='cv_user_time_idx'),
             models.Index(fields=['post'], name='cv_post_idx'),
             models.Index(fields=['created_at'], name='cv_time_idx'),
+            models.Index(fields=['modified_at'], name='cv_modified_idx'),
         ]
 
 # profiles/models.py
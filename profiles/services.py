@@ -0,0 +1,78 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from base.cache import invalidate_tags
+from enterprises.services import enterprise_stats_cache_tag, post_detail_cache_tag
+from notifications.services import NotificationService
+from .models import Cv, UserInfo
+
+# Tên hiển thị ít thay đổi nên được cache lâu, bị xóa khi UserInfo/UserAccount thay đổi
+DISPLAY_NAME_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Số CV tối đa trong một lần cập nhật trạng thái hàng loạt
+BULK_CV_STATUS_LIMIT = 100
+
+
+def display_name_cache_key(user_id):
+    return f'display_name:{user_id}'
+
+
+def get_display_names(users):
+    """
+    Lấy tên hiển thị (UserInfo.fullname, nếu trống thì username) cho nhiều user cùng lúc
+
+    Đọc cache trước, những user chưa có trong cache được lấy bằng một truy vấn duy nhất
+    thay vì mỗi user một truy vấn như UserAccount.get_full_name().
+    Trả về dict {user_id: tên hiển thị}.
+    """
+    users = {user.id: user for user in users if user is not None}
+    if not users:
+        return {}
+
+    keys = {display_name_cache_key(user_id): user_id for user_id in users}
+    names = {keys[key]: name for key, name in cache.get_many(list(keys)).items()}
+
+    missing = [user_id for user_id in users if user_id not in names]
+    if missing:
+        fullnames = dict(UserInfo.objects.filter(user_id__in=missing).values_list('user_id', 'fullname'))
+        loaded = {user_id: fullnames.get(user_id) or users[user_id].username for user_id in missing}
+        cache.set_many(
+            {display_name_cache_key(user_id): name for user_id, name in loaded.items()},
+            DISPLAY_NAME_CACHE_TIMEOUT
+        )
+        names.update(loaded)
+    return names
+
+
+def invalidate_display_name(user_id):
+    cache.delete(display_name_cache_key(user_id))
+
+
+def bulk_update_cv_status(cvs, new_status):
+    """
+    Đổi trạng thái nhiều CV bằng một câu UPDATE (ví dụ nhà tuyển dụng từ chối hàng loạt)
+
+    update() không gửi signal nên thông báo cho ứng viên và việc vô hiệu hóa cache được
+    làm ở đây: mọi thông báo đi chung một batch và tag cache được vô hiệu hóa sau khi commit.
+    Trả về danh sách id CV thật sự đổi trạng thái.
+    """
+    with transaction.atomic():
+        changed = list(
+            cvs.select_for_update(of=('self',)).exclude(status=new_status)
+            .values_list('id', 'status', 'post_id', 'post__enterprise_id')
+        )
+        if not changed:
+            return []
+
+        Cv.objects.filter(id__in=[row[0] for row in changed]).update(
+            status=new_status,
+            modified_at=timezone.now()
+        )
+        for cv_id, old_status, _, _ in changed:
+            NotificationService.enqueue_cv_event(cv_id, 'cv_status_changed', old_status=old_status, new_status=new_status)
+
+        tags = {post_detail_cache_tag(post_id) for _, _, post_id, _ in changed}
+        tags.update(enterprise_stats_cache_tag(enterprise_id) for _, _, _, enterprise_id in changed)
+        transaction.on_commit(lambda: invalidate_tags(*tags))
+    return [row[0] for row in changed]
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import UserAccount
+from .models import UserInfo
+from .services import invalidate_display_name
+
+
+@receiver(post_save, sender=UserInfo)
+@receiver(post_delete, sender=UserInfo)
+def invalidate_display_name_on_profile_change(sender, instance, **kwargs):
+    """Họ tên thay đổi thì xóa tên hiển thị đã cache"""
+    invalidate_display_name(instance.user_id)
+
+
+@receiver(post_save, sender=UserAccount)
+@receiver(post_delete, sender=UserAccount)
+def invalidate_display_name_on_account_change(sender, instance, **kwargs):
+    """Tên hiển thị dùng username khi chưa có họ tên nên cũng xóa khi tài khoản thay đổi"""
+    invalidate_display_name(instance.id)
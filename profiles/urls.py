@@ -12,6 +12,7 @@ urlpatterns = [
     path('cv/<int:pk>/delete/', views.delete_cv, name='delete-cv'),
     # get_cvs_by_status
     path('cv/status/', views.get_cvs_by_status, name='get-cvs-by-status'),
+    path('cv/status/bulk/', views.bulk_update_cv_status, name='bulk-update-cv-status'),
     
     # CV Actions
     path('cv/<int:pk>/status/', views.update_cv_status, name='update-cv-status'),
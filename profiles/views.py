@@ -24,6 +24,7 @@ from django.contrib import messages
 from django.conf import settings
 from accounts.models import UserAccount
 from accounts.tasks import send_premium_confirmation_email
+from .services import BULK_CV_STATUS_LIMIT, bulk_update_cv_status as bulk_update_status
 
 # Tạo các lớp quyền kết hợp với quyền admin
 AdminOrProfileOwner = create_permission_class_with_admin_override(IsProfileOwner)
@@ -423,7 +424,7 @@ def get_cv_detail(request, pk):
             
         # Ẩn thông tin liên hệ cho người dùng không premium hoặc không có quyền xem
         package = request.user.get_premium_package()
-        if not package or not package.can_view_candidate_contacts:
+        if not package or not getattr(package, 'can_view_candidate_contacts', False):
             serializer = CvSerializer(cv)
             data = serializer.data.copy()
             # Ẩn thông tin liên hệ
@@ -700,6 +701,92 @@ def update_cv_status(request, pk):
         'errors': serializer.errors
     }, status=status.HTTP_400_BAD_REQUEST)
 
+@swagger_auto_schema(
+    method='put',
+    operation_description="Cập nhật trạng thái nhiều CV cùng lúc (ví dụ từ chối hàng loạt)",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        required=['cv_ids', 'status'],
+        properties={
+            'cv_ids': openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                description=f"Danh sách id CV (tối đa {BULK_CV_STATUS_LIMIT})"
+            ),
+            'status': openapi.Schema(
+                type=openapi.TYPE_STRING,
+                description="Trạng thái CV",
+                enum=['pending', 'approved', 'rejected']
+            ),
+        }
+    ),
+    responses={
+        200: openapi.Response(
+            description="CV status updated successfully",
+            schema=openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'message': openapi.Schema(type=openapi.TYPE_STRING),
+                    'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'data': openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'updated_ids': openapi.Schema(
+                                type=openapi.TYPE_ARRAY,
+                                items=openapi.Schema(type=openapi.TYPE_INTEGER)
+                            )
+                        }
+                    )
+                }
+            )
+        ),
+        400: openapi.Response(description="Bad request"),
+        403: openapi.Response(description="CV không thuộc doanh nghiệp của bạn")
+    },
+    security=[{'Bearer': []}]
+)
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def bulk_update_cv_status(request):
+    """Cập nhật trạng thái nhiều CV của doanh nghiệp bằng một truy vấn và một batch thông báo"""
+    new_status = request.data.get('status')
+    cv_ids = request.data.get('cv_ids')
+    if new_status not in dict(Cv.STATUS_CHOICES):
+        return Response({
+            'message': 'Trạng thái CV không hợp lệ',
+            'status': status.HTTP_400_BAD_REQUEST
+        }, status=status.HTTP_400_BAD_REQUEST)
+    # Chỉ nhận list: chuỗi "123" sẽ bị duyệt từng ký tự, dict bị duyệt theo key
+    if not isinstance(cv_ids, list) or len(cv_ids) > BULK_CV_STATUS_LIMIT:
+        cv_ids = None
+    else:
+        try:
+            # True/False là int trong Python nhưng không phải id hợp lệ
+            if any(isinstance(cv_id, bool) for cv_id in cv_ids):
+                raise TypeError
+            cv_ids = {int(cv_id) for cv_id in cv_ids}
+        except (TypeError, ValueError):
+            cv_ids = None
+    if not cv_ids:
+        return Response({
+            'message': f'cv_ids phải là danh sách tối đa {BULK_CV_STATUS_LIMIT} id CV',
+            'status': status.HTTP_400_BAD_REQUEST
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    cvs = Cv.objects.filter(id__in=cv_ids, post__enterprise=request.user.enterprises.first())
+    if cvs.count() != len(cv_ids):
+        return Response({
+            'message': 'You are not authorized to update these CVs',
+            'status': status.HTTP_403_FORBIDDEN
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    updated_ids = bulk_update_status(cvs, new_status)
+    return Response({
+        'message': 'Cập nhật trạng thái CV thành công',
+        'status': status.HTTP_200_OK,
+        'data': {'updated_ids': updated_ids}
+    }, status=status.HTTP_200_OK)
+
 @swagger_auto_schema(
     method='delete',
     operation_description="Xóa CV",
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.6 on 2026-10-17 15:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0010_premiumhistory_premium_status_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vnpaytransaction',
+            index=models.Index(fields=['modified_at'], name='vnpay_modified_idx'),
+        ),
+    ]
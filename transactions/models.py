@@ -33,6 +33,9 @@ class VnPayTransaction(models.Model):
     class Meta:
         verbose_name = 'Giao dịch VnPay'
         verbose_name_plural = 'Giao dịch VnPay'
+        indexes = [
+            models.Index(fields=['modified_at'], name='vnpay_modified_idx'),
+        ]
 
 class PremiumPackage(models.Model):
     name = models.CharField(max_length=100)  
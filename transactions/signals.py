@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.services import invalidate_all_entitlements, invalidate_entitlements
+from enterprises.services import refresh_enterprise_priority
+from .models import PremiumHistory, PremiumPackage
+
+
+@receiver(post_save, sender=PremiumHistory)
+@receiver(post_delete, sender=PremiumHistory)
+def sync_enterprise_priority(sender, instance, **kwargs):
+    """Đồng bộ hệ số ưu tiên của doanh nghiệp khi gói Premium được mua, hủy hoặc hết hạn"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: refresh_enterprise_priority([user_id]))
+
+
+@receiver(post_save, sender=PremiumHistory)
+@receiver(post_delete, sender=PremiumHistory)
+def invalidate_premium_entitlements(sender, instance, **kwargs):
+    """Gói Premium của user được mua, hủy hoặc hết hạn thì snapshot quyền hạn phải tải lại"""
+    invalidate_entitlements([instance.user_id])
+
+
+@receiver(post_save, sender=PremiumPackage)
+@receiver(post_delete, sender=PremiumPackage)
+def invalidate_package_entitlements(sender, instance, **kwargs):
+    """Sửa giới hạn của gói Premium ảnh hưởng tới mọi user đang dùng gói đó"""
+    invalidate_all_entitlements()
@@ -11,87 +11,58 @@ def get_admin_url(viewname, *args, **kwargs):
     """Trả về một hàm lambda để trì hoãn việc tạo URL cho đến khi cần thiết"""
     return lambda request=None: reverse_lazy(viewname, *args, **kwargs)
 
+def dashboard_metric(*path):
+    """Đọc một số liệu từ bản dashboard dùng chung, để badge ở sidebar không đếm lại mỗi lần tải trang"""
+    from .dashboard import get_dashboard_metrics
+    value = get_dashboard_metrics()
+    for key in path:
+        value = value[key]
+    return value
+
 def get_dashboard_config(request, context):
     """Hàm trả về cấu hình dashboard."""
-    from django.apps import apps
-    from django.db.models import Count, Sum, Avg, F
-    from django.utils import timezone
-    from datetime import timedelta, datetime
+    from .dashboard import get_dashboard_metrics
     
     try:
-        # Lấy số lượng từ các model
-        UserAccount = apps.get_model("accounts", "UserAccount")
-        UserInfo = apps.get_model("profiles", "UserInfo") 
-        EnterpriseEntity = apps.get_model("enterprises", "EnterpriseEntity")
-        PostEntity = apps.get_model("enterprises", "PostEntity")
-        Cv = apps.get_model("profiles", "Cv")
-        VnPayTransaction = apps.get_model("transactions", "VnPayTransaction")
-        PremiumPackage = apps.get_model("transactions", "PremiumPackage")
+        # Số liệu được tính bằng vài câu aggregate và dùng chung giữa các phiên admin
+        metrics = get_dashboard_metrics()
         
         # Đếm số lượng
-        user_count = UserAccount.objects.count()
-        user_info_count = UserInfo.objects.count()
-        enterprise_count = EnterpriseEntity.objects.count()
-        post_count = PostEntity.objects.count()
-        cv_count = Cv.objects.count()
+        user_count = metrics['users']['total']
+        user_info_count = metrics['user_info_count']
+        enterprise_count = metrics['enterprises']['total']
+        post_count = metrics['posts']['total']
+        cv_count = metrics['cvs']['total']
         
         # Tính các thống kê tài chính
-        total_revenue = VnPayTransaction.objects.filter(transaction_status='00').aggregate(Sum('amount'))['amount__sum'] or 0
-        premium_users = UserAccount.objects.filter(is_premium=True).count()
-        
-        # Số liệu theo ngày gần đây
-        today = timezone.now().date()
+        total_revenue = metrics['transactions']['revenue']
+        premium_users = metrics['users']['premium']
         
         # Dữ liệu cho biểu đồ theo ngày
-        days = 7
-        date_data = []
-        user_data = []
-        cv_data = []
-        post_data = []
-        
-        for i in range(days):
-            day = today - timedelta(days=(days-1-i))
-            date_data.append(day.strftime('%d/%m'))
-            
-            day_users = UserAccount.objects.filter(
-                date_joined__date=day
-            ).count()
-            user_data.append(day_users)
-            
-            day_cvs = Cv.objects.filter(
-                created_at__date=day
-            ).count()
-            cv_data.append(day_cvs)
-            
-            day_posts = PostEntity.objects.filter(
-                created_at__date=day
-            ).count()
-            post_data.append(day_posts)
+        date_data = metrics['daily']['labels']
+        user_data = metrics['daily']['users']
+        cv_data = metrics['daily']['cvs']
+        post_data = metrics['daily']['posts']
             
         # Thống kê CV theo trạng thái
-        cv_pending = Cv.objects.filter(status='pending').count()
-        cv_approved = Cv.objects.filter(status='approved').count()
-        cv_rejected = Cv.objects.filter(status='rejected').count()
+        cv_pending = metrics['cvs']['pending']
+        cv_approved = metrics['cvs']['approved']
+        cv_rejected = metrics['cvs']['rejected']
         
         # Thống kê bài đăng theo trạng thái
-        post_active = PostEntity.objects.filter(is_active=True).count()
-        post_inactive = PostEntity.objects.filter(is_active=False).count()
+        post_active = metrics['posts']['active']
+        post_inactive = metrics['posts']['inactive']
         
         # Thống kê người dùng theo loại
-        candidate_count = UserAccount.objects.filter(user_roles__role__name='candidate').count()
-        employer_count = UserAccount.objects.filter(user_roles__role__name='employer').count()
+        candidate_count = metrics['roles']['candidates']
+        employer_count = metrics['roles']['employers']
         
         # Thống kê việc làm theo lĩnh vực
-        job_fields = PostEntity.objects.values('field__name').annotate(count=Count('id')).order_by('-count')[:5]
-        job_field_labels = [field['field__name'] or 'Không xác định' for field in job_fields]
-        job_field_data = [field['count'] for field in job_fields]
-        
-        # Tính thời gian xử lý CV trung bình
-        avg_processing_time = Cv.objects.exclude(status='pending').annotate(
-            process_time=F('updated_at') - F('created_at')
-        ).aggregate(avg_time=Avg('process_time'))['avg_time']
+        job_field_labels = [field['field__name'] or 'Không xác định' for field in metrics['post_field_names']]
+        job_field_data = [field['count'] for field in metrics['post_field_names']]
         
-        avg_processing_days = round(avg_processing_time.days + avg_processing_time.seconds / 86400, 1) if avg_processing_time else 0
+        # Thời gian xử lý CV trung bình
+        avg_processing_days = metrics['cvs']['reviewed_days']
         
     except Exception as e:
         # Nếu có lỗi, thiết lập giá trị mặc định
@@ -557,7 +528,7 @@ UNFOLD = {
                         "icon": "person",
                         "link": get_admin_url("admin:accounts_useraccount_changelist"),
                         "badge": lambda request: {
-                            "value": apps.get_model("accounts", "UserAccount").objects.count(),
+                            "value": dashboard_metric("users", "total"),
                             "attrs": {"class": "bg-blue-500 text-white"},
                         } if "accounts" in apps.app_configs else None,
                     },
@@ -567,9 +538,7 @@ UNFOLD = {
                         "icon": "person",
                         "link": lambda request=None: reverse_lazy("admin:accounts_useraccount_changelist") + "?role=candidate",
                         "badge": lambda request: {
-                            "value": apps.get_model("accounts", "UserAccount").objects.filter(
-                                user_roles__role__name="candidate"
-                            ).distinct().count(),
+                            "value": dashboard_metric("roles", "candidates"),
                             "attrs": {"class": "bg-green-500 text-white"},
                         } if "accounts" in apps.app_configs else None,
                     },
@@ -579,9 +548,7 @@ UNFOLD = {
                         "icon": "person",
                         "link": lambda request=None: reverse_lazy("admin:accounts_useraccount_changelist") + "?role=employer",
                         "badge": lambda request: {
-                            "value": apps.get_model("accounts", "UserAccount").objects.filter(
-                                user_roles__role__name="employer"
-                            ).distinct().count(),
+                            "value": dashboard_metric("roles", "employers"),
                             "attrs": {"class": "bg-blue-500 text-white"},
                         } if "accounts" in apps.app_configs else None,
                     },
@@ -590,7 +557,7 @@ UNFOLD = {
                         "icon": "workspace_premium",
                         "link": lambda request=None: reverse_lazy("admin:accounts_useraccount_changelist") + "?is_premium__exact=1",
                         "badge": lambda request: {
-                            "value": apps.get_model("accounts", "UserAccount").objects.filter(is_premium=True).count(),
+                            "value": dashboard_metric("users", "premium"),
                             "attrs": {"class": "bg-purple-500 text-white"},
                         } if "accounts" in apps.app_configs else None,
                     },
@@ -617,7 +584,7 @@ UNFOLD = {
                         "icon": "business",
                         "link": get_admin_url("admin:enterprises_enterpriseentity_changelist"),
                         "badge": lambda request: {
-                            "value": apps.get_model("enterprises", "EnterpriseEntity").objects.count(),
+                            "value": dashboard_metric("enterprises", "total"),
                             "attrs": {"class": "bg-green-500 text-white"},
                         } if "enterprises" in apps.app_configs else None,
                     },
@@ -626,7 +593,7 @@ UNFOLD = {
                         "icon": "business",
                         "link": lambda request=None: reverse_lazy("admin:enterprises_enterpriseentity_changelist") + "?is_active=0",
                         "badge": lambda request: {
-                            "value": apps.get_model("enterprises", "EnterpriseEntity").objects.filter(is_active=False).count(),
+                            "value": dashboard_metric("enterprises", "unverified"),
                             "attrs": {"class": "bg-red-500 text-white"},
                         } if "enterprises" in apps.app_configs else None,
                     },
@@ -645,7 +612,7 @@ UNFOLD = {
                         "icon": "article",
                         "link": get_admin_url("admin:enterprises_postentity_changelist"),
                         "badge": lambda request: {
-                            "value": apps.get_model("enterprises", "PostEntity").objects.count(),
+                            "value": dashboard_metric("posts", "total"),
                             "attrs": {"class": "bg-amber-500 text-white"},
                         } if "enterprises" in apps.app_configs else None,
                     },
@@ -693,7 +660,7 @@ UNFOLD = {
                         "icon": "notifications",
                         "link": get_admin_url("admin:notifications_notification_changelist"),
                         "badge": lambda request: {
-                            "value": apps.get_model("notifications", "Notification").objects.filter(is_read=False).count(),
+                            "value": dashboard_metric("unread_notifications"),
                             "attrs": {"class": "bg-red-500 text-white"},
                         } if "notifications" in apps.app_configs else None,
                     },
@@ -715,7 +682,7 @@ UNFOLD = {
                         "icon": "description",
                         "link": get_admin_url("admin:profiles_cv_changelist"),
                         "badge": lambda request: {
-                            "value": apps.get_model("profiles", "Cv").objects.count(),
+                            "value": dashboard_metric("cvs", "total"),
                             "attrs": {"class": "bg-indigo-500 text-white"},
                         } if "profiles" in apps.app_configs else None,
                     },
@@ -0,0 +1,186 @@
+from datetime import datetime, time, timedelta
+
+from django.apps import apps
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import Extract, ExtractQuarter
+from django.utils import timezone
+
+from base.cache import get_or_compute
+
+DASHBOARD_METRICS_CACHE_KEY = 'admin_dashboard_metrics'
+# Mọi phiên admin dùng chung một bản số liệu trong khoảng thời gian này (giây)
+DASHBOARD_METRICS_CACHE_TIMEOUT = 60
+DASHBOARD_DAYS = 7
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _status_counts(statuses):
+    return {status: Count('id', filter=Q(status=status)) for status in statuses}
+
+
+def _processing_time(condition):
+    return Avg(
+        ExpressionWrapper(F('modified_at') - F('created_at'), output_field=DurationField()),
+        filter=condition
+    )
+
+
+def _to_days(duration):
+    return round(duration.total_seconds() / (24 * 3600), 1) if duration else 0
+
+
+def compute_dashboard_metrics():
+    """
+    Tính toàn bộ số liệu của dashboard admin
+
+    Mỗi bảng chỉ được đếm bằng một câu aggregate với các điều kiện đếm (Count(filter=...)).
+    Biểu đồ theo ngày và số liệu giao dịch đọc từ bảng PlatformDailyStats (cập nhật mỗi
+    15 phút bởi analytics.tasks) nên không phụ thuộc độ dài lịch sử giao dịch.
+    """
+    UserAccount = apps.get_model("accounts", "UserAccount")
+    UserRole = apps.get_model("accounts", "UserRole")
+    UserInfo = apps.get_model("profiles", "UserInfo")
+    EnterpriseEntity = apps.get_model("enterprises", "EnterpriseEntity")
+    PostEntity = apps.get_model("enterprises", "PostEntity")
+    FieldEntity = apps.get_model("enterprises", "FieldEntity")
+    Cv = apps.get_model("profiles", "Cv")
+    Interview = apps.get_model("interviews", "Interview")
+    VnPayTransaction = apps.get_model("transactions", "VnPayTransaction")
+    PremiumPackage = apps.get_model("transactions", "PremiumPackage")
+    Notification = apps.get_model("notifications", "Notification")
+    PlatformDailyStats = apps.get_model("analytics", "PlatformDailyStats")
+
+    today = timezone.now().date()
+    week_ago = _start_of_day(today - timedelta(days=7))
+    month_ago = _start_of_day(today - timedelta(days=30))
+    start = today - timedelta(days=DASHBOARD_DAYS - 1)
+
+    users = UserAccount.objects.aggregate(
+        total=Count('id'),
+        premium=Count('id', filter=Q(is_premium=True)),
+        premium_active=Count('id', filter=Q(is_premium=True, last_login__gte=month_ago)),
+        daily_login=Count('id', filter=Q(last_login__date=today)),
+        weekly_login=Count('id', filter=Q(last_login__gte=week_ago)),
+        monthly_login=Count('id', filter=Q(last_login__gte=month_ago)),
+        email_registrations=Count('id', filter=Q(google_id__isnull=True)),
+        google_registrations=Count('id', filter=Q(google_id__isnull=False)),
+    )
+    roles = UserRole.objects.aggregate(
+        candidates=Count('id', filter=Q(role__name='candidate')),
+        employers=Count('id', filter=Q(role__name='employer')),
+        active_candidates=Count('id', filter=Q(role__name='candidate', user__last_login__gte=month_ago)),
+        active_employers=Count('id', filter=Q(role__name='employer', user__last_login__gte=month_ago)),
+    )
+    cvs = Cv.objects.aggregate(
+        total=Count('id'),
+        viewed=Count('id', filter=Q(is_viewed=True)),
+        processing_time=_processing_time(Q(status__in=['approved', 'rejected'])),
+        reviewed_time=_processing_time(~Q(status='pending')),
+        **_status_counts(['pending', 'approved', 'rejected'])
+    )
+    cvs['processing_days'] = _to_days(cvs.pop('processing_time'))
+    cvs['reviewed_days'] = _to_days(cvs.pop('reviewed_time'))
+    posts = PostEntity.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        inactive=Count('id', filter=Q(is_active=False)),
+    )
+    enterprises = EnterpriseEntity.objects.aggregate(
+        total=Count('id'),
+        verified=Count('id', filter=Q(is_active=True)),
+        unverified=Count('id', filter=Q(is_active=False)),
+    )
+    interviews = Interview.objects.aggregate(
+        total=Count('id'),
+        **_status_counts(['accepted', 'pending', 'rejected', 'completed', 'cancelled'])
+    )
+
+    daily_stats = {
+        row.date: row for row in PlatformDailyStats.objects.filter(date__gte=start, date__lte=today)
+    }
+    days = [start + timedelta(days=i) for i in range(DASHBOARD_DAYS)]
+
+    def daily(field):
+        return [getattr(daily_stats[day], field) if day in daily_stats else 0 for day in days]
+
+    transactions = PlatformDailyStats.objects.aggregate(
+        total=Sum('transactions'),
+        success=Sum('successful_transactions'),
+        revenue=Sum('revenue'),
+    )
+    transactions = {key: value or 0 for key, value in transactions.items()}
+    arppu = PlatformDailyStats.objects.filter(
+        date__year=today.year, successful_transactions__gt=0
+    ).annotate(quarter=ExtractQuarter('date')).values('quarter').annotate(
+        revenue=Sum('revenue'),
+        count=Sum('successful_transactions')
+    ).order_by('quarter')
+    successful_transactions = VnPayTransaction.objects.filter(transaction_status='00')
+
+    return {
+        'users': users,
+        'roles': roles,
+        'cvs': cvs,
+        'posts': posts,
+        'enterprises': enterprises,
+        'interviews': interviews,
+        'transactions': transactions,
+        'user_info_count': UserInfo.objects.count(),
+        'unread_notifications': Notification.objects.filter(is_read=False).count(),
+        'daily': {
+            'labels': [day.strftime('%d/%m') for day in days],
+            'users': daily('new_users'),
+            'cvs': daily('cvs_received'),
+            'posts': daily('posts_created'),
+        },
+        'top_enterprise_applications': list(EnterpriseEntity.objects.annotate(
+            application_count=Count('interview')
+        ).order_by('-application_count').values_list('application_count', flat=True)[:5]),
+        'industry': list(EnterpriseEntity.objects.values('field_of_activity').annotate(
+            count=Count('id')
+        ).order_by('-count')[:5]),
+        'post_fields': list(PostEntity.objects.values('field').annotate(
+            post_count=Count('id'),
+            application_count=Count('cvs')
+        ).order_by('-post_count')[:4]),
+        'post_field_names': list(PostEntity.objects.values('field__name').annotate(
+            count=Count('id')
+        ).order_by('-count')[:5]),
+        'fill_time': list(PostEntity.objects.filter(is_active=False).values('field').annotate(
+            avg_days=Avg(
+                Extract('modified_at', 'epoch') - Extract('created_at', 'epoch')
+            ) / (24 * 3600)  # Chuyển từ giây sang ngày
+        )[:4]),
+        'location_salary': list(PostEntity.objects.values('city').annotate(
+            avg_salary=Avg('salary_max')
+        ).order_by('-avg_salary')[:4]),
+        'job_types': list(PostEntity.objects.values('type_working').annotate(
+            count=Count('id')
+        ).order_by('-count')),
+        # Sắp theo id khi bằng nhau để giữ thứ tự như khi duyệt từng lĩnh vực
+        'cv_by_field': [
+            {'field': row['name'], 'count': row['count']}
+            for row in FieldEntity.objects.annotate(
+                count=Count('posts__cvs')
+            ).order_by('-count', 'id').values('name', 'count')[:5]
+        ],
+        'cv_by_status': list(Cv.objects.values('status').annotate(count=Count('id'))),
+        'top_skills': list(Cv.objects.values('post__required').annotate(
+            count=Count('id')
+        ).order_by('-count')[:5]),
+        'package_names': list(dict.fromkeys(PremiumPackage.objects.values_list('name', flat=True))),
+        'revenue_by_package': list(successful_transactions.values('order_info').annotate(
+            total=Sum('amount')
+        ).order_by('-total')),
+        'arppu': [
+            {'quarter': row['quarter'], 'avg_amount': row['revenue'] / row['count']} for row in arppu
+        ],
+    }
+
+
+def get_dashboard_metrics():
+    """Số liệu dashboard dùng chung cho mọi phiên admin (chỉ một request tính lại khi hết hạn)"""
+    return get_or_compute(DASHBOARD_METRICS_CACHE_KEY, compute_dashboard_metrics, DASHBOARD_METRICS_CACHE_TIMEOUT)
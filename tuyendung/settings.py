@@ -53,6 +53,7 @@ INSTALLED_APPS = [
     'interviews',  
     'chat',  
     'gemini_chat',  # Thêm ứng dụng Gemini Chat
+    'analytics',
     'rest_framework',
     'rest_framework.authtoken',
     'rest_framework_simplejwt',
@@ -301,12 +302,38 @@ ADMIN_SITE_HEADER = UNFOLD["SITE_HEADER"]
 ADMIN_INDEX_TITLE = UNFOLD["SITE_SUBHEADER"]
 
 # Cache settings
+# Cache hai tầng: L1 trong process (LRU) + tầng dùng chung Redis cho mọi worker
+# Đặt CACHE_SHARED_BACKEND=locmem khi test/dev không có Redis
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/1')
+CACHE_SHARED_BACKEND = os.getenv('CACHE_SHARED_BACKEND', 'redis')
+
 CACHES = {
     'default': {
+        'BACKEND': 'base.cache_backends.TieredCache',
+        'TIMEOUT': 300,  # 5 minutes
+        'OPTIONS': {
+            'SHARED_ALIAS': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+            # Version của tag, khóa single-flight và bộ đếm thông báo chưa đọc phải luôn đọc từ Redis
+            # để đúng giữa các worker
+            'L1_BYPASS_PREFIXES': ['cache_tag_version', 'single_flight', 'notification_unread'],
+        },
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+        'TIMEOUT': 300,
+        'KEY_PREFIX': 'tuyendung',
+        'OPTIONS': {
+            'socket_connect_timeout': 1,
+            'socket_timeout': 1,
+        },
+    } if CACHE_SHARED_BACKEND == 'redis' else {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-snowflake',
-        'TIMEOUT': 300,  # 5 minutes
-    }
+        'TIMEOUT': 300,
+    },
 }
 
 # AWS S3 settings
@@ -394,8 +421,40 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'accounts.tasks.check_premium_expiry',
         'schedule': crontab(hour=7, minute=0),  # Chạy lúc 7 giờ sáng hàng ngày
     },
+    'cleanup-notifications': {
+        'task': 'notifications.tasks.cleanup_notifications',
+        'schedule': crontab(hour=4, minute=0),  # Chạy lúc 4 giờ sáng hàng ngày
+    },
+    'deactivate-expired-premiums': {
+        'task': 'accounts.tasks.deactivate_expired_premiums',
+        'schedule': crontab(minute='*/10'),  # Chạy mỗi 10 phút
+    },
+    'rebuild-stale-recommendation-feeds': {
+        'task': 'enterprises.tasks.rebuild_stale_recommendation_feeds',
+        'schedule': crontab(hour=3, minute=0),  # Chạy lúc 3 giờ sáng hàng ngày
+    },
+    'refresh-gemini-system-snapshot': {
+        'task': 'gemini_chat.tasks.refresh_system_snapshot_task',
+        'schedule': crontab(minute='*/10'),  # Chạy mỗi 10 phút
+    },
+    'refresh-all-related-posts': {
+        'task': 'enterprises.tasks.refresh_all_related_posts',
+        'schedule': crontab(minute=0),  # Chạy mỗi giờ
+    },
+    'update-daily-stats': {
+        'task': 'analytics.tasks.update_daily_stats_task',
+        'schedule': crontab(minute='*/15'),  # Chạy mỗi 15 phút
+    },
+    'rebuild-daily-stats': {
+        'task': 'analytics.tasks.rebuild_daily_stats_task',
+        'schedule': crontab(hour=2, minute=0),  # Chạy lúc 2 giờ sáng hàng ngày
+    },
 }
 
+# Dọn dẹp thông báo: xóa thông báo đã đọc cũ hơn số ngày này, mỗi lần xóa tối đa một batch
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 90))
+NOTIFICATION_CLEANUP_BATCH_SIZE = int(os.getenv('NOTIFICATION_CLEANUP_BATCH_SIZE', 1000))
+
 # Gemini API Configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', 'YOUR_GEMINI_API_KEY_HERE')  # Thay thế bằng API key thực tế
 
@@ -42,6 +42,7 @@ urlpatterns = [
         path('', include('interviews.urls')),
         path('', include('chat.urls')),
         path('gemini-chat/', include('gemini_chat.urls')),  # Thêm đường dẫn cho Gemini Chat API
+        path('analytics/', include('analytics.urls')),
         # path('', include('services.urls')),
         path('auth/', include('social_django.urls', namespace='social')),  # Social auth URLs
         path('dashboard/stats/', views.dashboard_stats, name='dashboard_stats'),  # Dashboard API